@@ -0,0 +1,2 @@
+-- AlterTable
+ALTER TABLE "medications" ADD COLUMN     "extractedText" TEXT;
@@ -0,0 +1,11 @@
+-- CreateExtension
+CREATE EXTENSION IF NOT EXISTS "pg_trgm";
+
+-- CreateIndex
+CREATE INDEX "medications_createdAt_id_idx" ON "medications"("createdAt", "id");
+
+-- CreateIndex
+CREATE INDEX "medications_name_trgm_idx" ON "medications" USING GIN ("name" gin_trgm_ops);
+
+-- CreateIndex
+CREATE INDEX "medications_anvisaCode_trgm_idx" ON "medications" USING GIN ("anvisaCode" gin_trgm_ops);
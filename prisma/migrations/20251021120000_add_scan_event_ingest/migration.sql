@@ -0,0 +1,8 @@
+-- AlterTable
+ALTER TABLE "scan_events" ADD COLUMN     "clientEventId" TEXT;
+
+-- CreateIndex
+CREATE UNIQUE INDEX "scan_events_clientEventId_key" ON "scan_events"("clientEventId");
+
+-- CreateIndex
+CREATE INDEX "items_qrPayload_idx" ON "items"("qrPayload");
@@ -0,0 +1,8 @@
+-- CreateIndex
+CREATE INDEX "medications_expirationDate_idx" ON "medications"("expirationDate");
+
+-- CreateIndex
+CREATE INDEX "medications_updatedAt_idx" ON "medications"("updatedAt");
+
+-- CreateIndex
+CREATE INDEX "medication_alerts_medicationId_isResolved_idx" ON "medication_alerts"("medicationId", "isResolved");
@@ -0,0 +1,5 @@
+-- DropIndex
+DROP INDEX "scan_events_clientEventId_key";
+
+-- CreateIndex
+CREATE UNIQUE INDEX "scan_events_userId_clientEventId_key" ON "scan_events"("userId", "clientEventId");
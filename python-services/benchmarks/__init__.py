@@ -0,0 +1 @@
+"""Benchmarks for the drug extraction service (run from python-services/ with ``python -m benchmarks.<name>``)"""
@@ -0,0 +1,99 @@
+"""Peak RSS per request for the legacy and current decode/preprocess paths.
+
+    python -m benchmarks.decode_memory [image] [--megapixels 12]
+
+Each variant runs in a fresh process so one path's allocations cannot hide
+the other's; the reported figure is how far the peak RSS (ru_maxrss) rises
+above the RSS measured just before decoding and preprocessing one image.
+Without an image argument a synthetic JPEG phone photo is generated.
+"""
+import argparse
+import multiprocessing
+import os
+import resource
+import time
+from io import BytesIO
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw
+
+from image_pipeline import PreprocessConfig, decode_gray_array, normalize_for_ocr
+
+
+def synthetic_photo(megapixels: float) -> bytes:
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    image = Image.new("RGB", (width, height), (205, 195, 185))
+    draw = ImageDraw.Draw(image)
+    for row, line in enumerate(["DIPIRONA SODICA 500mg", "Lote: ABC123 Venc: 12/12/2025", "MS: 1.0000.0000"]):
+        draw.text((width // 6, height // 3 + row * height // 12), line, fill=(20, 20, 20))
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
+
+
+def legacy_pipeline(contents: bytes):
+    """The pre-rework path: RGB decode, two colour conversions, PIL round trip"""
+    image = Image.open(BytesIO(contents)).convert("RGB")
+    cv_image = cv2.cvtColor(np.array(image), cv2.COLOR_RGB2BGR)
+    gray = cv2.cvtColor(cv_image, cv2.COLOR_BGR2GRAY)
+    blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+    thresh = cv2.adaptiveThreshold(blurred, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+    cleaned = cv2.morphologyEx(thresh, cv2.MORPH_CLOSE, np.ones((1, 1), np.uint8))
+    return Image.fromarray(cleaned)
+
+
+def current_pipeline(contents: bytes):
+    """Reduced grayscale decode, text-row crop and in-place filters"""
+    config = PreprocessConfig()
+    gray = normalize_for_ocr(decode_gray_array(contents, config.max_megapixels), config)
+    cv2.GaussianBlur(gray, (5, 5), 0, dst=gray)
+    cv2.adaptiveThreshold(gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2, dst=gray)
+    return gray
+
+
+def current_rss_kib() -> float:
+    """Resident set size right now (Linux), falling back to the peak so far"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def measure(name: str, contents: bytes, queue) -> None:
+    pipeline = {"legacy": legacy_pipeline, "current": current_pipeline}[name]
+    before = current_rss_kib()
+    start = time.perf_counter()
+    pipeline(contents)
+    elapsed = (time.perf_counter() - start) * 1000
+    after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((name, (after - before) / 1024, elapsed))  # ru_maxrss is in KiB on Linux
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("image", nargs="?", help="image file to decode")
+    parser.add_argument("--megapixels", type=float, default=12.0, help="size of the synthetic photo")
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, "rb") as f:
+            contents = f.read()
+    else:
+        contents = synthetic_photo(args.megapixels)
+    print(f"input: {len(contents) / 1024:.0f} KiB, {Image.open(BytesIO(contents)).size}")
+
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    for name in ("legacy", "current"):
+        process = context.Process(target=measure, args=(name, contents, queue))
+        process.start()
+        process.join()
+        name, peak_mib, elapsed = queue.get()
+        print(f"{name:8s} peak RSS growth={peak_mib:7.1f} MiB  time={elapsed:7.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
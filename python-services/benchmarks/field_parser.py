@@ -0,0 +1,77 @@
+"""Micro-benchmark of parse_drug_info over a corpus of OCR outputs.
+
+    python -m benchmarks.field_parser [corpus.jsonl] [--repeat 2000]
+
+The corpus is JSONL with a ``text`` key per line (defaults to
+benchmarks/ocr_samples.jsonl). The compiled FieldParser is compared with
+the original per-call ``re.search`` loop, and both must agree on every
+sample before timings are reported.
+"""
+import argparse
+import json
+import os
+import re
+import time
+
+from field_parser import FieldParser, COMMON_PATTERNS, MANUFACTURER_PATTERNS
+
+DEFAULT_CORPUS = os.path.join(os.path.dirname(__file__), "ocr_samples.jsonl")
+
+ATTRIBUTES = {
+    'batch': 'batch_number', 'expiry': 'expiry_date', 'manufacturing': 'manufacturing_date',
+    'dosage': 'dosage', 'registration': 'registration_number',
+}
+
+
+def legacy_parse(patterns, text):
+    """The original parse_drug_info loop, kept here as the reference"""
+    values = {}
+    text_lower = text.lower()
+    lines = [line.strip() for line in text.split('\n') if line.strip()]
+    potential_names = [line for line in lines[:5] if len(line) > 3 and not any(char.isdigit() for char in line[:3])]
+    values['name'] = potential_names[0] if potential_names else ""
+    for field, field_patterns in patterns.items():
+        for pattern in field_patterns:
+            match = re.search(pattern, text_lower, re.IGNORECASE)
+            if match:
+                value = match.group(1).strip()
+                values[ATTRIBUTES[field]] = value.upper() if field == 'batch' else value
+                break
+    for pattern in list(MANUFACTURER_PATTERNS):
+        match = re.search(pattern, text_lower, re.IGNORECASE)
+        if match:
+            values['manufacturer'] = match.group(1).strip().title()
+            break
+    return values
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", nargs="?", default=DEFAULT_CORPUS)
+    parser.add_argument("--repeat", type=int, default=2000, help="passes over the corpus")
+    args = parser.parse_args()
+
+    with open(args.corpus, encoding="utf-8") as f:
+        texts = [json.loads(line)["text"] for line in f if line.strip()]
+
+    field_parser = FieldParser(COMMON_PATTERNS)
+
+    for text in texts:
+        expected = {k: v for k, v in legacy_parse(COMMON_PATTERNS, text).items() if v}
+        actual = {k: v for k, v in field_parser.parse(text).items() if v}
+        assert expected == actual, f"parsers disagree on {text!r}: {expected} != {actual}"
+
+    for label, parse in (("legacy", lambda t: legacy_parse(COMMON_PATTERNS, t)),
+                         ("compiled", field_parser.parse),
+                         ("scan", field_parser.scan)):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for text in texts:
+                parse(text)
+        elapsed = time.perf_counter() - start
+        blobs = args.repeat * len(texts)
+        print(f"{label:9s} {blobs / elapsed:10.0f} blobs/s  {elapsed / blobs * 1e6:7.1f} us/blob")
+
+
+if __name__ == "__main__":
+    main()
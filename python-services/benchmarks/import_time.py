@@ -0,0 +1,150 @@
+"""Cold start of the extraction package: import time, memory and which heavy libraries get loaded.
+
+    python -m benchmarks.import_time [--repeat 5] [--output results.json]
+                                     [--parser-budget-ms 150]
+
+Each scenario runs in a fresh interpreter --repeat times (median reported,
+with a bare ``python -c pass`` subtracted) and once more under
+``-X importtime`` for the slowest top-level imports:
+
+    parser      from drug_extractor import parse_drug_info, then one parse
+    pil         DrugSpecExtractor on the PIL preprocessing backend
+    opencv      DrugSpecExtractor on the OpenCV backend
+    service     the FastAPI app with its engine, cache and job queue
+
+The parser scenario must not load any of HEAVY_MODULES and must stay
+under --parser-budget-ms; the exit status is 1 when either check fails,
+so CI can keep CLI tools and tests that only parse text cheap.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+import subprocess
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# Libraries that dominate a cold start; only the scenarios that need them may load them
+HEAVY_MODULES = ("cv2", "numpy", "pytesseract", "tesserocr", "qrcode", "fastapi", "uvicorn", "pydantic")
+
+SAMPLE = "DIPIRONA SÓDICA 500mg\nLote: ABC123\nVenc: 12/12/2025\nMS: 1.0000.0000"
+
+SCENARIOS = {
+    "parser": ("from drug_extractor import parse_drug_info\n"
+               f"parse_drug_info({SAMPLE!r})"),
+    "pil": ("from drug_extractor import BackendConfig, DrugSpecExtractor\n"
+            "DrugSpecExtractor(BackendConfig(preprocess='pil', fallback='sample'))"),
+    "opencv": ("from drug_extractor import BackendConfig, DrugSpecExtractor\n"
+               "DrugSpecExtractor(BackendConfig(preprocess='opencv', fallback='sample'))"),
+    "service": "import drug_extractor.service",
+}
+
+# Appended to every scenario: the parent times the whole child, the child reports its
+# peak RSS and which heavy modules it ended up importing
+PROBE = f"""
+import sys, json, resource
+print(json.dumps({{
+    "rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "heavy": [name for name in {HEAVY_MODULES!r} if name in sys.modules],
+    "modules": len(sys.modules),
+}}))
+"""
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_child(code: str, *flags: str) -> Tuple[float, subprocess.CompletedProcess]:
+    """Wall milliseconds of a fresh interpreter running ``code`` from python-services/"""
+    # Warm-up, caches and job stores stay out of the way of a pure import measurement
+    env = {**os.environ, "EXTRACTOR_CACHE_SIZE": "0", "EXTRACTOR_WARMUP": "false"}
+    env.pop("EXTRACTOR_CACHE_DB", None)
+    start = time.perf_counter()
+    completed = subprocess.run([sys.executable, *flags, "-c", code], cwd=ROOT, env=env,
+                               capture_output=True, text=True, timeout=120)
+    elapsed = (time.perf_counter() - start) * 1000
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1] if completed.stderr.strip() else "failed")
+    return elapsed, completed
+
+
+def slowest_imports(stderr: str, skip: Set[str] = frozenset(), limit: Optional[int] = 5) -> List[Dict[str, Any]]:
+    """Top-level imports by cumulative time from ``-X importtime`` output, except those in ``skip``"""
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Nested imports are indented under their parent; keep the roots
+        if name.startswith("  ") or not cumulative.strip().isdigit() or name.strip() in skip:
+            continue
+        imports.append({"module": name.strip(), "ms": round(int(cumulative) / 1000, 1)})
+    return sorted(imports, key=lambda item: item["ms"], reverse=True)[:limit]
+
+
+def measure(name: str, repeat: int, baseline_ms: float, startup: Set[str]) -> Dict[str, Any]:
+    code = SCENARIOS[name] + PROBE
+    wall = []
+    probe: Dict[str, Any] = {}
+    for _ in range(repeat):
+        elapsed, completed = run_child(code)
+        wall.append(elapsed)
+        probe = json.loads(completed.stdout.strip().splitlines()[-1])
+    _, traced = run_child(code, "-X", "importtime")
+    return {
+        "scenario": name,
+        "median_ms": round(statistics.median(wall) - baseline_ms, 1),
+        "min_ms": round(min(wall) - baseline_ms, 1),
+        "peak_rss_mib": round(probe["rss_mib"], 1),
+        "modules": probe["modules"],
+        "heavy_modules": probe["heavy"],
+        "slowest_imports": slowest_imports(traced.stderr, startup),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenario", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--parser-budget-ms", type=float, default=150.0,
+                        help="fail when the parser-only import (minus interpreter start) is slower than this")
+    parser.add_argument("--output", help="write the JSON report here")
+    args = parser.parse_args()
+
+    baseline_ms = statistics.median(run_child("pass")[0] for _ in range(args.repeat))
+    # site, encodings and friends load in every interpreter, leave them out of the rankings
+    startup = {item["module"] for item in slowest_imports(run_child("pass", "-X", "importtime")[1].stderr, limit=None)}
+    print(f"interpreter start: {baseline_ms:.1f}ms (subtracted below)")
+
+    results = []
+    failures = []
+    for name in args.scenario:
+        try:
+            result = measure(name, args.repeat, baseline_ms, startup)
+        except Exception as e:
+            print(f"{name:8s} failed: {e}")
+            results.append({"scenario": name, "error": str(e)})
+            continue
+        results.append(result)
+        slowest = ", ".join(f"{item['module']} {item['ms']:g}ms" for item in result["slowest_imports"][:3])
+        print(f"{name:8s} {result['median_ms']:8.1f}ms  RSS={result['peak_rss_mib']:6.1f}MiB  "
+              f"modules={result['modules']:<5d} heavy=[{', '.join(result['heavy_modules'])}]  slowest: {slowest}")
+
+        if name == "parser":
+            if result["heavy_modules"]:
+                failures.append(f"parser import loads {', '.join(result['heavy_modules'])}")
+            if result["median_ms"] > args.parser_budget_ms:
+                failures.append(f"parser import takes {result['median_ms']}ms (budget {args.parser_budget_ms:g}ms)")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"python": sys.version.split()[0], "interpreter_ms": round(baseline_ms, 1),
+                       "results": results}, f, indent=2)
+        print(f"Report written to {args.output}")
+    for failure in failures:
+        print(f"❌ {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""Compare per-image OCR latency of the available backends.
+
+    python -m benchmarks.ocr_backends [image ...] [--runs 20] [--lang por+eng]
+
+Without image arguments a synthetic drug label is rendered with PIL.
+"""
+import argparse
+import statistics
+import time
+from typing import List
+
+from PIL import Image, ImageDraw
+
+from ocr_backends import available_backends, create_ocr_backend
+
+SAMPLE_LINES = [
+    "DIPIRONA SODICA 500mg",
+    "Lote: ABC123  Venc: 12/12/2025",
+    "Fab: 01/01/2024  MS: 1.0000.0000",
+]
+
+
+def sample_label() -> Image.Image:
+    image = Image.new("L", (900, 260), 255)
+    draw = ImageDraw.Draw(image)
+    for row, line in enumerate(SAMPLE_LINES):
+        draw.text((30, 30 + row * 70), line, fill=0)
+    return image.resize((1800, 520))
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("images", nargs="*", help="image files to OCR")
+    parser.add_argument("--runs", type=int, default=20, help="OCR calls per image and backend")
+    parser.add_argument("--lang", default="por+eng")
+    args = parser.parse_args()
+
+    images = [Image.open(path).convert("L") for path in args.images] or [sample_label()]
+
+    for name in available_backends():
+        try:
+            backend = create_ocr_backend(lang=args.lang, name=name)
+        except Exception as e:
+            print(f"{name:12s} unavailable: {e}")
+            continue
+        if backend.name != name:
+            print(f"{name:12s} unavailable")
+            continue
+
+        # First call pays the model load for persistent engines, report it separately
+        start = time.perf_counter()
+        try:
+            backend.image_to_string(images[0])
+        except Exception as e:
+            print(f"{name:12s} failed: {e}")
+            continue
+        first = (time.perf_counter() - start) * 1000
+
+        samples = []
+        for _ in range(args.runs):
+            for image in images:
+                start = time.perf_counter()
+                backend.image_to_string(image)
+                samples.append((time.perf_counter() - start) * 1000)
+        backend.close()
+
+        print(f"{name:12s} first={first:7.1f}ms  mean={statistics.mean(samples):7.1f}ms  "
+              f"p50={percentile(samples, 50):7.1f}ms  p95={percentile(samples, 95):7.1f}ms  "
+              f"n={len(samples)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Deterministic corpus of synthetic Brazilian drug labels with known field values.
+
+    python -m benchmarks.synthetic_labels --output corpus/ [--count 8] [--seed 42]
+
+The same seed, resolutions and noise levels always produce the same images
+(for a given Pillow version), so benchmark runs on different machines or
+library versions are comparable. Each label carries the values the parser
+is expected to find for name, Lote, Venc, Fab, MS and dosage.
+"""
+import os
+import json
+import random
+import argparse
+from io import BytesIO
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+DRUGS = [
+    ("DIPIRONA SÓDICA", "500mg"),
+    ("PARACETAMOL", "750mg"),
+    ("AMOXICILINA", "500mg"),
+    ("IBUPROFENO", "600mg"),
+    ("LOSARTANA POTÁSSICA", "50mg"),
+    ("OMEPRAZOL", "20mg"),
+    ("METFORMINA", "850mg"),
+    ("SINVASTATINA", "40mg"),
+    ("AZITROMICINA", "500mg"),
+    ("CLORIDRATO DE SERTRALINA", "50mg"),
+]
+
+# DrugInfo attributes the benchmark scores
+SCORED_FIELDS = ("name", "batch_number", "expiry_date", "manufacturing_date", "dosage", "registration_number")
+
+FONT_CANDIDATES = (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/dejavu/DejaVuSans.ttf",
+    "/Library/Fonts/Arial.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf",
+)
+
+
+@dataclass
+class SyntheticLabel:
+    key: str
+    megapixels: float
+    noise: float
+    image: bytes
+    expected: Dict[str, str] = field(default_factory=dict)
+
+
+def _font(size: int) -> ImageFont.ImageFont:
+    for path in FONT_CANDIDATES:
+        if os.path.exists(path):
+            return ImageFont.truetype(path, size)
+    return ImageFont.load_default(size=size)
+
+
+def _label_fields(rng: random.Random) -> Dict[str, str]:
+    name, dosage = rng.choice(DRUGS)
+    # No M/S/R/E/G in batches, so they cannot contain the "ms"/"reg" registration markers
+    batch = "".join(rng.choice("ABCDFHJKNPTVXZ") for _ in range(2)) + str(rng.randint(1000, 99999))
+    fab_year = rng.randint(2023, 2025)
+    fab = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{fab_year}"
+    venc = f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{fab_year + rng.randint(1, 3)}"
+    ms = f"1.{rng.randint(0, 9999):04d}.{rng.randint(0, 9999):04d}"
+    return {
+        "name": f"{name} {dosage}",
+        "batch_number": batch,
+        "expiry_date": venc,
+        "manufacturing_date": fab,
+        "dosage": dosage,
+        "registration_number": ms,
+    }
+
+
+def render_label(fields: Dict[str, str], megapixels: float, noise: float, rng: random.Random) -> bytes:
+    """JPEG 'phone photo' of a label, degraded by rotation, blur and grain in proportion to ``noise``"""
+    width = int((megapixels * 1_000_000 * 4 / 3) ** 0.5)
+    height = int(width * 3 / 4)
+    shade = rng.randint(215, 250)
+    image = Image.new("L", (width, height), shade)
+    draw = ImageDraw.Draw(image)
+
+    lines = [
+        fields["name"],
+        f"Lote: {fields['batch_number']}",
+        f"Fab: {fields['manufacturing_date']}   Venc: {fields['expiry_date']}",
+        f"MS: {fields['registration_number']}",
+        "Venda sob prescrição médica",
+    ]
+    size = max(8, height // 16)
+    font = _font(size)
+    x, y = int(width * 0.08), int(height * 0.12)
+    for line in lines:
+        draw.text((x, y), line, fill=rng.randint(0, 40), font=font)
+        y += int(size * 1.6)
+
+    if noise > 0:
+        image = image.rotate(rng.uniform(-4, 4) * noise, resample=Image.Resampling.BILINEAR, fillcolor=shade)
+        image = image.filter(ImageFilter.GaussianBlur(radius=noise * size / 12))
+        grain = Image.frombytes("L", image.size, rng.randbytes(width * height))
+        image = Image.blend(image, grain, alpha=min(0.6, noise * 0.5))
+
+    buffer = BytesIO()
+    image.convert("RGB").save(buffer, format="JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def generate_corpus(count: int = 8, megapixels: Sequence[float] = (0.5, 2.0, 8.0),
+                    noise_levels: Sequence[float] = (0.0, 0.15, 0.35), seed: int = 42) -> List[SyntheticLabel]:
+    """``count`` labels per (resolution, noise) combination; each label's text depends only on the seed"""
+    corpus = []
+    for index in range(count):
+        fields = _label_fields(random.Random(f"{seed}:{index}"))
+        for mp in megapixels:
+            for noise in noise_levels:
+                rng = random.Random(f"{seed}:{index}:{mp}:{noise}")
+                corpus.append(SyntheticLabel(
+                    key=f"{index:03d}-{mp:g}mp-n{noise:g}",
+                    megapixels=mp,
+                    noise=noise,
+                    image=render_label(fields, mp, noise, rng),
+                    expected=fields,
+                ))
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", required=True, help="directory for the JPEGs and expected.jsonl")
+    parser.add_argument("--count", type=int, default=8, help="labels per resolution/noise combination")
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[0.5, 2.0, 8.0])
+    parser.add_argument("--noise", type=float, nargs="+", default=[0.0, 0.15, 0.35])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    os.makedirs(args.output, exist_ok=True)
+    corpus = generate_corpus(args.count, args.megapixels, args.noise, args.seed)
+    with open(os.path.join(args.output, "expected.jsonl"), "w", encoding="utf-8") as f:
+        for label in corpus:
+            with open(os.path.join(args.output, f"{label.key}.jpg"), "wb") as image_file:
+                image_file.write(label.image)
+            f.write(json.dumps({"file": f"{label.key}.jpg", "megapixels": label.megapixels,
+                                "noise": label.noise, "expected": label.expected}, ensure_ascii=False) + "\n")
+    print(f"Wrote {len(corpus)} labels to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+"""End-to-end latency, throughput, memory and field accuracy of the extraction service.
+
+    python -m benchmarks.throughput [--service full|simple] [--mode direct http]
+                                    [--concurrency 1 4] [--count 4] [--seed 42]
+                                    [--output results.json] [--compare baseline.json]
+
+Runs a deterministic synthetic label corpus (see benchmarks.synthetic_labels)
+through ``DrugSpecExtractor.process_image_bytes`` directly and through the
+FastAPI app (in-process over ASGI, or a running server with --url), at each
+concurrency level. Every (mode, concurrency) run happens in a fresh process
+with the result cache disabled, so runs cannot warm each other up and the
+peak RSS belongs to that run alone.
+
+The JSON report carries library versions, the git commit and the extractor
+fingerprint next to p50/p95/p99 latency, images/s, peak RSS and per-field
+accuracy; --compare prints the change against an earlier report.
+"""
+import os
+import sys
+import json
+import hashlib
+import time
+import asyncio
+import platform
+import argparse
+import resource
+import tempfile
+import subprocess
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from importlib import import_module
+from typing import Any, Dict, List, Optional, Tuple
+
+from benchmarks.ocr_backends import percentile
+from benchmarks.synthetic_labels import SCORED_FIELDS, generate_corpus
+
+SERVICE_MODULES = {"full": "drug_extractor.service", "simple": "drug_extractor_simple"}
+
+Sample = Tuple[str, bytes, Dict[str, str]]  # variant, image bytes, expected fields
+
+
+def _normalize(value: Optional[str]) -> str:
+    return " ".join((value or "").split()).casefold()
+
+
+def score(drug_info: Optional[Dict[str, str]], expected: Dict[str, str]) -> Dict[str, bool]:
+    """Exact (case and whitespace insensitive) match per scored field"""
+    drug_info = drug_info or {}
+    return {name: _normalize(drug_info.get(name)) == _normalize(expected[name]) for name in SCORED_FIELDS}
+
+
+def rss_mib() -> float:
+    """Current resident set size (Linux), falling back to the peak so far"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    except (OSError, ValueError):
+        return peak_rss_mib()
+
+
+def peak_rss_mib() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+def load_corpus(directory: str) -> List[Sample]:
+    samples = []
+    with open(os.path.join(directory, "expected.jsonl"), encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            with open(os.path.join(directory, record["file"]), "rb") as image_file:
+                samples.append((f"{record['megapixels']:g}mp/n{record['noise']:g}", image_file.read(), record["expected"]))
+    return samples
+
+
+def _tier(result: Optional[Dict[str, Any]]) -> Optional[str]:
+    return ((result or {}).get("ocr") or {}).get("tier")
+
+
+def run_direct(module, samples: List[Sample], concurrency: int) -> List[Tuple[str, float, Optional[Dict], Optional[str], Optional[str]]]:
+    extractor = module.extractor
+
+    def one(sample: Sample):
+        variant, contents, _ = sample
+        start = time.perf_counter()
+        try:
+            result = extractor.process_image_bytes(contents)
+            error = None if result else "no text extracted"
+        except Exception as e:
+            result, error = None, f"{type(e).__name__}: {e}"
+        return variant, (time.perf_counter() - start) * 1000, (result or {}).get("drug_info"), error, _tier(result)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        return list(pool.map(one, samples))
+
+
+async def _run_http(client, samples: List[Sample], concurrency: int):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(sample: Sample):
+        variant, contents, _ = sample
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await client.post("/extract-drug-info",
+                                             files={"file": ("label.jpg", contents, "image/jpeg")})
+                elapsed = (time.perf_counter() - start) * 1000
+                if response.status_code != 200:
+                    return variant, elapsed, None, f"HTTP {response.status_code}", None
+                result = response.json()
+                return variant, elapsed, result.get("drug_info"), None, _tier(result)
+            except Exception as e:
+                return variant, (time.perf_counter() - start) * 1000, None, f"{type(e).__name__}: {e}", None
+
+    return await asyncio.gather(*(one(sample) for sample in samples))
+
+
+def run_http(module, samples: List[Sample], concurrency: int, url: Optional[str]):
+    import httpx
+
+    async def main():
+        if url:
+            client = httpx.AsyncClient(base_url=url, timeout=120)
+        else:
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=module.app), base_url="http://benchmark", timeout=120)
+        async with client:
+            return await _run_http(client, samples, concurrency)
+
+    return asyncio.run(main())
+
+
+def summarize(samples: List[Sample], outcomes, wall_seconds: float) -> Dict[str, Any]:
+    latencies = [elapsed for _, elapsed, _, _, _ in outcomes]
+    field_hits = {name: 0 for name in SCORED_FIELDS}
+    all_fields = 0
+    variants: Dict[str, Dict[str, list]] = {}
+    errors: Dict[str, int] = {}
+    tiers: Dict[str, int] = {}
+
+    for (_, _, expected), (variant, elapsed, drug_info, error, tier) in zip(samples, outcomes):
+        hits = score(drug_info, expected)
+        for name, hit in hits.items():
+            field_hits[name] += hit
+        all_fields += all(hits.values())
+        bucket = variants.setdefault(variant, {"latency": [], "accuracy": []})
+        bucket["latency"].append(elapsed)
+        bucket["accuracy"].append(sum(hits.values()) / len(hits))
+        if error:
+            errors[error] = errors.get(error, 0) + 1
+        if tier:
+            tiers[tier] = tiers.get(tier, 0) + 1
+
+    count = len(outcomes)
+    accuracy = {name: round(hits / count, 4) for name, hits in field_hits.items()}
+    accuracy["mean"] = round(sum(field_hits.values()) / (count * len(SCORED_FIELDS)), 4)
+    accuracy["all_fields"] = round(all_fields / count, 4)
+    return {
+        "images": count,
+        "errors": sum(errors.values()),
+        "error_kinds": errors,
+        "wall_seconds": round(wall_seconds, 3),
+        "images_per_sec": round(count / wall_seconds, 3) if wall_seconds else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "mean": round(sum(latencies) / count, 2),
+            "max": round(max(latencies), 2),
+        },
+        "accuracy": accuracy,
+        # Which OCR cascade tier produced each result
+        "ocr_tiers": tiers,
+        "by_variant": {
+            variant: {
+                "p50_ms": round(percentile(bucket["latency"], 50), 2),
+                "accuracy": round(sum(bucket["accuracy"]) / len(bucket["accuracy"]), 4),
+            }
+            for variant, bucket in sorted(variants.items())
+        },
+    }
+
+
+def run_benchmark(options: Dict[str, Any], queue) -> None:
+    """One (mode, concurrency) run, executed in a fresh process"""
+    # Every image must go through the pipeline, and the queue must admit the whole concurrency level
+    os.environ["EXTRACTOR_CACHE_SIZE"] = "0"
+    os.environ.pop("EXTRACTOR_CACHE_DB", None)
+    queue_size = max(options["concurrency"], int(os.getenv("EXTRACTOR_MAX_QUEUE", 0)))
+    os.environ["EXTRACTOR_MAX_QUEUE"] = str(queue_size)
+
+    try:
+        module = import_module(SERVICE_MODULES[options["service"]])
+        samples = load_corpus(options["corpus"])
+
+        # The first call pays for lazy initialization (OCR engine load, pools), keep it out of the numbers
+        start = time.perf_counter()
+        module.extractor.process_image_bytes(samples[0][1])
+        warmup_ms = (time.perf_counter() - start) * 1000
+
+        baseline_rss = rss_mib()
+        start = time.perf_counter()
+        if options["mode"] == "direct":
+            outcomes = run_direct(module, samples, options["concurrency"])
+        else:
+            outcomes = run_http(module, samples, options["concurrency"], options.get("url"))
+        wall = time.perf_counter() - start
+
+        report = {
+            "mode": options["mode"],
+            "service": options["service"],
+            "concurrency": options["concurrency"],
+            "target": options.get("url") or "in-process",
+            # Short hash of the OCR/parser configuration, so reports from different settings stand out
+            "fingerprint": hashlib.sha1(module.extractor.cache_fingerprint().encode()).hexdigest()[:12],
+            "warmup_ms": round(warmup_ms, 2),
+            **summarize(samples, outcomes, wall),
+            # Memory of a remote server is not visible from here
+            "peak_rss_mib": None if options.get("url") else round(peak_rss_mib(), 1),
+            "rss_growth_mib": None if options.get("url") else round(peak_rss_mib() - baseline_rss, 1),
+        }
+        if hasattr(module, "engine"):
+            module.engine.shutdown()
+        queue.put(report)
+    except Exception as e:
+        queue.put({"mode": options["mode"], "concurrency": options["concurrency"], "error": f"{type(e).__name__}: {e}"})
+
+
+def _version(module_name: str, attribute: str = "__version__") -> Optional[str]:
+    try:
+        return str(getattr(__import__(module_name), attribute))
+    except Exception:
+        return None
+
+
+def environment() -> Dict[str, Any]:
+    """Versions and host details that explain differences between reports"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                timeout=5).stdout.strip() or None
+    except Exception:
+        commit = None
+    try:
+        import pytesseract
+        tesseract = str(pytesseract.get_tesseract_version())
+    except Exception:
+        tesseract = None
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "git_commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": {
+            "pillow": _version("PIL"),
+            "opencv": _version("cv2"),
+            "numpy": _version("numpy"),
+            "tesseract": tesseract,
+            "tesserocr": _version("tesserocr"),
+            "fastapi": _version("fastapi"),
+        },
+    }
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any]) -> None:
+    """Print the change of the headline numbers against an earlier report"""
+    def key(run):
+        return run.get("mode"), run.get("service"), run.get("concurrency")
+
+    previous = {key(run): run for run in baseline.get("runs", []) if "error" not in run}
+    print(f"\nCompared with {baseline.get('environment', {}).get('git_commit')} "
+          f"({baseline.get('environment', {}).get('timestamp')}):")
+    for run in report["runs"]:
+        before = previous.get(key(run))
+        if "error" in run or before is None:
+            continue
+        metrics = [
+            ("p50", run["latency_ms"]["p50"], before["latency_ms"]["p50"]),
+            ("p95", run["latency_ms"]["p95"], before["latency_ms"]["p95"]),
+            ("p99", run["latency_ms"]["p99"], before["latency_ms"]["p99"]),
+            ("img/s", run["images_per_sec"], before["images_per_sec"]),
+            ("rss", run["peak_rss_mib"], before["peak_rss_mib"]),
+            ("acc", run["accuracy"]["mean"], before["accuracy"]["mean"]),
+        ]
+        parts = []
+        for name, now, then in metrics:
+            if now is None or not then:
+                continue
+            parts.append(f"{name} {then:g}->{now:g} ({(now - then) / then * 100:+.1f}%)")
+        print(f"  {run['mode']:6s} c={run['concurrency']:<3d} " + "  ".join(parts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--service", choices=sorted(SERVICE_MODULES), default="full")
+    parser.add_argument("--mode", nargs="+", choices=["direct", "http"], default=["direct", "http"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app (http mode)")
+    parser.add_argument("--corpus", help="directory written by benchmarks.synthetic_labels (generated if omitted)")
+    parser.add_argument("--count", type=int, default=4, help="labels per resolution/noise combination")
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[0.5, 2.0, 8.0])
+    parser.add_argument("--noise", type=float, nargs="+", default=[0.0, 0.15, 0.35])
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="label-corpus-") as scratch:
+        corpus_dir = args.corpus
+        if not corpus_dir:
+            corpus_dir = scratch
+            corpus = generate_corpus(args.count, args.megapixels, args.noise, args.seed)
+            with open(os.path.join(corpus_dir, "expected.jsonl"), "w", encoding="utf-8") as f:
+                for label in corpus:
+                    with open(os.path.join(corpus_dir, f"{label.key}.jpg"), "wb") as image_file:
+                        image_file.write(label.image)
+                    f.write(json.dumps({"file": f"{label.key}.jpg", "megapixels": label.megapixels,
+                                        "noise": label.noise, "expected": label.expected}, ensure_ascii=False) + "\n")
+            print(f"Generated {len(corpus)} synthetic labels (seed {args.seed})")
+
+        context = multiprocessing.get_context("spawn")
+        runs = []
+        for mode in args.mode:
+            for concurrency in args.concurrency:
+                queue = context.Queue()
+                options = {"mode": mode, "service": args.service, "concurrency": concurrency,
+                           "corpus": corpus_dir, "url": args.url}
+                process = context.Process(target=run_benchmark, args=(options, queue))
+                process.start()
+                run = queue.get()
+                process.join()
+                runs.append(run)
+                if "error" in run:
+                    print(f"{mode:6s} c={concurrency:<3d} failed: {run['error']}")
+                    continue
+                latency = run["latency_ms"]
+                rss = f"{run['peak_rss_mib']:.0f}MiB" if run["peak_rss_mib"] is not None else "n/a"
+                print(f"{mode:6s} c={concurrency:<3d} p50={latency['p50']:8.1f}ms  p95={latency['p95']:8.1f}ms  "
+                      f"p99={latency['p99']:8.1f}ms  {run['images_per_sec']:6.2f} img/s  peak RSS={rss}  "
+                      f"accuracy={run['accuracy']['mean']:.3f}  errors={run['errors']}")
+
+    report = {
+        "environment": environment(),
+        "config": {"service": args.service, "count": args.count, "megapixels": args.megapixels,
+                   "noise": args.noise, "seed": args.seed, "corpus": args.corpus},
+        "runs": runs,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Report written to {args.output}")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,472 @@
+"""Drug catalog index: fuzzy matching of OCR'd names and MS registrations against a product list.
+
+The product list (CSV or Parquet with name, registration, manufacturer and
+dosage columns; Portuguese headers work too) is compiled into one binary
+file holding trigram postings for names and registration digits, a sorted
+registration table and the product strings. The service memory-maps that
+file read-only, so every worker process shares a single copy through the
+page cache, and re-opens it when the file is replaced (builds write a
+temporary file and rename it over the old one). A CSV/Parquet path is
+compiled at startup when its index is missing or stale; while running,
+only ``build`` below replaces the index.
+
+    python catalog.py build produtos.csv                 # writes produtos.csv.idx
+    python catalog.py build produtos.parquet --output catalog.idx
+    python catalog.py search catalog.idx "DIPIRONA SODlCA 500mg" [--repeat 1000]
+"""
+import os
+import re
+import csv
+import mmap
+import time
+import heapq
+import struct
+import hashlib
+import argparse
+import threading
+import unicodedata
+from dataclasses import dataclass
+from array import array
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from lazy_imports import LazyModule
+
+parquet = LazyModule("pyarrow.parquet")
+
+MAGIC = b"GAUGECAT"
+VERSION = 1
+# magic, version, products, registrations, name postings, registration postings, string bytes, source digest
+HEADER = struct.Struct("<8sIIIIII16s")
+
+# Per-product strings; registration_key is the registration reduced to its digits
+FIELDS = ("name", "registration", "manufacturer", "dosage", "registration_key")
+NAME, REGISTRATION, MANUFACTURER, DOSAGE, REGISTRATION_KEY = range(len(FIELDS))
+
+# Normalized text is uppercase ASCII letters, digits and single spaces: 37 symbols, 37^3 trigram keys
+ALPHABET = " 0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ"
+SYMBOL = {char: code for code, char in enumerate(ALPHABET)}
+KEYS = len(ALPHABET) ** 3
+# Registration keys: position (up to 13 digits) x digit trigram, base 11 with the pad as "A"
+REGISTRATION_DIGITS = 13
+
+# Dosage tokens are not part of a product name ("DIPIRONA SODICA 500MG")
+DOSAGE_TOKEN = re.compile(r"\b\d+(?:[.,]\d+)?\s*(?:MG|MCG|G|ML|UI|%)(?:/\S*)?")
+CONFUSABLES = str.maketrans("0158L", "OISBI")
+
+# Source column -> catalog field, after lowercasing and stripping accents
+COLUMN_ALIASES = {
+    "name": "name", "nome": "name", "produto": "name", "nome_produto": "name", "product": "name",
+    "registration": "registration", "registro": "registration", "registro_ms": "registration",
+    "ms": "registration", "numero_registro": "registration",
+    "manufacturer": "manufacturer", "fabricante": "manufacturer", "laboratorio": "manufacturer",
+    "empresa": "manufacturer", "detentor": "manufacturer",
+    "dosage": "dosage", "dosagem": "dosage", "concentracao": "dosage", "apresentacao": "dosage",
+}
+
+
+def strip_accents(text: str) -> str:
+    return "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+
+
+def normalize(text: str) -> str:
+    """Uppercase ASCII letters and digits separated by single spaces"""
+    text = strip_accents(text).upper()
+    return " ".join("".join(char if char in SYMBOL else " " for char in text).split())
+
+
+def name_key(text: str) -> str:
+    """Normalized name without dosage tokens, OCR look-alikes folded (0/O, 1/I/l, 5/S, 8/B) on both sides"""
+    return normalize(DOSAGE_TOKEN.sub(" ", strip_accents(text).upper()).translate(CONFUSABLES))
+
+
+def digits(text: str) -> str:
+    return "".join(char for char in text if char.isdigit())
+
+
+def trigrams(normalized: str) -> Set[int]:
+    """Distinct trigram keys of ``normalized`` padded with a space on each side"""
+    padded = f" {normalized} "
+    return {SYMBOL[padded[i]] * 1369 + SYMBOL[padded[i + 1]] * 37 + SYMBOL[padded[i + 2]]
+            for i in range(len(padded) - 2)}
+
+
+def registration_trigrams(key: str) -> Set[int]:
+    """Digit trigrams tagged with their position: OCR misreads digits far more often than it drops them,
+    and 13-digit registrations share most plain trigrams"""
+    padded = f" {key[:REGISTRATION_DIGITS]}"
+    return {position * 1331 + int(padded[position:position + 3].replace(" ", "A"), 11)
+            for position in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str) -> int:
+    """Levenshtein distance, two rows (registrations are at most 13 digits)"""
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def read_products(path: str) -> List[Dict[str, str]]:
+    """Rows of a CSV (delimiter sniffed, UTF-8) or Parquet product list, keyed by catalog field"""
+    if path.lower().endswith((".parquet", ".pq")):
+        rows = parquet.read_table(path).to_pylist()
+    else:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            sample = f.read(4096)
+            f.seek(0)
+            dialect = csv.Sniffer().sniff(sample, delimiters=",;\t|") if sample else csv.excel
+            rows = list(csv.DictReader(f, dialect=dialect))
+
+    products = []
+    for row in rows:
+        product = {name: "" for name in FIELDS[:REGISTRATION_KEY]}
+        for column, value in row.items():
+            field = COLUMN_ALIASES.get(strip_accents(str(column or "")).strip().lower().replace(" ", "_"))
+            if field and value is not None and not product[field]:
+                product[field] = str(value).strip()
+        if product["name"]:
+            products.append(product)
+    return products
+
+
+def _postings(entries: List[Set[int]]) -> Tuple[List[int], List[int]]:
+    """CSR layout of trigram -> product ids: KEYS + 1 offsets and the concatenated id lists"""
+    buckets: Dict[int, List[int]] = {}
+    for product_id, keys in enumerate(entries):
+        for key in keys:
+            buckets.setdefault(key, []).append(product_id)
+    offsets, postings = [0] * (KEYS + 1), []
+    for key in range(KEYS):
+        postings.extend(buckets.get(key, ()))
+        offsets[key + 1] = len(postings)
+    return offsets, postings
+
+
+def build_index(source: str, output: str) -> int:
+    """Compile a product list into an index file, atomically replacing ``output``; returns the product count"""
+    products = read_products(source)
+    strings = bytearray()
+    string_offsets = [0]
+    digest = hashlib.blake2b(digest_size=16)
+    name_trigrams, position_trigrams = [], []
+    for product in products:
+        key = digits(product["registration"])
+        for value in (product["name"], product["registration"], product["manufacturer"], product["dosage"], key):
+            encoded = value.encode("utf-8")
+            strings += encoded
+            string_offsets.append(len(strings))
+            digest.update(encoded + b"\x00")
+        name_trigrams.append(trigrams(name_key(product["name"])))
+        position_trigrams.append(registration_trigrams(key) if key else set())
+
+    registered = sorted((product_id for product_id, product in enumerate(products) if digits(product["registration"])),
+                        key=lambda product_id: digits(products[product_id]["registration"]))
+    name_offsets, name_postings = _postings(name_trigrams)
+    registration_offsets, registration_postings = _postings(position_trigrams)
+
+    temporary = f"{output}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, len(products), len(registered), len(name_postings),
+                            len(registration_postings), len(strings), digest.digest()))
+        for section in (string_offsets, registered,
+                        name_offsets, name_postings, registration_offsets, registration_postings):
+            f.write(array("I", section).tobytes())
+        f.write(strings)
+    os.replace(temporary, output)
+    return len(products)
+
+
+@dataclass
+class CatalogProduct:
+    id: int
+    name: str
+    registration: str
+    manufacturer: str
+    dosage: str
+
+
+@dataclass
+class CatalogMatch:
+    product: CatalogProduct
+    score: float        # 0-1: trigram Dice coefficient for names, 1 - edits/digits for registrations
+    query: str
+
+    def summary(self) -> Dict[str, Any]:
+        return {"name": self.product.name, "registration": self.product.registration,
+                "manufacturer": self.product.manufacturer, "dosage": self.product.dosage,
+                "score": round(self.score, 3), "query": self.query}
+
+
+class CatalogIndex:
+    """Read-only view of an index file, every section a zero-copy slice of one shared mapping"""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._map)
+        # Sections are native uint32 (array("I") when built), read back with memoryview.cast("I")
+        (magic, version, self.products, registrations, name_postings, registration_postings,
+         string_bytes, digest) = HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} catalog index")
+        self.digest = digest.hex()
+
+        position = HEADER.size
+
+        def section(count: int) -> memoryview:
+            nonlocal position
+            start, position = position, position + count * 4
+            return view[start:position].cast("I")
+
+        self._string_offsets = section(self.products * len(FIELDS) + 1)
+        self._registered = section(registrations)
+        self._name_offsets = section(KEYS + 1)
+        self._name_postings = section(name_postings)
+        self._registration_offsets = section(KEYS + 1)
+        self._registration_postings = section(registration_postings)
+        self._strings = view[position:position + string_bytes]
+        # Trigrams shared by much of the catalog (" DI", "ICA") cost the most and tell the least
+        self._stop_size = max(64, self.products // 200)
+
+    def _field(self, product_id: int, field: int) -> str:
+        slot = product_id * len(FIELDS) + field
+        return bytes(self._strings[self._string_offsets[slot]:self._string_offsets[slot + 1]]).decode("utf-8")
+
+    def product(self, product_id: int) -> CatalogProduct:
+        return CatalogProduct(product_id, *(self._field(product_id, field) for field in range(REGISTRATION_KEY)))
+
+    def _candidates(self, keys: Set[int], offsets: memoryview, postings: memoryview, limit: int) -> List[int]:
+        """Product ids sharing the most of ``keys``, counting the rarest postings only.
+
+        Keys are walked rarest first; the three rarest always count, the
+        others only while their postings stay under the stop size, which
+        bounds a lookup to a few thousand increments on any catalog.
+        """
+        spans = sorted((offsets[key + 1] - offsets[key], offsets[key]) for key in keys)
+        shared: Dict[int, int] = {}
+        for rank, (size, start) in enumerate(spans):
+            if size > self._stop_size and rank >= 3:
+                break
+            for product_id in postings[start:start + size]:
+                shared[product_id] = shared.get(product_id, 0) + 1
+        return heapq.nlargest(limit, shared, key=shared.__getitem__)
+
+    def search(self, text: str, limit: int = 5) -> List[CatalogMatch]:
+        """Products whose name is most similar to ``text`` (trigram Dice coefficient), best first"""
+        key = name_key(text)
+        if len(key) < 3:
+            return []
+        keys = trigrams(key)
+        scored = []
+        for product_id in self._candidates(keys, self._name_offsets, self._name_postings, limit * 4):
+            # Exact similarity for the short list, stop trigrams included
+            candidate = trigrams(name_key(self._field(product_id, NAME)))
+            scored.append((2.0 * len(keys & candidate) / (len(keys) + len(candidate)), -product_id))
+        return [CatalogMatch(self.product(-negated), score, text)
+                for score, negated in heapq.nlargest(limit, scored)]
+
+    def _registration_key(self, product_id: int) -> str:
+        return self._field(product_id, REGISTRATION_KEY)
+
+    def match_registration(self, text: str, max_edits: int = 2) -> Optional[CatalogMatch]:
+        """Exact or prefix match of the digits (labels often print the 9-digit product registration of a
+        13-digit presentation), else the closest registration within ``max_edits`` OCR digit errors"""
+        query = digits(text)
+        if len(query) < 7:
+            return None
+
+        low, high = 0, len(self._registered)
+        while low < high:
+            middle = (low + high) // 2
+            if self._registration_key(self._registered[middle]) < query:
+                low = middle + 1
+            else:
+                high = middle
+        if low < len(self._registered) and self._registration_key(self._registered[low]).startswith(query):
+            return CatalogMatch(self.product(self._registered[low]), 1.0, text)
+
+        best: Optional[Tuple[int, int]] = None
+        for product_id in self._candidates(registration_trigrams(query), self._registration_offsets,
+                                           self._registration_postings, 8):
+            edits = edit_distance(query, self._registration_key(product_id)[:len(query)])
+            if edits <= max_edits and (best is None or edits < best[0]):
+                best = (edits, product_id)
+        if best is None:
+            return None
+        return CatalogMatch(self.product(best[1]), 1.0 - best[0] / len(query), text)
+
+
+@dataclass
+class CatalogConfig:
+    path: str = ""                  # index file, or a CSV/Parquet product list compiled to <path>.idx; empty disables
+    min_score: float = 0.6          # name matches below this Dice coefficient are ignored
+    max_lines: int = 8              # leading OCR lines tried as name candidates
+    max_registration_edits: int = 2
+    reload_seconds: float = 30.0    # how often the index file is checked for a replacement, 0 disables
+
+    @classmethod
+    def from_env(cls) -> "CatalogConfig":
+        """Build the configuration from EXTRACTOR_CATALOG* environment variables"""
+        return cls(
+            path=os.getenv("EXTRACTOR_CATALOG", ""),
+            min_score=float(os.getenv("EXTRACTOR_CATALOG_MIN_SCORE", 0.6)),
+            max_lines=int(os.getenv("EXTRACTOR_CATALOG_MAX_LINES", 8)),
+            max_registration_edits=int(os.getenv("EXTRACTOR_CATALOG_MAX_REGISTRATION_EDITS", 2)),
+            reload_seconds=float(os.getenv("EXTRACTOR_CATALOG_RELOAD_SECONDS", 30)),
+        )
+
+    def describe(self) -> str:
+        return f"score={self.min_score}:lines={self.max_lines}:edits={self.max_registration_edits}"
+
+    @property
+    def index_path(self) -> str:
+        return self.path if self.path.endswith(".idx") else f"{self.path}.idx"
+
+
+class Catalog:
+    """The current CatalogIndex, swapped for a new one when the index file (or its source list) changes.
+
+    Readers take ``current()`` once per lookup; a replaced index stays
+    valid for lookups still holding it and is unmapped when the last
+    reference goes away.
+    """
+
+    def __init__(self, config: CatalogConfig):
+        self.config = config
+        self.index: Optional[CatalogIndex] = None
+        self.loaded_at: Optional[float] = None
+        self._signature: Optional[Tuple[int, int, int]] = None
+        self._checked = 0.0
+        self._lock = threading.Lock()
+        self.build_if_stale()
+        self.reload()
+
+    def build_if_stale(self) -> None:
+        """Compile the configured product list when its index is missing or older (startup only)"""
+        source, index_path = self.config.path, self.config.index_path
+        if source == index_path or not os.path.exists(source):
+            return
+        if not os.path.exists(index_path) or os.stat(index_path).st_mtime < os.stat(source).st_mtime:
+            count = build_index(source, index_path)
+            print(f"📚 Built catalog index {index_path} ({count} products)")
+
+    def reload(self) -> bool:
+        """Open the index again if its file was replaced; returns whether a new index was loaded
+
+        Never compiles: a rebuild inside a request would hold the lock for
+        seconds in every worker. A replaced product list is picked up by
+        ``catalog.py build`` or at the next start.
+        """
+        with self._lock:
+            self._checked = time.monotonic()
+            try:
+                stat = os.stat(self.config.index_path)
+            except FileNotFoundError:
+                return False
+            signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+            if signature == self._signature:
+                return False
+            self.index = CatalogIndex(self.config.index_path)
+            self._signature, self.loaded_at = signature, time.time()
+            print(f"📚 Catalog loaded: {self.index.products} products ({self.index.digest[:12]})")
+            return True
+
+    def current(self) -> Optional[CatalogIndex]:
+        if self.config.reload_seconds > 0 and time.monotonic() - self._checked >= self.config.reload_seconds:
+            try:
+                self.reload()
+            except Exception as e:
+                # Keep serving the index we have; a half-written or corrupt file is retried next time
+                print(f"⚠️ Catalog reload failed: {e}")
+        return self.index
+
+    def describe(self) -> str:
+        index = self.index
+        return f"{index.digest if index else 'missing'}:{self.config.describe()}"
+
+    def stats(self) -> Dict[str, Any]:
+        index = self.index
+        return {"path": self.config.index_path, "products": index.products if index else 0,
+                "digest": index.digest if index else None, "loaded_at": self.loaded_at}
+
+    def correct(self, fields: Dict[str, str], text: str) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        """Catalog values for the parsed ``fields`` of ``text``, and the ``catalog`` block of the response.
+
+        A registration found in the catalog identifies the product outright;
+        otherwise the best name match over the leading OCR lines (and the
+        parsed name) above min_score does. The matched product's name and
+        registration replace the OCR'd ones, and its manufacturer and
+        dosage fill fields OCR left empty.
+        """
+        index = self.current()
+        if index is None:
+            return {}, {}
+
+        match, matched_by = None, None
+        if fields.get("registration_number"):
+            match = index.match_registration(fields["registration_number"], self.config.max_registration_edits)
+            matched_by = "registration"
+        if match is None:
+            lines = [line.strip() for line in text.split("\n") if line.strip()][:self.config.max_lines]
+            candidates = [fields["name"]] + lines if fields.get("name") else lines
+            best = [found[0] for found in (index.search(line, 1) for line in candidates) if found]
+            match = max(best, key=lambda found: found.score, default=None)
+            matched_by = "name"
+            if match is not None and match.score < self.config.min_score:
+                match = None
+        if match is None:
+            return {}, {"matched": False}
+
+        product = match.product
+        updates = {"name": product.name}
+        if product.registration:
+            updates["registration_number"] = product.registration
+        if product.manufacturer and not fields.get("manufacturer"):
+            updates["manufacturer"] = product.manufacturer
+        if product.dosage and not fields.get("dosage"):
+            updates["dosage"] = product.dosage
+        corrected = sorted(name for name, value in updates.items() if fields.get(name) != value)
+        return updates, {"matched": True, "matched_by": matched_by, "corrected": corrected, **match.summary()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="compile a CSV/Parquet product list into an index file")
+    build.add_argument("source")
+    build.add_argument("--output", help="index file (default: <source>.idx)")
+    search = commands.add_parser("search", help="fuzzy lookup of a name or registration, with timing")
+    search.add_argument("index")
+    search.add_argument("query")
+    search.add_argument("--limit", type=int, default=5)
+    search.add_argument("--repeat", type=int, default=1, help="repeat the lookup to time it")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        output = args.output or f"{args.source}.idx"
+        start = time.perf_counter()
+        count = build_index(args.source, output)
+        print(f"✅ Indexed {count} products into {output} ({os.path.getsize(output) / 1024:.0f} KiB, "
+              f"{time.perf_counter() - start:.2f}s)")
+        return
+
+    index = CatalogIndex(args.index)
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        registration = index.match_registration(args.query)
+        matches = index.search(args.query, args.limit)
+    elapsed_us = (time.perf_counter() - start) / args.repeat * 1_000_000
+    if registration:
+        print(f"registration  {registration.score:.3f}  {registration.product.registration}  {registration.product.name}")
+    for match in matches:
+        print(f"name          {match.score:.3f}  {match.product.name}  {match.product.registration}  "
+              f"{match.product.manufacturer}")
+    print(f"⏱  {elapsed_us:.0f}µs per lookup ({index.products} products)")
+
+
+if __name__ == "__main__":
+    main()
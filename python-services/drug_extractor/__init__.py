@@ -0,0 +1,45 @@
+"""GAUGE drug label extraction: text parser, extraction pipeline and HTTP service.
+
+    from drug_extractor import parse_drug_info     # field parser only, no OpenCV/Tesseract/FastAPI
+    from drug_extractor import DrugSpecExtractor   # pipeline, backends from EXTRACTOR_* settings
+    python -m drug_extractor                       # the FastAPI service on port 8000
+
+Names are resolved on first access, so importing the package loads no
+submodule, and the submodules import cv2, numpy, pytesseract and qrcode
+only when a backend first uses them (see lazy_imports). The preprocessing
+backend (EXTRACTOR_PREPROCESS_BACKEND=auto|opencv|pil), OCR engine
+(EXTRACTOR_OCR_BACKEND) and sample-text fallback (EXTRACTOR_FALLBACK) are
+described in drug_extractor.backends.BackendConfig.
+"""
+from importlib import import_module
+
+# Public name -> submodule that defines it
+_EXPORTS = {
+    "DrugInfo": "parsing",
+    "SAMPLE_TEXT": "parsing",
+    "parse_drug_info": "parsing",
+    "BackendConfig": "backends",
+    "DrugSpecExtractor": "extractor",
+    # The service surface serve.py and drug_extractor_simple rely on. The service's extractor
+    # instance is left out: the name is taken by the drug_extractor.extractor submodule
+    "app": "service",
+    "engine": "service",
+    "run_extraction": "service",
+    "preload": "service",
+    "warm_up": "service",
+    "main": "service",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
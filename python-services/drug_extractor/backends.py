@@ -0,0 +1,180 @@
+import os
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from PIL import Image, ImageEnhance, ImageFilter
+
+from lazy_imports import importable
+from image_pipeline import (PreprocessConfig, decode_image, decode_gray_array, normalize_for_ocr,
+                            fit_megapixels, deskew, cv2, np)
+from ocr_cascade import OCRTier
+
+PREPROCESS_BACKENDS = ("auto", "opencv", "pil")
+FALLBACKS = ("none", "sample")
+
+
+@dataclass
+class BackendConfig:
+    preprocess: str = "auto"    # opencv, pil, or auto (OpenCV when it imports, PIL otherwise)
+    ocr: str = "auto"           # auto, tesserocr or pytesseract (see ocr_backends.create_ocr_backend)
+    # "sample" answers with SAMPLE_TEXT when OCR is missing or reads nothing (demos without Tesseract);
+    # "none" reports those images as unreadable
+    fallback: str = "none"
+
+    @classmethod
+    def from_env(cls) -> "BackendConfig":
+        """Build the configuration from EXTRACTOR_PREPROCESS_BACKEND, EXTRACTOR_OCR_BACKEND and EXTRACTOR_FALLBACK"""
+        config = cls(
+            preprocess=os.getenv("EXTRACTOR_PREPROCESS_BACKEND", "auto").lower(),
+            ocr=os.getenv("EXTRACTOR_OCR_BACKEND", "auto").lower(),
+            fallback=os.getenv("EXTRACTOR_FALLBACK", "none").lower(),
+        )
+        if config.preprocess not in PREPROCESS_BACKENDS:
+            raise ValueError(f"EXTRACTOR_PREPROCESS_BACKEND must be one of {', '.join(PREPROCESS_BACKENDS)}")
+        if config.fallback not in FALLBACKS:
+            raise ValueError(f"EXTRACTOR_FALLBACK must be one of {', '.join(FALLBACKS)}")
+        return config
+
+    @property
+    def sample_fallback(self) -> bool:
+        return self.fallback == "sample"
+
+
+class Preprocessor(ABC):
+    """Decodes uploads and prepares them for OCR; one implementation per image library"""
+
+    name = "base"
+
+    def __init__(self, config: PreprocessConfig):
+        self.config = config
+
+    @abstractmethod
+    def describe(self) -> str:
+        """Stable description of the preprocessing (used in cache keys)"""
+
+    @abstractmethod
+    def decode(self, contents: bytes) -> Any:
+        """Grayscale image capped at the decode budget"""
+
+    @staticmethod
+    @abstractmethod
+    def megapixels(image) -> float:
+        """Size of a decoded image in megapixels"""
+
+    @abstractmethod
+    def prepare(self, image) -> Any:
+        """The single-pass preprocessing, ready for the OCR backend"""
+
+    def variants(self) -> Optional[Dict[str, Callable[[Any, OCRTier], Any]]]:
+        """Preprocessing per OCR cascade tier, None when this backend cannot run the cascade"""
+        return None
+
+
+class OpenCVPreprocessor(Preprocessor):
+    """ndarray pipeline: reduced JPEG decode, text line cropping, blur and adaptive threshold"""
+
+    name = "opencv"
+
+    def describe(self) -> str:
+        return "cv2-gauss5-adaptive11x2:" + self.config.describe()
+
+    def decode(self, contents: bytes) -> "np.ndarray":
+        return decode_gray_array(contents, self.config.max_megapixels)
+
+    @staticmethod
+    def megapixels(image: "np.ndarray") -> float:
+        return image.shape[0] * image.shape[1] / 1_000_000
+
+    def prepare(self, image) -> "np.ndarray":
+        # Accept a grayscale ndarray from decode_gray_array, or a PIL image
+        if isinstance(image, Image.Image):
+            gray = np.array(image.convert('L') if image.mode != 'L' else image)
+        else:
+            gray = image
+
+        # Keep only the text rows, scaled to the height Tesseract reads best
+        gray = normalize_for_ocr(gray, self.config)
+        # Cascade tiers start again from the decoded image, so never threshold it in place
+        if gray is image:
+            gray = gray.copy()
+
+        # Apply Gaussian blur to reduce noise (in place, the buffer is ours)
+        cv2.GaussianBlur(gray, (5, 5), 0, dst=gray)
+
+        # Apply adaptive thresholding (in place)
+        cv2.adaptiveThreshold(
+            gray, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2, dst=gray
+        )
+
+        # The OCR backends take the ndarray directly, no PIL round trip
+        return gray
+
+    def variants(self) -> Dict[str, Callable[[Any, OCRTier], Any]]:
+        """Preprocessing variant per cascade tier (see ocr_cascade.CascadeConfig.build_tiers)"""
+        return {
+            "light": self.prepare_light,
+            "full": lambda image, tier: self.prepare(image),
+            "deskew": self.prepare_deskewed,
+        }
+
+    def prepare_light(self, image, tier: OCRTier) -> "np.ndarray":
+        """Fast tier: downscaled text rows, no blur or thresholding (Tesseract binarizes clean labels fine)"""
+        return normalize_for_ocr(fit_megapixels(image, tier.max_megapixels), self.config)
+
+    def prepare_deskewed(self, image, tier: OCRTier) -> Optional["np.ndarray"]:
+        """Rotation corrected full preprocessing; None when the text is already level"""
+        rotated = deskew(image)
+        if rotated is image:
+            return None
+        return self.prepare(rotated)
+
+
+class PILPreprocessor(Preprocessor):
+    """Pure Pillow pipeline for installs without OpenCV: draft-mode decode, contrast, sharpen, median"""
+
+    name = "pil"
+
+    def describe(self) -> str:
+        return f"pil-contrast2-sharpness2-median3:mp={self.config.max_megapixels}"
+
+    def decode(self, contents: bytes) -> Image.Image:
+        return decode_image(contents, 'L', self.config.max_megapixels)
+
+    @staticmethod
+    def megapixels(image: Image.Image) -> float:
+        return image.size[0] * image.size[1] / 1_000_000
+
+    def prepare(self, image: Image.Image) -> Image.Image:
+        """Enhance image for better OCR results using PIL"""
+        try:
+            # Convert to grayscale
+            if image.mode != 'L':
+                image = image.convert('L')
+
+            # Enhance contrast
+            enhancer = ImageEnhance.Contrast(image)
+            image = enhancer.enhance(2.0)
+
+            # Enhance sharpness
+            enhancer = ImageEnhance.Sharpness(image)
+            image = enhancer.enhance(2.0)
+
+            # Apply a slight blur to reduce noise
+            image = image.filter(ImageFilter.MedianFilter(3))
+
+            return image
+        except Exception as e:
+            print(f"Image enhancement error: {e}")
+            return image
+
+
+def create_preprocessor(name: str, config: PreprocessConfig) -> Preprocessor:
+    """Preprocessor for ``name`` (see BackendConfig.preprocess); importing OpenCV happens here"""
+    if name in ("auto", OpenCVPreprocessor.name):
+        if importable("cv2") and importable("numpy"):
+            return OpenCVPreprocessor(config)
+        if name == OpenCVPreprocessor.name:
+            raise ImportError("EXTRACTOR_PREPROCESS_BACKEND=opencv but OpenCV is not installed")
+        print("OpenCV not available, using basic image processing")
+    return PILPreprocessor(config)
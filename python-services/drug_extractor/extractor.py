@@ -0,0 +1,216 @@
+import json
+from dataclasses import asdict, replace
+from typing import Any, Dict, Optional
+
+from lazy_imports import importable
+from metrics import stage, observe, tag
+from qr_codes import QRRenderer, QRConfig
+from field_parser import FieldParser, COMMON_PATTERNS, MANUFACTURER_PATTERNS
+from ocr_backends import create_ocr_backend, available_backends
+from ocr_cascade import CascadeConfig, OCRCascade
+from symbols import SymbolConfig, SymbolDecoder, SymbolReading
+from catalog import Catalog, CatalogConfig
+from image_pipeline import PreprocessConfig, render_sample_label, np
+
+from .backends import BackendConfig, OpenCVPreprocessor, create_preprocessor
+from .parsing import DrugInfo, SAMPLE_TEXT, parse_drug_info
+
+# Libraries a backend only loads on first use; preload() imports them ahead of a fork
+PRELOAD_MODULES = {
+    "opencv": ("cv2", "numpy"),
+    "tesserocr": ("tesserocr",),
+    "pytesseract": ("pytesseract",),
+}
+
+
+class DrugSpecExtractor:
+    """Decode, symbol reading, OCR, parsing and QR rendering for one label photo.
+
+    The preprocessing library, OCR engine and what happens when OCR is not
+    available are picked by BackendConfig (EXTRACTOR_PREPROCESS_BACKEND,
+    EXTRACTOR_OCR_BACKEND, EXTRACTOR_FALLBACK); the OCR cascade runs on the
+    OpenCV backend only.
+    """
+
+    def __init__(self, backends: Optional[BackendConfig] = None):
+        self.backends = backends or BackendConfig.from_env()
+        # Field patterns shared with the re-parse CLI (see field_parser.py)
+        self.common_patterns = COMMON_PATTERNS
+        # Patterns compiled once into the field extraction engine
+        self.field_parser = FieldParser(self.common_patterns)
+        # Decode budget, text height normalization and text region cropping
+        self.preprocess_config = PreprocessConfig.from_env()
+        self.preprocessor = create_preprocessor(self.backends.preprocess, self.preprocess_config)
+        # OCR engine (persistent tesserocr when available, pytesseract otherwise); with the
+        # sample fallback a missing engine is tolerated and every image gets SAMPLE_TEXT
+        self.ocr = None
+        if not self.backends.sample_fallback or available_backends():
+            self.ocr = create_ocr_backend(lang='por+eng', psm=6, oem=3, name=self.backends.ocr)
+        else:
+            print("Tesseract not available")
+        # Compact QR payloads, rendered codes kept in an LRU keyed by payload
+        self.qr = QRRenderer(QRConfig.from_env())
+        # Cheap OCR pass first, heavier tiers only when confidence or parsed fields fall short
+        self.cascade_config = CascadeConfig.from_env()
+        self.cascade = None
+        self.preprocessors = self.preprocessor.variants()
+        if self.ocr is not None and self.preprocessors is not None and self.cascade_config.enabled:
+            self.cascade = OCRCascade(self.cascade_config, 'por+eng', self.field_parser.parse, backends=[self.ocr])
+        # GS1 DataMatrix / EAN decoding ahead of OCR (milliseconds, against seconds for Tesseract)
+        self.symbol_config = SymbolConfig.from_env()
+        self.symbols = (SymbolDecoder(self.symbol_config, opencv=self.preprocessor.name == OpenCVPreprocessor.name)
+                        if self.symbol_config.enabled else None)
+        # Product list the parsed name and registration are corrected against (memory-mapped, hot reloaded)
+        self.catalog_config = CatalogConfig.from_env()
+        self.catalog = Catalog(self.catalog_config) if self.catalog_config.path else None
+
+    def cache_fingerprint(self) -> str:
+        """Identify the preprocessing, OCR and parsing setup that produced a result"""
+        return json.dumps({
+            "preprocess": self.preprocessor.describe(),
+            "ocr": self.ocr.describe() if self.ocr else "sample",
+            "cascade": self.cascade_config.describe() if self.cascade else "off",
+            "symbols": self.symbols.describe() if self.symbols else "off",
+            "catalog": self.catalog_config.describe() if self.catalog else "off",
+            "patterns": self.common_patterns,
+            "manufacturer_patterns": MANUFACTURER_PATTERNS,
+            "qr": self.qr.config.describe()
+        }, sort_keys=True)
+
+    def cache_version(self) -> str:
+        """The part of a result's provenance that changes without a restart: the loaded catalog index"""
+        return self.catalog.describe() if self.catalog else ""
+
+    def preload(self) -> None:
+        """The fork-safe part of the warm-up, run once by a server that preloads the app before forking.
+
+        Imports the libraries this setup uses and renders the sample's QR
+        code, so every worker starts with them in shared memory. Nothing
+        that starts threads or holds native engines runs here (OCR engines,
+        OpenCV's thread pool); those stay in each worker's warm_up.
+        """
+        names = [self.preprocessor.name] + ([self.ocr.name] if self.ocr else [])
+        for name in names:
+            for module in PRELOAD_MODULES.get(name, ()):
+                importable(module)
+        self.qr.response_fields(asdict(self.parse_drug_info(SAMPLE_TEXT)))
+
+    def warm_up(self) -> None:
+        """Load every OCR model this thread will use, then run the built-in sample through the pipeline"""
+        if self.cascade is not None:
+            # The cascade only runs on the OpenCV backend, so numpy is already loaded
+            blank = np.full((64, 256), 255, dtype=np.uint8)
+            for tier in self.cascade.tiers:
+                self.cascade.backend(tier).image_to_data(blank)
+        self.process_image_bytes(render_sample_label())
+
+    def close(self) -> None:
+        if self.ocr is not None:
+            self.ocr.close()
+        if self.cascade is not None:
+            self.cascade.close()
+
+    def extract_text_from_image(self, image) -> str:
+        """Extract text from image using OCR"""
+        if self.ocr is None:
+            return ""
+        try:
+            # Preprocess image
+            with stage("preprocess"):
+                processed = self.preprocessor.prepare(image)
+
+            # Extract text
+            with stage("ocr"):
+                text = self.ocr.image_to_string(processed).strip()
+            observe("ocr_characters", len(text))
+            return text
+        except Exception as e:
+            print(f"OCR Error: {e}")
+            return ""
+
+    def parse_drug_info(self, text: str) -> DrugInfo:
+        """Parse drug information from extracted text"""
+        return parse_drug_info(text, self.field_parser)
+
+    def generate_qr_code(self, drug_info: DrugInfo) -> Dict[str, Any]:
+        """QR payload plus the code rendered once (or a URL to fetch it), cached by payload"""
+        return self.qr.response_fields(asdict(drug_info))
+
+    def build_response(self, extracted_text: str, ocr_info: Dict[str, Any],
+                       symbols: Optional[SymbolReading] = None, note: Optional[str] = None) -> Dict[str, Any]:
+        """Parse extracted text and build the API response payload"""
+        # Parse drug information; values decoded from a symbol beat OCR guesses
+        with stage("parse"):
+            drug_info = replace(self.parse_drug_info(extracted_text), **(symbols.fields if symbols else {}))
+
+        # OCR typos in the name and registration corrected against the product catalog
+        catalog_info = None
+        if self.catalog is not None:
+            with stage("catalog"):
+                updates, catalog_info = self.catalog.correct(asdict(drug_info), extracted_text)
+            drug_info = replace(drug_info, **updates)
+
+        with stage("qr"):
+            qr_fields = self.generate_qr_code(drug_info)
+
+        response = {
+            "success": True,
+            "extracted_text": extracted_text,
+            "drug_info": {
+                "name": drug_info.name,
+                "batch_number": drug_info.batch_number,
+                "expiry_date": drug_info.expiry_date,
+                "manufacturing_date": drug_info.manufacturing_date,
+                "dosage": drug_info.dosage,
+                "manufacturer": drug_info.manufacturer,
+                "registration_number": drug_info.registration_number,
+                "barcode": drug_info.barcode
+            },
+            "ocr": ocr_info,
+            "symbols": symbols.summary() if symbols else [],
+            **qr_fields
+        }
+        if catalog_info is not None:
+            response["catalog"] = catalog_info
+        if note:
+            response["note"] = note
+        return response
+
+    def process_image_bytes(self, contents: bytes) -> Optional[Dict[str, Any]]:
+        """Run the full decode, OCR, parse and QR pipeline on raw image bytes; None when nothing was read"""
+        # Grayscale decode capped at max_megapixels (reduced JPEG decode)
+        try:
+            with stage("decode"):
+                image = self.preprocessor.decode(contents)
+        except Exception as e:
+            if not self.backends.sample_fallback:
+                raise
+            print(f"❌ Image processing error: {e}")
+            return self.build_response(SAMPLE_TEXT, {"tier": "sample"},
+                                       note="Used sample data due to image processing error")
+        observe("megapixels", self.preprocessor.megapixels(image))
+
+        # Pack symbols first; when they carry the core fields OCR is skipped
+        symbols = None
+        if self.symbols is not None:
+            with stage("symbols"):
+                symbols = self.symbols.read(image)
+        known = symbols.fields if symbols else {}
+
+        # Extract text from image, through the OCR cascade when enabled
+        if symbols and symbols.covers(self.symbol_config.required_fields):
+            extracted_text, ocr_info = "", {"tier": "symbol"}
+            tag("ocr_tier", "symbol")
+        elif self.cascade is not None:
+            reading = self.cascade.run(image, self.preprocessors, known=known)
+            extracted_text, ocr_info = reading.text, reading.summary()
+            observe("ocr_characters", len(extracted_text))
+        else:
+            extracted_text, ocr_info = self.extract_text_from_image(image), {"tier": "single"}
+
+        if not extracted_text and not known:
+            if not self.backends.sample_fallback:
+                return None
+            return self.build_response(SAMPLE_TEXT, {"tier": "sample"},
+                                       note="Used sample data, no text could be extracted")
+        return self.build_response(extracted_text, ocr_info, symbols=symbols)
@@ -0,0 +1,32 @@
+from dataclasses import dataclass
+from typing import Optional
+
+from field_parser import FieldParser, COMMON_PATTERNS
+
+# Fallback OCR output used when Tesseract is unavailable or fails (EXTRACTOR_FALLBACK=sample)
+SAMPLE_TEXT = "Sample drug text for testing: DIPIRONA SÓDICA 500mg Lote: ABC123 Venc: 12/12/2025 Fab: 01/01/2024 MS: 1.0000.0000"
+
+
+@dataclass
+class DrugInfo:
+    name: str = ""
+    batch_number: str = ""
+    expiry_date: str = ""
+    manufacturing_date: str = ""
+    dosage: str = ""
+    manufacturer: str = ""
+    registration_number: str = ""
+    barcode: str = ""
+
+
+_parser: Optional[FieldParser] = None
+
+
+def parse_drug_info(text: str, parser: Optional[FieldParser] = None) -> DrugInfo:
+    """Parse drug information from extracted text (COMMON_PATTERNS unless ``parser`` is given)"""
+    global _parser
+    if parser is None:
+        if _parser is None:
+            _parser = FieldParser(COMMON_PATTERNS)
+        parser = _parser
+    return DrugInfo(**parser.parse(text))
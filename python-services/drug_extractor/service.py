@@ -0,0 +1,517 @@
+import os
+import time
+import hashlib
+import asyncio
+from dataclasses import asdict, fields
+from typing import Dict, Any, List, Optional, Tuple
+
+from fastapi import FastAPI, File, UploadFile, HTTPException, Request, Query, WebSocket, WebSocketDisconnect
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, Response, StreamingResponse, PlainTextResponse
+import uvicorn
+
+from execution_engine import ExtractionEngine, ExecutionConfig, QueueFullError, JobTimeoutError
+from uploads import collect_batch_images, MAX_IMAGE_BYTES
+from metrics import ExtractorMetrics, SlowJobProfiler, StageTimings, collect_timings
+from result_cache import ResultCache
+from qr_codes import MEDIA_TYPES
+from job_queue import JobQueue, JobQueueConfig, JobStore, JobRejectedError
+from labels import SheetRenderer, SheetLayout, LabelSheetRequest, SHEET_FORMATS
+from frames import FrameConfig, FrameSelector, FrameReading, merge_fields, score_frame
+from ocr_cascade import CORE_FIELDS
+
+from .extractor import DrugSpecExtractor
+from .parsing import DrugInfo
+
+# FastAPI application
+app = FastAPI(title="GAUGE Drug Spec Extractor", version="1.0.0")
+
+# CORS middleware
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["http://localhost:3000"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+)
+
+# Initialize extractor, the worker pool that runs it and the result cache
+extractor = DrugSpecExtractor()
+engine = ExtractionEngine(ExecutionConfig.from_env())
+result_cache = ResultCache.from_env(extractor.cache_fingerprint())
+sheet_renderer = SheetRenderer.from_env(renderer=extractor.qr)
+MAX_LABELS = int(os.getenv("EXTRACTOR_MAX_LABELS", 10000))
+# Camera streams and multi-shot uploads: score every frame, OCR only the sharpest distinct few
+frame_config = FrameConfig.from_env()
+DRUG_FIELDS = [f.name for f in fields(DrugInfo)]
+
+# Prometheus metrics, opt-in Server-Timing headers and the slow job profiler
+metrics = ExtractorMetrics.from_env()
+metrics.gauge("extractor_jobs_in_flight", "Extraction jobs running in the worker pool", lambda: engine.stats()["in_flight"])
+metrics.gauge("extractor_queue_depth", "Extraction jobs waiting for a worker", lambda: engine.stats()["queued"])
+metrics.gauge("extractor_cache_entries", "Results held in the in-memory cache", lambda: result_cache.stats()["memory_entries"])
+profiler = SlowJobProfiler.from_env()
+# Workers run the built-in sample before the server accepts connections; /ready reports the outcome
+WARMUP = os.getenv("EXTRACTOR_WARMUP", "true").lower() in ("1", "true", "yes")
+readiness: Dict[str, Any] = {"ready": False, "warmup_seconds": None, "warmup_error": None}
+SERVER_TIMING = os.getenv("EXTRACTOR_SERVER_TIMING", "false").lower() in ("1", "true", "yes")
+
+def run_extraction(contents: bytes) -> Tuple[Optional[Dict[str, Any]], StageTimings]:
+    """Module-level entry point so process pools can pickle the job; returns the result and its stage timings"""
+    with collect_timings() as timings, profiler.profile("extraction"):
+        result = extractor.process_image_bytes(contents)
+    return result, timings
+
+def preload() -> None:
+    """Called by serve.py in the gunicorn master, after the import and before the workers fork"""
+    start = time.perf_counter()
+    extractor.preload()
+    print(f"📦 Preloaded in {time.perf_counter() - start:.2f}s, forking workers")
+
+def warm_up() -> None:
+    """Module-level so process pools can run it as their worker initializer, which must never raise"""
+    try:
+        extractor.warm_up()
+    except Exception as e:
+        print(f"⚠️ Warm-up failed in worker {os.getpid()}: {e}")
+
+def failure_outcome(error: Exception) -> str:
+    if isinstance(error, QueueFullError):
+        return "rejected"
+    if isinstance(error, JobTimeoutError):
+        return "timeout"
+    return "error"
+
+@app.middleware("http")
+async def instrument_requests(request: Request, call_next):
+    """Request latency histogram, plus a Server-Timing header when enabled or asked for"""
+    start = time.perf_counter()
+    response = await call_next(request)
+    elapsed = time.perf_counter() - start
+    route = request.scope.get("route")
+    metrics.request_seconds.observe(elapsed, method=request.method, route=getattr(route, "path", "unmatched"),
+                                    status=str(response.status_code))
+    
+    if SERVER_TIMING or request.headers.get("X-Server-Timing") == "1":
+        timings = getattr(request.state, "timings", None)
+        parts = [timings.server_timing()] if timings is not None and timings.stages else []
+        parts.append(f"total;dur={elapsed * 1000:.1f}")
+        response.headers["Server-Timing"] = ", ".join(parts)
+    return response
+
+@app.on_event("startup")
+async def start_workers():
+    # Uvicorn only starts listening once startup handlers return, so a worker takes no traffic while cold
+    start = time.perf_counter()
+    if WARMUP:
+        try:
+            await asyncio.to_thread(engine.warm_up, warm_up)
+        except Exception as e:
+            readiness["warmup_error"] = str(e)
+            print(f"⚠️ Warm-up failed: {e}")
+    readiness.update(ready=True, warmup_seconds=round(time.perf_counter() - start, 3))
+    print(f"🔥 Worker {os.getpid()} ready in {readiness['warmup_seconds']}s")
+    metrics.start()
+    # Drain jobs queued before a restart without waiting for the next submit
+    jobs.start()
+
+@app.on_event("shutdown")
+async def shutdown_engine():
+    await jobs.stop()
+    metrics.stop()
+    engine.shutdown()
+    sheet_renderer.shutdown()
+    extractor.close()
+
+def is_cacheable(result: Optional[Dict[str, Any]]) -> bool:
+    """Only cache real OCR results, never the sample fallback"""
+    return result is not None and "note" not in result
+
+def job_outcome(result: Optional[Dict[str, Any]]) -> str:
+    if result is None:
+        return "no_text"
+    return "ok" if is_cacheable(result) else "sample"
+
+def cache_key(contents: bytes) -> str:
+    """Result cache key, tied to the catalog index loaded right now so a reload never serves old corrections"""
+    return result_cache.key_for(contents, extractor.cache_version())
+
+async def lookup_cached(key: str) -> Tuple[Optional[Dict[str, Any]], float]:
+    """Result cache lookup, counted and timed"""
+    start = time.perf_counter()
+    cached = await result_cache.aget(key)
+    elapsed = time.perf_counter() - start
+    metrics.cache_lookups.inc(result="hit" if cached is not None else "miss")
+    metrics.stage_seconds.observe(elapsed, stage="cache")
+    return cached, elapsed
+
+async def extract_cached(contents: bytes) -> Tuple[Optional[Dict[str, Any]], bool, StageTimings]:
+    """Return (result, from_cache, timings), running the pipeline only on a cache miss"""
+    key = cache_key(contents)
+    cached, lookup_seconds = await lookup_cached(key)
+    if cached is not None:
+        timings = StageTimings()
+        timings.add("cache", lookup_seconds)
+        return cached, True, timings
+    
+    try:
+        result, timings = await engine.run(run_extraction, contents)
+    except Exception as e:
+        metrics.images.inc(outcome=failure_outcome(e))
+        raise
+    metrics.observe_job(timings, len(contents), job_outcome(result))
+    timings.add("cache", lookup_seconds)
+    if is_cacheable(result):
+        await result_cache.aset(key, result)
+    return result, False, timings
+
+async def extract_batch_cached(contents_list: List[bytes]) -> Tuple[List[Any], List[bool]]:
+    """Batch variant of extract_cached; only cache misses are sent to the worker pool"""
+    keys = [cache_key(contents) for contents in contents_list]
+    results: List[Any] = [(await lookup_cached(key))[0] for key in keys]
+    from_cache = [result is not None for result in results]
+    
+    misses = [index for index, hit in enumerate(from_cache) if not hit]
+    fresh = await engine.run_batch(run_extraction, [contents_list[index] for index in misses])
+    for index, job in zip(misses, fresh):
+        if isinstance(job, Exception):
+            metrics.images.inc(outcome=failure_outcome(job))
+            results[index] = job
+            continue
+        result, timings = job
+        metrics.observe_job(timings, len(contents_list[index]), job_outcome(result))
+        results[index] = result
+        if is_cacheable(result):
+            await result_cache.aset(keys[index], result)
+    return results, from_cache
+
+async def run_job(contents: bytes) -> Optional[Dict[str, Any]]:
+    """Queued job handler: the same cached pipeline as /extract-drug-info, on the same workers"""
+    result, _, _ = await extract_cached(contents)
+    return result
+
+# Persistent asynchronous jobs, drained into the engine by dispatcher tasks on the event loop. The
+# default file is named after the pipeline setup, so services configured differently never share one
+service_id = hashlib.sha256(extractor.cache_fingerprint().encode()).hexdigest()[:12]
+jobs = JobQueue(JobStore(JobQueueConfig.from_env(f"extractor-{service_id}", workers=engine.config.max_workers)), run_job)
+metrics.gauge("extractor_async_jobs", "Asynchronous jobs in the persistent queue, by status",
+              lambda: {(status,): count for status, count in jobs.store.stats().items()}, ["status"],
+              aggregate="shared")
+
+@app.post("/extract-drug-info")
+async def extract_drug_info(request: Request, file: UploadFile = File(...)):
+    """Extract drug information from uploaded image and generate QR code"""
+    try:
+        # Validate file type
+        if not file.content_type.startswith('image/'):
+            raise HTTPException(status_code=400, detail="File must be an image")
+        
+        # Read image
+        contents = await file.read()
+        
+        # Decode, OCR, parse and render the QR code in the worker pool
+        result, from_cache, timings = await extract_cached(contents)
+        request.state.timings = timings
+        
+        if result is None:
+            raise HTTPException(status_code=400, detail="No text could be extracted from the image")
+        
+        return JSONResponse(result, headers={"X-Cache": "HIT" if from_cache else "MISS"})
+        
+    except HTTPException:
+        raise
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    except JobTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+
+@app.post("/extract-drug-info/batch")
+async def extract_drug_info_batch(files: List[UploadFile] = File(...)):
+    """Extract drug information from many images (or zip archives of images) in one request"""
+    images = await collect_batch_images(files)
+    results, from_cache = await extract_batch_cached([contents for _, contents in images])
+    
+    # Report failures per image instead of failing the whole batch
+    items = []
+    for index, ((filename, _), result, cached) in enumerate(zip(images, results, from_cache)):
+        if isinstance(result, QueueFullError):
+            items.append({"index": index, "filename": filename, "success": False,
+                          "error": str(result), "retry_after": result.retry_after})
+        elif isinstance(result, Exception):
+            items.append({"index": index, "filename": filename, "success": False,
+                          "error": f"Error processing image: {str(result)}"})
+        elif result is None:
+            items.append({"index": index, "filename": filename, "success": False,
+                          "error": "No text could be extracted from the image"})
+        else:
+            items.append({"index": index, "filename": filename, "cached": cached, **result})
+    
+    succeeded = sum(1 for item in items if item["success"])
+    return JSONResponse({
+        "success": succeeded > 0,
+        "count": len(items),
+        "succeeded": succeeded,
+        "failed": len(items) - succeeded,
+        "results": items
+    })
+
+async def offer_frame(selector: FrameSelector, contents: bytes) -> Dict[str, Any]:
+    """Score a frame off the event loop and offer it to the selector; returns the per-frame report"""
+    if len(contents) > MAX_IMAGE_BYTES:
+        report = selector.reject("too_large")
+    else:
+        try:
+            scored = await asyncio.to_thread(score_frame, contents, frame_config.score_megapixels)
+            report = selector.add(contents, scored)
+        except Exception:
+            report = selector.reject("invalid")
+    metrics.frames.inc(status=report["status"])
+    return report
+
+async def read_frames(selector: FrameSelector) -> Optional[Dict[str, Any]]:
+    """OCR the selected frames sharpest first and merge them field by field.
+
+    Stops as soon as the merged reading has every core field, so a sharp
+    first frame costs one OCR. Frames answered with sample data never
+    count as a reading; None when no frame could be read.
+    """
+    readings: List[FrameReading] = []
+    rejected: Optional[QueueFullError] = None
+    for frame in selector.best():
+        reading = FrameReading(frame)
+        readings.append(reading)
+        try:
+            result, reading.cached, _ = await extract_cached(frame.contents)
+        except QueueFullError as e:
+            rejected, reading.error = e, str(e)
+            continue
+        except Exception as e:
+            reading.error = f"Error processing image: {str(e)}"
+            continue
+        if not is_cacheable(result):
+            reading.error = "No text could be extracted from the image"
+            continue
+        reading.result, reading.fields = result, result["drug_info"]
+        merged = merge_fields([r.fields for r in readings if r.result], DRUG_FIELDS)
+        if all(merged[name] for name in CORE_FIELDS):
+            break
+
+    read = [reading for reading in readings if reading.result]
+    if not read:
+        if rejected is not None:
+            raise rejected
+        return None
+    drug_info = DrugInfo(**merge_fields([reading.fields for reading in read], DRUG_FIELDS))
+    qr_fields = await asyncio.to_thread(extractor.generate_qr_code, drug_info)
+    symbols = {(symbol["format"], symbol["text"]): symbol for reading in read for symbol in reading.result["symbols"]}
+    return {
+        "success": True,
+        "extracted_text": read[0].result["extracted_text"],
+        "drug_info": asdict(drug_info),
+        "ocr": read[0].result["ocr"],
+        "symbols": list(symbols.values()),
+        **qr_fields,
+        "frames": {**selector.stats(), "read": [reading.summary() for reading in readings]},
+    }
+
+@app.post("/extract-drug-info/frames")
+async def extract_drug_info_frames(files: List[UploadFile] = File(...)):
+    """Several shots of one pack: keep the sharpest distinct frames, OCR those and merge the fields"""
+    if len(files) > frame_config.max_frames:
+        raise HTTPException(status_code=413, detail=f"Too many frames (max {frame_config.max_frames})")
+    selector = FrameSelector(frame_config)
+    reports = [await offer_frame(selector, await upload.read()) for upload in files]
+    try:
+        result = await read_frames(selector)
+    except QueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    if result is None:
+        raise HTTPException(status_code=400, detail="No text could be extracted from any frame")
+    result["frames"]["reports"] = reports
+    return result
+
+@app.websocket("/extract-drug-info/stream")
+async def extract_drug_info_stream(websocket: WebSocket):
+    """Camera stream: each binary message is a frame (JPEG/PNG), answered with its score and selection status.
+
+    The text message "end", or reaching EXTRACTOR_FRAMES_MAX frames, asks
+    for the merged result, sent as {"type": "result", ...} before the
+    server closes the connection.
+    """
+    await websocket.accept()
+    selector = FrameSelector(frame_config)
+    try:
+        while not selector.full:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+            if message.get("bytes") is not None:
+                await websocket.send_json({"type": "frame", **await offer_frame(selector, message["bytes"])})
+            elif (message.get("text") or "").strip().lower() == "end":
+                break
+
+        try:
+            result = await read_frames(selector)
+        except QueueFullError as e:
+            await websocket.send_json({"type": "error", "status": 429, "detail": str(e), "retry_after": e.retry_after})
+        else:
+            if result is None:
+                await websocket.send_json({"type": "error", "status": 400,
+                                           "detail": "No text could be extracted from any frame"})
+            else:
+                await websocket.send_json({"type": "result", **result})
+        await websocket.close()
+    except WebSocketDisconnect:
+        pass
+
+@app.post("/jobs", status_code=202)
+async def submit_job(file: UploadFile = File(...), priority: int = Query(0, ge=-100, le=100)):
+    """Queue an image for extraction; poll GET /jobs/{id} or stream GET /jobs/{id}/events for the result"""
+    if not file.content_type.startswith('image/'):
+        raise HTTPException(status_code=400, detail="File must be an image")
+    contents = await file.read()
+    
+    # Cached images finish immediately, identical images already in flight share one job
+    key = cache_key(contents)
+    cached, _ = await lookup_cached(key)
+    try:
+        if cached is not None:
+            job_id, deduplicated = await jobs.record(key, cached, priority), False
+        else:
+            job_id, deduplicated = await jobs.submit(key, contents, priority)
+    except JobRejectedError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": str(e.retry_after)})
+    
+    job = await jobs.get(job_id)
+    links = {"self": f"/jobs/{job_id}", "events": f"/jobs/{job_id}/events"}
+    return JSONResponse({**job, "deduplicated": deduplicated, "links": links}, status_code=202,
+                        headers={"Location": links["self"]})
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    """Job status, queue position while queued, and the extraction result once done"""
+    job = await jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-sent events: status changes, then a final result or failed event"""
+    if await jobs.get(job_id) is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return StreamingResponse(jobs.events(job_id), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.post("/labels")
+def render_labels(request: LabelSheetRequest, format: str = "pdf", page: int = 1,
+                  columns: int = SheetLayout.columns, rows: int = SheetLayout.rows):
+    """Render a label sheet: a streamed multi-page PDF, or one tiled PNG page"""
+    if format not in SHEET_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(SHEET_FORMATS)}")
+    if not request.labels:
+        raise HTTPException(status_code=400, detail="No labels provided")
+    if len(request.labels) > MAX_LABELS:
+        raise HTTPException(status_code=413, detail=f"Too many labels (max {MAX_LABELS})")
+    if columns < 1 or rows < 1:
+        raise HTTPException(status_code=400, detail="columns and rows must be positive")
+    
+    layout = SheetLayout(columns=columns, rows=rows)
+    labels = [(label.payload, label.caption) for label in request.labels]
+    page_count = -(-len(labels) // layout.per_page)
+    headers = {"X-Page-Count": str(page_count)}
+    
+    if format == "pdf":
+        headers["Content-Disposition"] = 'attachment; filename="labels.pdf"'
+        return StreamingResponse(sheet_renderer.pdf(labels, layout), media_type="application/pdf", headers=headers)
+    
+    if not 1 <= page <= page_count:
+        raise HTTPException(status_code=400, detail=f"page must be between 1 and {page_count}")
+    start = (page - 1) * layout.per_page
+    png = next(sheet_renderer.pages(labels[start:start + layout.per_page], layout, "png"))
+    return Response(png, media_type="image/png", headers=headers)
+
+@app.get("/qr")
+def render_qr(data: str, format: str = "png"):
+    """Render a QR code for a payload returned as qr_payload/qr_url by the extract endpoints"""
+    if format not in MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(MEDIA_TYPES)}")
+    if len(data) > 2048:
+        raise HTTPException(status_code=413, detail="QR payload too long")
+    
+    rendered = extractor.qr.render(data, format)
+    if format == "matrix":
+        return JSONResponse({"size": len(rendered), "rows": rendered})
+    # The URL carries the whole payload, so the response never changes
+    return Response(rendered, media_type=MEDIA_TYPES[format],
+                    headers={"Cache-Control": "public, max-age=31536000, immutable"})
+
+@app.get("/catalog/search")
+def search_catalog(q: str, limit: int = Query(5, ge=1, le=50)):
+    """Fuzzy catalog lookup by product name or MS registration, for manual correction in the UI"""
+    index = extractor.catalog.current() if extractor.catalog else None
+    if index is None:
+        raise HTTPException(status_code=404, detail="No catalog loaded (set EXTRACTOR_CATALOG)")
+    registration = index.match_registration(q, extractor.catalog_config.max_registration_edits)
+    return {
+        "registration": registration.summary() if registration else None,
+        "names": [match.summary() for match in index.search(q, limit)],
+    }
+
+@app.post("/catalog/reload")
+async def reload_catalog():
+    """Re-open the catalog index now instead of at the next periodic check (this process only)"""
+    if extractor.catalog is None:
+        raise HTTPException(status_code=404, detail="No catalog configured (set EXTRACTOR_CATALOG)")
+    try:
+        reloaded = await asyncio.to_thread(extractor.catalog.reload)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Catalog reload failed: {str(e)}")
+    return {"reloaded": reloaded, **extractor.catalog.stats()}
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Prometheus metrics in the text exposition format"""
+    # With several server processes this merges every worker's snapshot file
+    body = await asyncio.to_thread(metrics.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+@app.get("/cache/stats")
+async def cache_stats():
+    """Result cache hit/miss counters"""
+    return {**result_cache.stats(), "qr": extractor.qr.stats()}
+
+@app.get("/ready")
+async def readiness_check():
+    """Readiness of the worker answering.
+
+    A worker only accepts connections once its startup warm-up is done,
+    so over HTTP this is 200 as soon as any worker serves. Connections that arrive earlier wait in the listen backlog, and
+    the 503 is only seen by callers inside the process.
+    """
+    return JSONResponse({"status": "ready" if readiness["ready"] else "warming", **readiness},
+                        status_code=200 if readiness["ready"] else 503)
+
+@app.get("/health")
+async def health_check():
+    """Health check endpoint"""
+    return {"status": "healthy", "service": "drug-spec-extractor", "backends": backends_info(),
+            "workers": engine.stats(), "cache": result_cache.stats(), "jobs": await jobs.stats(),
+            "catalog": extractor.catalog.stats() if extractor.catalog else None}
+
+def backends_info() -> Dict[str, Any]:
+    return {
+        "preprocess": extractor.preprocessor.name,
+        "ocr": extractor.ocr.name if extractor.ocr else None,
+        "cascade": extractor.cascade is not None,
+        "fallback": extractor.backends.fallback,
+    }
+
+def main():
+    print(f"🚀 Starting GAUGE Drug Extraction Service on port 8000 ({backends_info()})")
+    uvicorn.run(app, host="0.0.0.0", port=8000)
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
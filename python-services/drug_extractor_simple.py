@@ -1,299 +1,19 @@
-import os
-import re
-import json
-import base64
-from io import BytesIO
-from typing import Dict, Any, Optional
-from dataclasses import dataclass
-from datetime import datetime
-
-try:
-    import pytesseract
-    HAS_TESSERACT = True
-except ImportError:
-    HAS_TESSERACT = False
-    print("Tesseract not available")
-
-import qrcode
-from PIL import Image, ImageEnhance, ImageFilter
-from fastapi import FastAPI, File, UploadFile, HTTPException
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import uvicorn
-
-@dataclass
-class DrugInfo:
-    name: str = ""
-    batch_number: str = ""
-    expiry_date: str = ""
-    manufacturing_date: str = ""
-    dosage: str = ""
-    manufacturer: str = ""
-    registration_number: str = ""
-    barcode: str = ""
-
-class DrugSpecExtractor:
-    def __init__(self):
-        self.common_patterns = {
-            'batch': [
-                r'(?:lote|batch|lot)\s*[:\-]?\s*([A-Z0-9]+)',
-                r'(?:L|B)\s*[:\-]?\s*([A-Z0-9]+)',
-                r'lote\s+([A-Z0-9]+)'
-            ],
-            'expiry': [
-                r'(?:venc|exp|validade|expires?)\s*[:\-]?\s*(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})',
-                r'(?:val|valid)\s*[:\-]?\s*(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})',
-                r'(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})'
-            ],
-            'manufacturing': [
-                r'(?:fab|mfg|fabr)\s*[:\-]?\s*(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})',
-                r'fabricação\s*[:\-]?\s*(\d{1,2}[\/\-]\d{1,2}[\/\-]\d{2,4})'
-            ],
-            'dosage': [
-                r'(\d+\s*mg)',
-                r'(\d+\s*ml)',
-                r'(\d+\s*g)',
-                r'(\d+\s*mcg)',
-                r'(\d+\s*ui)'
-            ],
-            'registration': [
-                r'(?:ms|reg|registro)\s*[:\-]?\s*([0-9\.\-]+)',
-                r'registro\s+ms\s*[:\-]?\s*([0-9\.\-]+)'
-            ]
-        }
-
-    def enhance_image(self, image: Image.Image) -> Image.Image:
-        """Enhance image for better OCR results using PIL"""
-        try:
-            # Convert to grayscale
-            if image.mode != 'L':
-                image = image.convert('L')
-            
-            # Enhance contrast
-            enhancer = ImageEnhance.Contrast(image)
-            image = enhancer.enhance(2.0)
-            
-            # Enhance sharpness
-            enhancer = ImageEnhance.Sharpness(image)
-            image = enhancer.enhance(2.0)
-            
-            # Apply a slight blur to reduce noise
-            image = image.filter(ImageFilter.MedianFilter(3))
-            
-            return image
-        except Exception as e:
-            print(f"Image enhancement error: {e}")
-            return image
-
-    def extract_text_from_image(self, image: Image.Image) -> str:
-        """Extract text from image using OCR"""
-        if not HAS_TESSERACT:
-            return "Sample drug text for testing: DIPIRONA SÓDICA 500mg Lote: ABC123 Venc: 12/12/2025 Fab: 01/01/2024 MS: 1.0000.0000"
-        
-        try:
-            # Enhance image
-            enhanced = self.enhance_image(image)
-            
-            # OCR configuration for better results
-            config = '--oem 3 --psm 6'
-            
-            # Extract text
-            text = pytesseract.image_to_string(enhanced, config=config)
-            return text.strip()
-        except Exception as e:
-            print(f"OCR Error: {e}")
-            # Return sample text for testing
-            return "Sample drug text for testing: DIPIRONA SÓDICA 500mg Lote: ABC123 Venc: 12/12/2025 Fab: 01/01/2024 MS: 1.0000.0000"
+"""The extraction service on the pure-PIL backend, answering with sample data when OCR is unavailable.
 
-    def parse_drug_info(self, text: str) -> DrugInfo:
-        """Parse drug information from extracted text"""
-        drug_info = DrugInfo()
-        text_lower = text.lower()
-        
-        # Extract drug name (first meaningful line, often the largest text)
-        lines = [line.strip() for line in text.split('\n') if line.strip()]
-        if lines:
-            # Find the longest line that's likely the drug name
-            potential_names = [line for line in lines[:5] if len(line) > 3 and not any(char.isdigit() for char in line[:3])]
-            if potential_names:
-                drug_info.name = potential_names[0]
+Kept as an entry point for existing deployments (serve.py --app
+drug_extractor_simple); it is the drug_extractor package with
 
-        # Extract information using patterns
-        for field, patterns in self.common_patterns.items():
-            for pattern in patterns:
-                match = re.search(pattern, text_lower, re.IGNORECASE)
-                if match:
-                    value = match.group(1).strip()
-                    if field == 'batch':
-                        drug_info.batch_number = value.upper()
-                    elif field == 'expiry':
-                        drug_info.expiry_date = value
-                    elif field == 'manufacturing':
-                        drug_info.manufacturing_date = value
-                    elif field == 'dosage':
-                        drug_info.dosage = value
-                    elif field == 'registration':
-                        drug_info.registration_number = value
-                    break
+    EXTRACTOR_PREPROCESS_BACKEND=pil EXTRACTOR_FALLBACK=sample
 
-        # Extract manufacturer (look for common pharmaceutical company patterns)
-        manufacturer_patterns = [
-            r'(?:laboratório|lab|pharma|farmacêutica)\s+([a-zA-Z\s]+)',
-            r'([a-zA-Z\s]+)\s+(?:laboratório|lab|pharma|farmacêutica)',
-        ]
-        
-        for pattern in manufacturer_patterns:
-            match = re.search(pattern, text_lower, re.IGNORECASE)
-            if match:
-                drug_info.manufacturer = match.group(1).strip().title()
-                break
-
-        return drug_info
-
-    def generate_qr_code(self, drug_info: DrugInfo) -> str:
-        """Generate QR code with drug information"""
-        # Create data structure for QR code
-        qr_data = {
-            "type": "pharmaceutical_product",
-            "timestamp": datetime.now().isoformat(),
-            "data": {
-                "name": drug_info.name,
-                "batch_number": drug_info.batch_number,
-                "expiry_date": drug_info.expiry_date,
-                "manufacturing_date": drug_info.manufacturing_date,
-                "dosage": drug_info.dosage,
-                "manufacturer": drug_info.manufacturer,
-                "registration_number": drug_info.registration_number
-            }
-        }
-        
-        # Generate QR code
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        
-        qr.add_data(json.dumps(qr_data))
-        qr.make(fit=True)
-        
-        # Create QR code image
-        qr_image = qr.make_image(fill_color="black", back_color="white")
-        
-        # Convert to base64 for web display
-        buffer = BytesIO()
-        qr_image.save(buffer, format='PNG')
-        qr_base64 = base64.b64encode(buffer.getvalue()).decode()
-        
-        return qr_base64
-
-# FastAPI application
-app = FastAPI(title="GAUGE Drug Spec Extractor", version="1.0.0")
-
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["http://localhost:3000"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Initialize extractor
-extractor = DrugSpecExtractor()
+as defaults. Set through the environment so process pool workers pick
+them up too.
+"""
+import os
 
-@app.post("/extract-drug-info")
-async def extract_drug_info(file: UploadFile = File(...)):
-    """Extract drug information from uploaded image and generate QR code"""
-    try:
-        # Validate file type
-        if not file.content_type.startswith('image/'):
-            raise HTTPException(status_code=400, detail="File must be an image")
-        
-        # Read image
-        contents = await file.read()
-        print(f"📷 Processing image: {file.filename}, size: {len(contents)} bytes, type: {file.content_type}")
-        
-        # Create BytesIO object and try to open image
-        image_buffer = BytesIO(contents)
-        
-        try:
-            image = Image.open(image_buffer)
-            # Convert to RGB if necessary (handles different image modes)
-            if image.mode != 'RGB':
-                print(f"🔄 Converting image from {image.mode} to RGB")
-                image = image.convert('RGB')
-            print(f"✅ Image loaded successfully: {image.size[0]}x{image.size[1]} pixels")
-        except Exception as img_error:
-            print(f"❌ Image processing error: {img_error}")
-            # If image can't be processed, use sample data
-            extracted_text = "Sample drug text for testing: DIPIRONA SÓDICA 500mg Lote: ABC123 Venc: 12/12/2025 Fab: 01/01/2024 MS: 1.0000.0000"
-            drug_info = extractor.parse_drug_info(extracted_text)
-            qr_code_base64 = extractor.generate_qr_code(drug_info)
-            
-            return JSONResponse({
-                "success": True,
-                "extracted_text": extracted_text,
-                "drug_info": {
-                    "name": drug_info.name,
-                    "batch_number": drug_info.batch_number,
-                    "expiry_date": drug_info.expiry_date,
-                    "manufacturing_date": drug_info.manufacturing_date,
-                    "dosage": drug_info.dosage,
-                    "manufacturer": drug_info.manufacturer,
-                    "registration_number": drug_info.registration_number
-                },
-                "qr_code": qr_code_base64,
-                "qr_data_url": f"data:image/png;base64,{qr_code_base64}",
-                "note": "Used sample data due to image processing error"
-            })
-        
-        # Extract text from image
-        extracted_text = extractor.extract_text_from_image(image)
-        
-        if not extracted_text:
-            # Use sample data for testing
-            extracted_text = "Sample drug text for testing: DIPIRONA SÓDICA 500mg Lote: ABC123 Venc: 12/12/2025 Fab: 01/01/2024 MS: 1.0000.0000"
-        
-        # Parse drug information
-        drug_info = extractor.parse_drug_info(extracted_text)
-        
-        # Generate QR code
-        qr_code_base64 = extractor.generate_qr_code(drug_info)
-        
-        return JSONResponse({
-            "success": True,
-            "extracted_text": extracted_text,
-            "drug_info": {
-                "name": drug_info.name,
-                "batch_number": drug_info.batch_number,
-                "expiry_date": drug_info.expiry_date,
-                "manufacturing_date": drug_info.manufacturing_date,
-                "dosage": drug_info.dosage,
-                "manufacturer": drug_info.manufacturer,
-                "registration_number": drug_info.registration_number
-            },
-            "qr_code": qr_code_base64,
-            "qr_data_url": f"data:image/png;base64,{qr_code_base64}"
-        })
-        
-    except HTTPException:
-        # Re-raise HTTPExceptions (like file validation errors)
-        raise
-    except Exception as e:
-        print(f"❌ Unexpected error in extract_drug_info: {str(e)}")
-        print(f"📝 Error type: {type(e).__name__}")
-        import traceback
-        print(f"🔍 Traceback: {traceback.format_exc()}")
-        raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+os.environ.setdefault("EXTRACTOR_PREPROCESS_BACKEND", "pil")
+os.environ.setdefault("EXTRACTOR_FALLBACK", "sample")
 
-@app.get("/health")
-async def health_check():
-    """Health check endpoint"""
-    return {"status": "healthy", "service": "drug-spec-extractor"}
+from drug_extractor.service import app, engine, extractor, run_extraction, preload, warm_up, main  # noqa: E402,F401
 
 if __name__ == "__main__":
-    print("🚀 Starting GAUGE Drug Extraction Service on port 8000")
-    print("📱 Tesseract available:", HAS_TESSERACT)
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    main()
@@ -0,0 +1,185 @@
+import os
+import asyncio
+import threading
+from dataclasses import dataclass
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+
+def _noop() -> None:
+    pass
+
+
+class QueueFullError(Exception):
+    """Raised when the engine cannot admit another job"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Extraction queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class JobTimeoutError(Exception):
+    """Raised when a job does not finish within the configured timeout"""
+
+
+@dataclass
+class ExecutionConfig:
+    mode: str = "thread"            # "thread" or "process"
+    max_workers: int = 2            # jobs running at the same time
+    max_queue: int = 8              # jobs waiting for a free worker
+    job_timeout: float = 30.0       # seconds before the caller gives up on a job
+    retry_after: int = 5            # seconds suggested to clients on 429
+
+    @classmethod
+    def from_env(cls) -> "ExecutionConfig":
+        """Build the configuration from EXTRACTOR_* environment variables"""
+        workers = int(os.getenv("EXTRACTOR_MAX_WORKERS", os.cpu_count() or 2))
+        return cls(
+            mode=os.getenv("EXTRACTOR_EXECUTOR", "thread").lower(),
+            max_workers=max(1, workers),
+            max_queue=max(0, int(os.getenv("EXTRACTOR_MAX_QUEUE", workers * 4))),
+            job_timeout=float(os.getenv("EXTRACTOR_JOB_TIMEOUT", 30)),
+            retry_after=int(os.getenv("EXTRACTOR_RETRY_AFTER", 5)),
+        )
+
+
+class ExtractionEngine:
+    """Bounded worker pool that runs blocking extraction work off the event loop.
+
+    At most ``max_workers`` jobs run at once and at most ``max_queue`` more wait
+    for a worker; anything beyond that is rejected with ``QueueFullError`` so the
+    HTTP layer can answer 429 instead of piling up requests. A job that exceeds
+    ``job_timeout`` raises ``JobTimeoutError`` for the caller, but keeps its slot
+    until the worker actually finishes so the limits stay honest.
+    """
+
+    def __init__(self, config: Optional[ExecutionConfig] = None,
+                 initializer: Optional[Callable[[], None]] = None):
+        self.config = config or ExecutionConfig()
+        self._initializer = initializer
+        self._executor: Optional[Executor] = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._running = 0
+
+    @property
+    def capacity(self) -> int:
+        return self.config.max_workers + self.config.max_queue
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.config.mode == "process":
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.config.max_workers,
+                    initializer=self._initializer,
+                )
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.config.max_workers,
+                    thread_name_prefix="extractor",
+                    initializer=self._initializer,
+                )
+        return self._executor
+
+    def _release(self, _future) -> None:
+        with self._lock:
+            self._pending -= 1
+
+    def _wrap(self, fn: Callable[..., Any]) -> Callable[..., Any]:
+        if self.config.mode == "process":
+            # Functions must stay picklable for process pools
+            return fn
+
+        def tracked(*args):
+            with self._lock:
+                self._running += 1
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self._running -= 1
+        return tracked
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run ``fn(*args)`` in the pool, enforcing backpressure and the job timeout"""
+        with self._lock:
+            if self._pending >= self.capacity:
+                raise QueueFullError(self.config.retry_after)
+            self._pending += 1
+
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self._get_executor(), self._wrap(fn), *args)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout=self.config.job_timeout)
+        except asyncio.TimeoutError:
+            raise JobTimeoutError(f"Extraction exceeded {self.config.job_timeout:.0f}s")
+
+    async def run_batch(self, fn: Callable[..., Any], items: Sequence[Any]) -> List[Any]:
+        """Run ``fn(item)`` for every item, returning results or exceptions in input order.
+
+        A single batch never holds more than ``max_workers`` slots at a time, so
+        a large upload cannot starve other requests of the wait queue.
+        """
+        semaphore = asyncio.Semaphore(self.config.max_workers)
+
+        async def run_one(item):
+            async with semaphore:
+                return await self.run(fn, item)
+
+        return await asyncio.gather(*(run_one(item) for item in items), return_exceptions=True)
+
+    def warm_up(self, fn: Callable[[], Any], timeout: float = 120.0) -> None:
+        """Run ``fn()`` on every worker before traffic arrives (blocking).
+
+        Thread pools get one call per thread, held at a barrier so no thread
+        runs it twice. Process pools run ``fn`` as each process's initializer
+        (it must be picklable), unless the engine already has one.
+        """
+        workers = self.config.max_workers
+        if self.config.mode == "process":
+            if self._executor is None and self._initializer is None:
+                self._initializer = fn
+            # Forked pools start every process on the first submit
+            wait([self._get_executor().submit(_noop) for _ in range(workers)], timeout=timeout)
+            return
+
+        barrier = threading.Barrier(workers, timeout=timeout)
+
+        def run_once():
+            try:
+                fn()
+            finally:
+                try:
+                    barrier.wait()
+                except threading.BrokenBarrierError:
+                    pass
+
+        futures = [self._get_executor().submit(run_once) for _ in range(workers)]
+        for future in futures:
+            future.result(timeout=timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Snapshot of the pool occupancy"""
+        with self._lock:
+            pending = self._pending
+            running = self._running
+        if self.config.mode == "process":
+            running = min(pending, self.config.max_workers)
+        return {
+            "mode": self.config.mode,
+            "max_workers": self.config.max_workers,
+            "max_queue": self.config.max_queue,
+            "in_flight": running,
+            "queued": max(0, pending - running),
+        }
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,168 @@
+import os
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from PIL import Image, ImageFilter, ImageStat
+
+from lazy_imports import LazyModule, importable
+from image_pipeline import decode_image
+
+cv2 = LazyModule("cv2")
+np = LazyModule("numpy")
+
+# 3x3 Laplacian for the Pillow fallback; the offset keeps negative responses from clipping at 0
+LAPLACIAN = ImageFilter.Kernel((3, 3), [0, 1, 0, 1, -4, 1, 0, 1, 0], scale=1, offset=128)
+
+
+@dataclass
+class FrameConfig:
+    best_frames: int = 3                # frames OCR'd at most, sharpest first
+    max_frames: int = 60                # frames accepted per stream or upload
+    duplicate_distance: int = 6         # dHash bits (of 64) two frames may differ by and still be one shot
+    min_relative_sharpness: float = 0.5  # candidates below this fraction of the sharpest frame are never OCR'd
+    score_megapixels: float = 0.3       # decode budget for scoring; every frame is scored at the same size
+
+    @classmethod
+    def from_env(cls) -> "FrameConfig":
+        """Build the configuration from EXTRACTOR_FRAMES_* environment variables"""
+        return cls(
+            best_frames=max(1, int(os.getenv("EXTRACTOR_FRAMES_BEST", 3))),
+            max_frames=max(1, int(os.getenv("EXTRACTOR_FRAMES_MAX", 60))),
+            duplicate_distance=int(os.getenv("EXTRACTOR_FRAMES_DUPLICATE_DISTANCE", 6)),
+            min_relative_sharpness=float(os.getenv("EXTRACTOR_FRAMES_MIN_RELATIVE_SHARPNESS", 0.5)),
+            score_megapixels=float(os.getenv("EXTRACTOR_FRAMES_SCORE_MEGAPIXELS", 0.3)),
+        )
+
+
+def sharpness(gray: Image.Image) -> float:
+    """Variance of the Laplacian: high for crisp edges, near zero for motion blur or defocus"""
+    if importable("cv2"):
+        return float(cv2.Laplacian(np.asarray(gray), cv2.CV_64F).var())
+    return ImageStat.Stat(gray.filter(LAPLACIAN)).var[0]
+
+
+def dhash(gray: Image.Image) -> int:
+    """64-bit difference hash: one bit per horizontally adjacent pair of a 9x8 thumbnail"""
+    pixels = list(gray.resize((9, 8), Image.Resampling.BILINEAR).getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+
+def score_frame(contents: bytes, score_megapixels: float) -> Tuple[float, int]:
+    """(sharpness, dhash) of an encoded frame, decoded small: scoring must cost far less than OCR"""
+    gray = decode_image(contents, "L", score_megapixels)
+    return sharpness(gray), dhash(gray)
+
+
+@dataclass
+class Frame:
+    index: int
+    contents: bytes
+    sharpness: float
+    hash: int
+
+
+class FrameSelector:
+    """Keeps the sharpest distinct frames of a camera stream or multi-shot upload.
+
+    Each frame is scored on a small decode. A frame within
+    ``duplicate_distance`` bits of a kept one is the same shot and only
+    replaces it when sharper; otherwise it joins the candidates, of which
+    the ``best_frames`` sharpest are kept. Only kept frames hold their
+    bytes, so memory stays bounded however long the stream runs.
+    """
+
+    def __init__(self, config: FrameConfig):
+        self.config = config
+        self.kept: List[Frame] = []
+        self.received = 0
+        self.duplicates = 0
+        self.discarded = 0
+
+    @property
+    def full(self) -> bool:
+        return self.received >= self.config.max_frames
+
+    def add(self, contents: bytes, scored: Tuple[float, int]) -> Dict[str, Any]:
+        """Offer a frame with its score_frame() result; returns the per-frame report sent to the client"""
+        frame = Frame(self.received, contents, *scored)
+        self.received += 1
+
+        status = "kept"
+        twin = next((kept for kept in self.kept
+                     if bin(kept.hash ^ frame.hash).count("1") <= self.config.duplicate_distance), None)
+        if twin is not None:
+            self.duplicates += 1
+            if frame.sharpness <= twin.sharpness:
+                status = "duplicate"
+            else:
+                self.kept[self.kept.index(twin)] = frame
+                status = "replaced"
+        else:
+            self.kept.append(frame)
+        self.kept.sort(key=lambda kept: kept.sharpness, reverse=True)
+        if len(self.kept) > self.config.best_frames:
+            dropped = self.kept.pop()
+            self.discarded += 1
+            if dropped is frame:
+                status = "discarded"
+
+        return {"index": frame.index, "sharpness": round(frame.sharpness, 1), "status": status,
+                "kept": [kept.index for kept in self.kept]}
+
+    def reject(self, status: str) -> Dict[str, Any]:
+        """Count a frame that could not be scored (too large, not an image)"""
+        self.received += 1
+        return {"index": self.received - 1, "sharpness": None, "status": status,
+                "kept": [kept.index for kept in self.kept]}
+
+    def best(self) -> List[Frame]:
+        """Frames worth OCR, sharpest first"""
+        if not self.kept:
+            return []
+        floor = self.kept[0].sharpness * self.config.min_relative_sharpness
+        return [frame for frame in self.kept if frame.sharpness >= floor]
+
+    def stats(self) -> Dict[str, int]:
+        return {"received": self.received, "duplicates": self.duplicates, "discarded": self.discarded,
+                "candidates": len(self.kept)}
+
+
+def merge_fields(readings: List[Dict[str, str]], names: List[str]) -> Dict[str, str]:
+    """Field-by-field vote over per-frame drug_info dicts ordered sharpest first.
+
+    The most frequent non-empty value wins; ties go to the sharper frame,
+    so a single clean read beats nothing and two agreeing reads beat one
+    garbled read.
+    """
+    merged = {}
+    for name in names:
+        votes = Counter(reading[name] for reading in readings if reading.get(name))
+        if not votes:
+            merged[name] = ""
+            continue
+        top = max(votes.values())
+        merged[name] = next(reading[name] for reading in readings if votes.get(reading.get(name)) == top)
+    return merged
+
+
+@dataclass
+class FrameReading:
+    frame: Frame
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    cached: bool = False
+    fields: Dict[str, str] = field(default_factory=dict)
+
+    def summary(self) -> Dict[str, Any]:
+        summary = {"index": self.frame.index, "sharpness": round(self.frame.sharpness, 1), "cached": self.cached}
+        if self.error:
+            summary["error"] = self.error
+        else:
+            summary["tier"] = ((self.result or {}).get("ocr") or {}).get("tier")
+            summary["fields"] = sorted(name for name, value in self.fields.items() if value)
+        return summary
@@ -0,0 +1,247 @@
+import os
+from io import BytesIO
+from dataclasses import dataclass
+from typing import List, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+
+from lazy_imports import LazyModule
+
+# Only the ndarray helpers below need these, PIL-only callers never load them
+cv2 = LazyModule("cv2")
+np = LazyModule("numpy")
+
+Box = Tuple[int, int, int, int]  # x, y, width, height
+
+# Text of the built-in warm-up label
+SAMPLE_LABEL_LINES = (
+    "DIPIRONA SÓDICA 500mg",
+    "Lote: ABC123",
+    "Fab: 01/01/2024   Venc: 12/12/2025",
+    "MS: 1.0000.0000",
+)
+
+
+@dataclass
+class PreprocessConfig:
+    max_megapixels: float = 3.0         # decode budget, phone photos are scaled down to this
+    target_text_height: int = 32        # text line height (px) Tesseract reads best at
+    detect_text_regions: bool = True    # OCR only the detected text lines (OpenCV only)
+
+    @classmethod
+    def from_env(cls) -> "PreprocessConfig":
+        """Build the configuration from EXTRACTOR_* environment variables"""
+        return cls(
+            max_megapixels=float(os.getenv("EXTRACTOR_MAX_MEGAPIXELS", 3.0)),
+            target_text_height=int(os.getenv("EXTRACTOR_TARGET_TEXT_HEIGHT", 32)),
+            detect_text_regions=os.getenv("EXTRACTOR_DETECT_TEXT_REGIONS", "true").lower() in ("1", "true", "yes"),
+        )
+
+    def describe(self) -> str:
+        return f"mp={self.max_megapixels}:text={self.target_text_height}:roi={int(self.detect_text_regions)}"
+
+
+def decode_image(contents: bytes, mode: str = "L", max_megapixels: float = 3.0) -> Image.Image:
+    """Decode image bytes to ``mode`` without materializing more than ``max_megapixels``.
+
+    JPEGs are decoded in draft mode, letting libjpeg scale by 1/2, 1/4 or 1/8
+    during the DCT and convert to grayscale on the fly; other formats are
+    reduced right after decoding.
+    """
+    image = Image.open(BytesIO(contents))
+    width, height = image.size
+    max_pixels = max_megapixels * 1_000_000
+
+    if max_pixels > 0 and width * height > max_pixels:
+        ratio = (max_pixels / (width * height)) ** 0.5
+        target = (max(1, int(width * ratio)), max(1, int(height * ratio)))
+        # draft() only picks a scale that keeps the image at least as big as target
+        image.draft(mode, target)
+        if image.size[0] * image.size[1] > max_pixels:
+            image = image.convert(mode) if image.mode != mode else image
+            image = image.resize(target, Image.Resampling.BILINEAR, reducing_gap=2.0)
+    else:
+        image.draft(mode, image.size)
+
+    return image.convert(mode) if image.mode != mode else image
+
+
+def decode_gray_array(contents: bytes, max_megapixels: float = 3.0) -> "np.ndarray":
+    """Decode image bytes straight into an 8-bit grayscale ndarray.
+
+    The encoded bytes are wrapped without copying and handed to
+    ``cv2.imdecode`` with an IMREAD_REDUCED_GRAYSCALE_* flag picked from the
+    header size, so JPEGs are scaled during the DCT and no RGB bitmap is
+    ever allocated. Formats OpenCV cannot read go through ``decode_image``.
+    """
+    width, height = Image.open(BytesIO(contents)).size  # header only
+    max_pixels = max_megapixels * 1_000_000
+
+    factor = 1
+    if max_pixels > 0:
+        while factor < 8 and (width // factor) * (height // factor) > max_pixels:
+            factor *= 2
+    flag = {
+        1: cv2.IMREAD_GRAYSCALE,
+        2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+        4: cv2.IMREAD_REDUCED_GRAYSCALE_4,
+        8: cv2.IMREAD_REDUCED_GRAYSCALE_8,
+    }[factor]
+
+    gray = cv2.imdecode(np.frombuffer(contents, dtype=np.uint8), flag)
+    if gray is None:
+        return np.array(decode_image(contents, "L", max_megapixels))
+
+    return fit_megapixels(gray, max_megapixels)
+
+
+def fit_megapixels(gray: "np.ndarray", max_megapixels: float) -> "np.ndarray":
+    """Scale ``gray`` down (area interpolation) to at most ``max_megapixels``; 0 means no limit"""
+    pixels = gray.shape[0] * gray.shape[1]
+    max_pixels = max_megapixels * 1_000_000
+    if max_pixels > 0 and pixels > max_pixels:
+        ratio = (max_pixels / pixels) ** 0.5
+        gray = cv2.resize(gray, None, fx=ratio, fy=ratio, interpolation=cv2.INTER_AREA)
+    return gray
+
+
+def detect_text_lines(gray: "np.ndarray") -> List[Box]:
+    """Find text line boxes with a gradient + Otsu + horizontal closing pass.
+
+    Detection runs on a copy at most 1000 px wide, boxes are mapped back
+    to ``gray`` coordinates.
+    """
+    height, width = gray.shape[:2]
+    scale = min(1.0, 1000.0 / width)
+    small = cv2.resize(gray, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+
+    gradient = cv2.morphologyEx(small, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+    _, binary = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    connected = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 1)))
+    contours, _ = cv2.findContours(connected, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if w < 8 or h < 6 or h > small.shape[0] * 0.5:
+            continue
+        # Text lines are dense in edges, large flat shapes and speckles are not
+        fill = cv2.countNonZero(binary[y:y + h, x:x + w]) / float(w * h)
+        if fill < 0.35:
+            continue
+        boxes.append((int(x / scale), int(y / scale), int(w / scale), int(h / scale)))
+    return boxes
+
+
+def _group_rows(boxes: List[Box]) -> List[Box]:
+    """Merge boxes that share a text row into one box per row, top to bottom"""
+    rows: List[List[int]] = []
+    for x, y, w, h in sorted(boxes, key=lambda b: (b[1], b[0])):
+        center = y + h / 2
+        for row in rows:
+            if row[1] <= center <= row[3]:
+                row[0], row[1] = min(row[0], x), min(row[1], y)
+                row[2], row[3] = max(row[2], x + w), max(row[3], y + h)
+                break
+        else:
+            rows.append([x, y, x + w, y + h])
+    return [(x0, y0, x1 - x0, y1 - y0) for x0, y0, x1, y1 in rows]
+
+
+def normalize_for_ocr(gray: "np.ndarray", config: PreprocessConfig) -> "np.ndarray":
+    """Crop ``gray`` to its text rows and scale them to the target text height.
+
+    The row crops are stacked vertically into one compact image, so a
+    single OCR call covers only the pixels that carry text. Images where
+    no text rows are found are returned unchanged.
+    """
+    if not config.detect_text_regions:
+        return gray
+
+    boxes = detect_text_lines(gray)
+    if not boxes:
+        return gray
+
+    text_height = float(np.median([h for _, _, _, h in boxes]))
+    scale = min(2.0, max(0.25, config.target_text_height / max(text_height, 1.0)))
+    pad = int(text_height * 0.4) + 2
+    image_h, image_w = gray.shape[:2]
+
+    crops = []
+    for x, y, w, h in _group_rows(boxes):
+        x0, y0 = max(0, x - pad), max(0, y - pad)
+        x1, y1 = min(image_w, x + w + pad), min(image_h, y + h + pad)
+        crops.append(gray[y0:y1, x0:x1])
+
+    # Fall back to a single bounding crop when rows cover most of the image anyway
+    if sum(c.shape[0] * c.shape[1] for c in crops) > 0.8 * image_w * image_h:
+        x0 = max(0, min(b[0] for b in boxes) - pad)
+        y0 = max(0, min(b[1] for b in boxes) - pad)
+        x1 = min(image_w, max(b[0] + b[2] for b in boxes) + pad)
+        y1 = min(image_h, max(b[1] + b[3] for b in boxes) + pad)
+        crops = [gray[y0:y1, x0:x1]]
+
+    interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC
+    crops = [cv2.resize(c, None, fx=scale, fy=scale, interpolation=interpolation) for c in crops]
+
+    # Pad with replicated edge pixels so the seams between crops do not
+    # turn into black frames after thresholding
+    gap = config.target_text_height // 2
+    width = max(c.shape[1] for c in crops) + 2 * gap
+    rows = [
+        cv2.copyMakeBorder(c, gap, gap if i == len(crops) - 1 else 0, gap, width - c.shape[1] - gap, cv2.BORDER_REPLICATE)
+        for i, c in enumerate(crops)
+    ]
+    return rows[0] if len(rows) == 1 else cv2.vconcat(rows)
+
+
+def skew_angle(gray: "np.ndarray") -> float:
+    """Rotation (degrees, as cv2.getRotationMatrix2D takes it) that levels the text lines.
+
+    Median over rotated boxes fitted to line-shaped ink blobs, measured on a
+    copy at most 1000 px wide.
+    """
+    height, width = gray.shape[:2]
+    scale = min(1.0, 1000.0 / width)
+    small = cv2.resize(gray, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA) if scale < 1.0 else gray
+
+    _, binary = cv2.threshold(small, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+    lines = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (15, 3)))
+    contours, _ = cv2.findContours(lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    angles = []
+    for contour in contours:
+        (_, _), (w, h), angle = cv2.minAreaRect(contour)
+        # minAreaRect reports either side as the width depending on the OpenCV version
+        if w < h:
+            w, h, angle = h, w, angle - 90
+        if w < 40 or w < 3 * h:
+            continue
+        angles.append((angle + 90) % 180 - 90)
+    return float(np.median(angles)) if angles else 0.0
+
+
+def deskew(gray: "np.ndarray", min_angle: float = 0.5) -> "np.ndarray":
+    """Rotate ``gray`` so its text lines are horizontal; returned unchanged below ``min_angle`` degrees"""
+    angle = skew_angle(gray)
+    if abs(angle) < min_angle:
+        return gray
+    height, width = gray.shape[:2]
+    matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+    return cv2.warpAffine(gray, matrix, (width, height), flags=cv2.INTER_CUBIC, borderMode=cv2.BORDER_REPLICATE)
+
+
+def render_sample_label(width: int = 800, height: int = 400) -> bytes:
+    """JPEG of a clean built-in label, run through the pipeline to warm workers up before traffic"""
+    image = Image.new("L", (width, height), 240)
+    draw = ImageDraw.Draw(image)
+    size = height // 10
+    try:
+        font = ImageFont.truetype("DejaVuSans.ttf", size)
+    except OSError:
+        font = ImageFont.load_default(size=size)
+    for index, line in enumerate(SAMPLE_LABEL_LINES):
+        draw.text((width // 16, height // 8 + index * int(size * 1.8)), line, fill=20, font=font)
+    buffer = BytesIO()
+    image.save(buffer, format="JPEG", quality=90)
+    return buffer.getvalue()
@@ -0,0 +1,399 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import asyncio
+import tempfile
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+from execution_engine import QueueFullError, JobTimeoutError
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class JobRejectedError(Exception):
+    """Raised when the persistent queue already holds ``max_queued`` jobs"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Job queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+@dataclass
+class JobQueueConfig:
+    db_path: str                    # SQLite file shared by every process of one service, and only by those
+    workers: int = 2                # jobs dispatched to the extraction engine at once
+    max_queued: int = 1000          # queued jobs before POST /jobs answers 429
+    lease: float = 120.0            # seconds before a running job is presumed lost and retried (keep above job_timeout)
+    max_attempts: int = 3
+    retention: float = 86400.0      # seconds finished jobs (and their results) are kept
+    poll_interval: float = 0.5      # seconds between queue checks when idle (other processes may submit)
+    retry_after: int = 5
+
+    @classmethod
+    def from_env(cls, service: str, workers: int = 2) -> "JobQueueConfig":
+        """Build the configuration from EXTRACTOR_JOBS_* environment variables
+
+        Without EXTRACTOR_JOBS_DB the file is named after ``service``, so
+        two services on one host never claim each other's jobs.
+        """
+        db_path = os.getenv("EXTRACTOR_JOBS_DB")
+        if not db_path:
+            db_path = os.path.join(tempfile.gettempdir(), f"{service}-jobs.db")
+            print(f"⚠️ EXTRACTOR_JOBS_DB not set, queueing jobs in {db_path}")
+        return cls(
+            db_path=db_path,
+            workers=max(1, int(os.getenv("EXTRACTOR_JOBS_WORKERS", workers))),
+            max_queued=int(os.getenv("EXTRACTOR_JOBS_MAX_QUEUED", 1000)),
+            lease=float(os.getenv("EXTRACTOR_JOBS_LEASE", 120)),
+            max_attempts=max(1, int(os.getenv("EXTRACTOR_JOBS_MAX_ATTEMPTS", 3))),
+            retention=float(os.getenv("EXTRACTOR_JOBS_RETENTION", 86400)),
+            poll_interval=float(os.getenv("EXTRACTOR_JOBS_POLL_INTERVAL", 0.5)),
+            retry_after=int(os.getenv("EXTRACTOR_RETRY_AFTER", 5)),
+        )
+
+
+class JobStore:
+    """SQLite-backed job table: the queue, its claims and the finished results.
+
+    Any number of processes can share the file. Claims are taken inside
+    ``BEGIN IMMEDIATE`` transactions so two workers never get the same job,
+    and a claim is only a lease: a job left running past ``lease`` seconds
+    (its process died) goes back to the queue until ``max_attempts``.
+
+    A job that is merely slow is requeued the same way and can run twice.
+    The attempt number identifies a claim, and only the run holding the
+    latest claim records its result or gives the job back; a superseded
+    run's writes are dropped.
+    """
+
+    def __init__(self, config: JobQueueConfig):
+        self.config = config
+        self._local = threading.local()
+        # A connection inherited through fork (preloading server) must not be used by the child
+        os.register_at_fork(after_in_child=self._forget_connections)
+        os.makedirs(os.path.dirname(os.path.abspath(config.db_path)), exist_ok=True)
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, key TEXT NOT NULL, priority INTEGER NOT NULL DEFAULT 0, "
+                "status TEXT NOT NULL, attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL, "
+                "started_at REAL, finished_at REAL, image BLOB, result TEXT, error TEXT)"
+            )
+            # Claim order, and the in-flight lookup used to dedupe identical images
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_queue ON jobs (status, priority DESC, created_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_key ON jobs (key, status)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections cannot be shared across threads, keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.config.db_path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _forget_connections(self) -> None:
+        self._local = threading.local()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Write transaction, taking the database lock up front so check-then-write is atomic"""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def submit(self, key: str, contents: bytes, priority: int = 0) -> Tuple[str, bool]:
+        """Queue an image; returns (job id, deduplicated).
+
+        An identical image (same cache key) that is still queued or running
+        is not queued twice: its job id is returned, and its priority raised
+        to ``priority`` if that is higher.
+        """
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT id, priority FROM jobs WHERE key = ? AND status IN (?, ?) LIMIT 1",
+                (key, QUEUED, RUNNING),
+            ).fetchone()
+            if row is not None:
+                if priority > row["priority"]:
+                    conn.execute("UPDATE jobs SET priority = ? WHERE id = ?", (priority, row["id"]))
+                return row["id"], True
+
+            queued = conn.execute("SELECT COUNT(*) FROM jobs WHERE status = ?", (QUEUED,)).fetchone()[0]
+            if queued >= self.config.max_queued:
+                raise JobRejectedError(self.config.retry_after)
+            job_id = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO jobs (id, key, priority, status, created_at, image) VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, key, priority, QUEUED, time.time(), contents),
+            )
+            return job_id, False
+
+    def record(self, key: str, result: Dict[str, Any], priority: int = 0) -> str:
+        """Store a job that is already finished (result cache hit)"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, key, priority, status, created_at, started_at, finished_at, result) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, key, priority, DONE, now, now, now, json.dumps(result)),
+            )
+        return job_id
+
+    def claim(self) -> Optional[Tuple[str, bytes, int]]:
+        """Lease the highest priority, oldest queued job; returns (id, image bytes, attempt)"""
+        # Idle workers poll, check with a plain read before taking the write lock
+        if self._connection().execute("SELECT 1 FROM jobs WHERE status = ? LIMIT 1", (QUEUED,)).fetchone() is None:
+            return None
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT id, image, attempts FROM jobs WHERE status = ? ORDER BY priority DESC, created_at LIMIT 1",
+                (QUEUED,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1 WHERE id = ?",
+                (RUNNING, time.time(), row["id"]),
+            )
+            return row["id"], row["image"], row["attempts"] + 1
+
+    def release(self, job_id: str, attempt: int) -> None:
+        """Give a claimed job back to the queue without counting the attempt"""
+        with self._transaction() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, attempts = attempts - 1 "
+                "WHERE id = ? AND status = ? AND attempts = ?",
+                (QUEUED, job_id, RUNNING, attempt),
+            )
+
+    def finish(self, job_id: str, attempt: int, result: Optional[Dict[str, Any]] = None,
+               error: Optional[str] = None) -> bool:
+        """Mark a job done (or failed with ``error``); the image is dropped, the result kept.
+
+        Returns False, writing nothing, when the claim ``attempt`` was
+        superseded: the lease expired and the job was claimed again. An
+        expired job still waiting in the queue, or given up on as lost,
+        takes the result instead of running again.
+        """
+        with self._transaction() as conn:
+            return conn.execute(
+                "UPDATE jobs SET status = ?, finished_at = ?, result = ?, error = ?, image = NULL "
+                "WHERE id = ? AND attempts = ? AND status != ?",
+                (FAILED if error else DONE, time.time(), json.dumps(result) if result is not None else None,
+                 error, job_id, attempt, DONE),
+            ).rowcount > 0
+
+    def maintain(self) -> Tuple[int, int]:
+        """Requeue expired leases (or fail them after max_attempts) and purge old finished jobs"""
+        now = time.time()
+        with self._transaction() as conn:
+            expired = conn.execute(
+                "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN ? ELSE ? END, "
+                "error = CASE WHEN attempts >= ? THEN 'Worker lost while processing the job' END, "
+                "finished_at = CASE WHEN attempts >= ? THEN ? END, started_at = NULL "
+                "WHERE status = ? AND started_at < ?",
+                (self.config.max_attempts, FAILED, QUEUED, self.config.max_attempts,
+                 self.config.max_attempts, now, RUNNING, now - self.config.lease),
+            ).rowcount
+            purged = conn.execute(
+                "DELETE FROM jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (DONE, FAILED, now - self.config.retention),
+            ).rowcount
+        return expired, purged
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Public view of a job: status, timestamps, queue position or result"""
+        conn = self._connection()
+        row = conn.execute(
+            "SELECT id, priority, status, attempts, created_at, started_at, finished_at, result, error "
+            "FROM jobs WHERE id = ?", (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        job = {key: row[key] for key in ("id", "status", "priority", "attempts", "created_at", "started_at", "finished_at")}
+        if row["status"] == QUEUED:
+            job["position"] = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = ? AND (priority > ? OR (priority = ? AND created_at < ?))",
+                (QUEUED, row["priority"], row["priority"], row["created_at"]),
+            ).fetchone()[0]
+        if row["status"] == DONE:
+            job["result"] = json.loads(row["result"]) if row["result"] else None
+        if row["error"]:
+            job["error"] = row["error"]
+        return job
+
+    def stats(self) -> Dict[str, int]:
+        rows = self._connection().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        counts = {status: 0 for status in (QUEUED, RUNNING, DONE, FAILED)}
+        counts.update({status: count for status, count in rows})
+        return counts
+
+
+Handler = Callable[[bytes], Awaitable[Optional[Dict[str, Any]]]]
+
+
+class JobQueue:
+    """Drains the JobStore into the extraction engine from the event loop.
+
+    ``workers`` dispatcher tasks claim jobs and await ``handler(contents)``,
+    which runs the pipeline in the engine's pool, so queued jobs and
+    synchronous requests share the same workers. Waiters (GET with SSE)
+    are woken as soon as a job of this process changes, and fall back to
+    polling for jobs finished by other processes.
+    """
+
+    def __init__(self, store: JobStore, handler: Handler):
+        self.store = store
+        self.handler = handler
+        self.config = store.config
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._watchers: Dict[str, List[asyncio.Event]] = {}
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    def start(self) -> None:
+        """Start the dispatcher tasks on the running loop (idempotent)"""
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._dispatch()) for _ in range(self.config.workers)]
+        self._tasks.append(asyncio.create_task(self._maintain()))
+
+    async def stop(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, key: str, contents: bytes, priority: int = 0) -> Tuple[str, bool]:
+        self.start()
+        job_id, deduplicated = await asyncio.to_thread(self.store.submit, key, contents, priority)
+        self._wakeup.set()
+        return job_id, deduplicated
+
+    async def record(self, key: str, result: Dict[str, Any], priority: int = 0) -> str:
+        return await asyncio.to_thread(self.store.record, key, result, priority)
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await asyncio.to_thread(self.store.get, job_id)
+
+    async def _finish(self, job_id: str, attempt: int, result: Optional[Dict[str, Any]] = None,
+                      error: Optional[str] = None) -> None:
+        if not await asyncio.to_thread(self.store.finish, job_id, attempt, result, error):
+            print(f"⚠️ Job {job_id} outlived its lease and was claimed again, dropping this run's result")
+
+    def _notify(self, job_id: str) -> None:
+        for event in self._watchers.pop(job_id, []):
+            event.set()
+
+    async def wait_for_change(self, job_id: str, timeout: float) -> None:
+        """Return when a job run by this process changes, or after ``timeout`` seconds"""
+        event = asyncio.Event()
+        self._watchers.setdefault(job_id, []).append(event)
+        try:
+            await asyncio.wait_for(event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        finally:
+            watchers = self._watchers.get(job_id)
+            if watchers and event in watchers:
+                watchers.remove(event)
+                if not watchers:
+                    del self._watchers[job_id]
+
+    async def _dispatch(self) -> None:
+        while True:
+            # Cleared before claiming, so a submit that races with an empty claim still wakes us
+            self._wakeup.clear()
+            try:
+                claimed = await asyncio.to_thread(self.store.claim)
+            except sqlite3.Error as e:
+                print(f"⚠️ Job claim failed: {e}")
+                claimed = None
+            if claimed is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.config.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            job_id, contents, attempt = claimed
+            self._notify(job_id)
+            try:
+                result = await self.handler(contents)
+            except QueueFullError as e:
+                # Synchronous requests hold the engine, hand the job back and retry later
+                await asyncio.to_thread(self.store.release, job_id, attempt)
+                await asyncio.sleep(min(e.retry_after, self.config.poll_interval * 4))
+                continue
+            except JobTimeoutError as e:
+                await self._finish(job_id, attempt, error=str(e))
+            except Exception as e:
+                await self._finish(job_id, attempt, error=f"Error processing image: {e}")
+            else:
+                if result is None:
+                    await self._finish(job_id, attempt, error="No text could be extracted from the image")
+                else:
+                    await self._finish(job_id, attempt, result)
+            self._notify(job_id)
+
+    async def _maintain(self) -> None:
+        while True:
+            try:
+                expired, purged = await asyncio.to_thread(self.store.maintain)
+                if expired or purged:
+                    print(f"🧹 Jobs: {expired} expired leases handled, {purged} finished jobs purged")
+            except sqlite3.Error as e:
+                print(f"⚠️ Job maintenance failed: {e}")
+            await asyncio.sleep(max(1.0, self.config.lease / 4))
+
+    async def events(self, job_id: str, keepalive: float = 15.0):
+        """Server-sent events for a job: one ``status`` event per change, then ``result``/``failed``"""
+        last_status = None
+        waited = 0.0
+        while True:
+            job = await self.get(job_id)
+            if job is None:
+                yield _sse("error", {"id": job_id, "error": "Job not found"})
+                return
+            if job["status"] != last_status:
+                last_status = job["status"]
+                waited = 0.0
+                if job["status"] == DONE:
+                    yield _sse("result", job)
+                    return
+                if job["status"] == FAILED:
+                    yield _sse("failed", job)
+                    return
+                yield _sse("status", job)
+            elif waited >= keepalive:
+                # Comment line, keeps proxies from closing an idle stream
+                yield ": keepalive\n\n"
+                waited = 0.0
+            await self.wait_for_change(job_id, self.config.poll_interval)
+            waited += self.config.poll_interval
+
+    async def stats(self) -> Dict[str, Any]:
+        return {"workers": self.config.workers, "dispatching": self.running,
+                **await asyncio.to_thread(self.store.stats)}
+
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
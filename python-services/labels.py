@@ -0,0 +1,356 @@
+"""Print-ready QR label sheets for a lot (or any list of payloads).
+
+Sheets come out as a multi-page PDF with vector QR codes, or as tiled PNG
+pages. Pages are rendered in parallel worker processes and written out in
+order as soon as they are ready, so only a bounded number of pages is
+ever in memory. QR matrices live in the parent's qr_codes.QRRenderer LRU
+(the service's own): each page job carries the matrices already there,
+and the worker sends back the ones it had to build, so a payload is
+encoded once rather than once per worker.
+
+    python labels.py --lot <lot id> --database postgresql://... --output lot.pdf
+    python labels.py --input payloads.jsonl --output sheet.pdf
+    python labels.py --input payloads.jsonl --format png --output sheets/
+"""
+import os
+import json
+import zlib
+import argparse
+from io import BytesIO
+from collections import deque
+from dataclasses import dataclass
+from concurrent.futures import Executor, ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from PIL import Image, ImageDraw, ImageFont
+from pydantic import BaseModel
+
+from qr_codes import Matrix, QRRenderer, QRConfig, build_matrix, matrix_image, matrix_runs
+
+Label = Tuple[str, str]  # QR payload, caption printed under the code
+
+SHEET_FORMATS = ('pdf', 'png')
+
+
+@dataclass
+class SheetLayout:
+    page_width: float = 595.28      # A4, in points
+    page_height: float = 841.89
+    columns: int = 5
+    rows: int = 8
+    margin: float = 28.35           # 10 mm
+    caption_size: float = 6.0       # caption font size in points, 0 hides captions
+    dpi: int = 300                  # resolution of png sheets
+
+    @property
+    def per_page(self) -> int:
+        return self.columns * self.rows
+
+    def cell(self, index: int) -> Tuple[float, float, float, float]:
+        """x, y (from the top-left corner), width and height of a label cell, in points"""
+        width = (self.page_width - 2 * self.margin) / self.columns
+        height = (self.page_height - 2 * self.margin) / self.rows
+        row, column = divmod(index, self.columns)
+        return self.margin + column * width, self.margin + row * height, width, height
+
+    def code_box(self, index: int, modules: int) -> Tuple[float, float, float]:
+        """x, y (from the top-left corner) and module size of the QR code in a cell"""
+        x, y, width, height = self.cell(index)
+        caption_band = self.caption_size * 1.5 if self.caption_size else 0
+        module = min(width, height - caption_band) / modules
+        side = module * modules
+        return x + (width - side) / 2, y + (height - caption_band - side) / 2, module
+
+
+class LabelSpec(BaseModel):
+    payload: str
+    caption: str = ""
+
+
+class LabelSheetRequest(BaseModel):
+    labels: List[LabelSpec]
+
+
+def _pdf_text(text: str) -> str:
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def render_pdf_page(labels: List[Label], layout: SheetLayout, matrices: Dict[str, Matrix]) -> bytes:
+    """Deflated PDF content stream for one page: one filled path per code, plus captions"""
+    ops = ["0 g"]
+    for index, (payload, caption) in enumerate(labels):
+        matrix = matrices[payload]
+        left, top, module = layout.code_box(index, len(matrix))
+        # PDF user space starts at the bottom-left corner
+        for y, x, run in matrix_runs(matrix):
+            bottom = layout.page_height - top - (y + 1) * module
+            ops.append(f"{left + x * module:.3f} {bottom:.3f} {run * module:.3f} {module:.3f} re")
+        ops.append("f")
+
+        if caption and layout.caption_size:
+            cell_x, cell_y, width, height = layout.cell(index)
+            text_width = 0.5 * layout.caption_size * len(caption)  # Helvetica averages ~0.5 em
+            baseline = layout.page_height - (cell_y + height) + layout.caption_size * 0.4
+            ops.append(f"BT /F1 {layout.caption_size:g} Tf {cell_x + (width - text_width) / 2:.2f} "
+                       f"{baseline:.2f} Td ({_pdf_text(caption)}) Tj ET")
+    return zlib.compress("\n".join(ops).encode('latin-1', 'replace'))
+
+
+def render_png_page(labels: List[Label], layout: SheetLayout, matrices: Dict[str, Matrix]) -> bytes:
+    """One tiled 1-bit PNG sheet at ``layout.dpi``"""
+    scale = layout.dpi / 72.0
+    sheet = Image.new('1', (round(layout.page_width * scale), round(layout.page_height * scale)), 1)
+    draw = ImageDraw.Draw(sheet)
+    font = ImageFont.load_default()
+    for index, (payload, caption) in enumerate(labels):
+        matrix = matrices[payload]
+        left, top, module = layout.code_box(index, len(matrix))
+        # Whole pixels per module keep the modules square and scannable
+        box_size = max(1, int(module * scale))
+        sheet.paste(matrix_image(matrix, box_size), (round(left * scale), round(top * scale)))
+
+        if caption and layout.caption_size:
+            cell_x, cell_y, width, height = layout.cell(index)
+            text_width = draw.textlength(caption, font=font)
+            draw.text(((cell_x + width / 2) * scale - text_width / 2,
+                       (cell_y + height - layout.caption_size * 1.5) * scale),
+                      caption, fill=0, font=font)
+    buffer = BytesIO()
+    sheet.save(buffer, format='PNG', optimize=True)
+    return buffer.getvalue()
+
+
+def render_page(labels: List[Label], layout: SheetLayout, sheet_format: str, matrices: Dict[str, Matrix]) -> bytes:
+    if sheet_format == 'pdf':
+        return render_pdf_page(labels, layout, matrices)
+    return render_png_page(labels, layout, matrices)
+
+
+def render_page_job(labels: List[Label], layout: SheetLayout, sheet_format: str, known: Dict[str, Matrix],
+                    config: QRConfig) -> Tuple[bytes, Dict[str, Matrix]]:
+    """Process pool entry point: the page, and the matrices missing from ``known`` that it built"""
+    built: Dict[str, Matrix] = {}
+    for payload, _ in labels:
+        if payload not in known and payload not in built:
+            built[payload] = build_matrix(payload, config)
+    return render_page(labels, layout, sheet_format, {**known, **built}), built
+
+
+def paginate(labels: Iterable[Label], per_page: int) -> Iterator[List[Label]]:
+    page: List[Label] = []
+    for label in labels:
+        page.append(label)
+        if len(page) == per_page:
+            yield page
+            page = []
+    if page:
+        yield page
+
+
+class PDFStream:
+    """Writes a PDF one page at a time.
+
+    Objects 1-3 (catalog, page tree, font) are reserved up front; the page
+    tree is written last, once every page object number is known, followed
+    by the cross-reference table. Nothing but the object offsets is kept.
+    """
+
+    def __init__(self, layout: SheetLayout):
+        self.layout = layout
+        self.offsets = {}
+        self.position = 0
+        self.next_object = 4
+        self.pages: List[int] = []
+
+    def _emit(self, data: bytes) -> bytes:
+        self.position += len(data)
+        return data
+
+    def _object(self, number: int, body: bytes) -> bytes:
+        self.offsets[number] = self.position
+        return self._emit(b"%d 0 obj\n%s\nendobj\n" % (number, body))
+
+    def header(self) -> bytes:
+        return (
+            self._emit(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+            + self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+            + self._object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>")
+        )
+
+    def page(self, content: bytes) -> bytes:
+        content_number, page_number = self.next_object, self.next_object + 1
+        self.next_object += 2
+        self.pages.append(page_number)
+        media_box = f"[0 0 {self.layout.page_width:.2f} {self.layout.page_height:.2f}]".encode()
+        return (
+            self._object(content_number, b"<< /Length %d /Filter /FlateDecode >>\nstream\n%s\nendstream"
+                         % (len(content), content))
+            + self._object(page_number, b"<< /Type /Page /Parent 2 0 R /MediaBox %s "
+                           b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+                           % (media_box, content_number))
+        )
+
+    def trailer(self) -> bytes:
+        kids = " ".join(f"{number} 0 R" for number in self.pages).encode()
+        pages = self._object(2, b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(self.pages)))
+        xref_offset = self.position
+        entries = [b"0000000000 65535 f \n"] + [b"%010d 00000 n \n" % self.offsets[number]
+                                                for number in range(1, self.next_object)]
+        return pages + (
+            b"xref\n0 %d\n%s" % (self.next_object, b"".join(entries))
+            + b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (self.next_object, xref_offset)
+        )
+
+
+class SheetRenderer:
+    """Renders label sheets page by page on a pool of worker processes.
+
+    ``renderer`` (the service's own QRRenderer) holds the matrices either
+    way; ``workers=0`` renders in the calling thread, which is enough for
+    small sheets.
+    """
+
+    def __init__(self, workers: int = 0, renderer: Optional[QRRenderer] = None):
+        self.workers = workers
+        self.renderer = renderer or QRRenderer(QRConfig.from_env())
+        self._executor: Optional[Executor] = None
+
+    @classmethod
+    def from_env(cls, renderer: Optional[QRRenderer] = None) -> "SheetRenderer":
+        """Build a renderer from EXTRACTOR_LABEL_WORKERS (default: one per CPU)"""
+        return cls(workers=int(os.getenv("EXTRACTOR_LABEL_WORKERS", os.cpu_count() or 1)), renderer=renderer)
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor
+
+    def pages(self, labels: Iterable[Label], layout: SheetLayout, sheet_format: str) -> Iterator[bytes]:
+        """Rendered pages in order, with at most two pages per worker in flight"""
+        if self.workers <= 0:
+            for page in paginate(labels, layout.per_page):
+                yield render_page(page, layout, sheet_format,
+                                  {payload: self.renderer.matrix(payload) for payload, _ in page})
+            return
+
+        executor = self._get_executor()
+        in_flight = deque()
+        for page in paginate(labels, layout.per_page):
+            known = {}
+            for payload, _ in page:
+                matrix = self.renderer.cached_matrix(payload)
+                if matrix is not None:
+                    known[payload] = matrix
+            in_flight.append(executor.submit(render_page_job, page, layout, sheet_format, known,
+                                             self.renderer.config))
+            if len(in_flight) >= self.workers * 2:
+                yield self._collect(in_flight.popleft())
+        while in_flight:
+            yield self._collect(in_flight.popleft())
+
+    def _collect(self, future) -> bytes:
+        content, built = future.result()
+        for payload, matrix in built.items():
+            self.renderer.add_matrix(payload, matrix)
+        return content
+
+    def pdf(self, labels: Iterable[Label], layout: SheetLayout) -> Iterator[bytes]:
+        """Stream a complete PDF document, chunk by chunk"""
+        document = PDFStream(layout)
+        yield document.header()
+        for content in self.pages(labels, layout, 'pdf'):
+            yield document.page(content)
+        yield document.trailer()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def iter_lot_labels(database, lot_id: str, chunk_size: int = 1000) -> Iterator[Label]:
+    """(qrPayload, serial) of every item in a lot, keyset-paginated by serial"""
+    query = (
+        f'SELECT serial, "qrPayload" FROM items WHERE "lotId" = {database.placeholder} '
+        f'AND serial > {database.placeholder} ORDER BY serial LIMIT {database.placeholder}'
+    )
+    last_serial = ''
+    while True:
+        cursor = database.conn.cursor()
+        cursor.execute(query, (lot_id, last_serial, chunk_size))
+        rows = cursor.fetchall()
+        cursor.close()
+        if not rows:
+            return
+        last_serial = rows[-1][0]
+        for serial, payload in rows:
+            yield payload, serial
+
+
+def iter_file_labels(path: str) -> Iterator[Label]:
+    """Labels from a JSONL file of {"payload", "caption"} objects, or one raw payload per line"""
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except ValueError:
+                record = None
+            if isinstance(record, dict) and 'payload' in record:
+                yield record['payload'], str(record.get('caption', ''))
+            else:
+                yield line, ''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--lot', help='render every item of this lot id')
+    source.add_argument('--input', help='JSONL file of {"payload", "caption"} objects (or one payload per line)')
+    parser.add_argument('--database', default=os.getenv('DATABASE_URL'),
+                        help='postgresql://... or sqlite:///path, needed with --lot (default: $DATABASE_URL)')
+    parser.add_argument('--output', required=True, help='PDF file, or directory for PNG pages')
+    parser.add_argument('--format', choices=SHEET_FORMATS, default='pdf')
+    parser.add_argument('--columns', type=int, default=SheetLayout.columns)
+    parser.add_argument('--rows', type=int, default=SheetLayout.rows)
+    parser.add_argument('--dpi', type=int, default=SheetLayout.dpi)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    layout = SheetLayout(columns=args.columns, rows=args.rows, dpi=args.dpi)
+    database = None
+    if args.lot:
+        if not args.database:
+            parser.error('--database (or DATABASE_URL) is required with --lot')
+        from reparse import Database
+        database = Database(args.database)
+        labels = iter_lot_labels(database, args.lot)
+    else:
+        labels = iter_file_labels(args.input)
+
+    renderer = SheetRenderer(workers=args.workers)
+    pages = 0
+    try:
+        if args.format == 'pdf':
+            with open(args.output, 'wb') as f:
+                for chunk in renderer.pdf(labels, layout):
+                    f.write(chunk)
+                    pages += 1
+            pages -= 2  # header and trailer chunks
+        else:
+            os.makedirs(args.output, exist_ok=True)
+            for pages, png in enumerate(renderer.pages(labels, layout, 'png'), start=1):
+                with open(os.path.join(args.output, f"sheet-{pages:04d}.png"), 'wb') as f:
+                    f.write(png)
+    finally:
+        renderer.shutdown()
+        if database:
+            database.close()
+
+    print(f"✅ Wrote {pages} pages to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+import importlib
+import importlib.util
+from functools import lru_cache
+from types import ModuleType
+
+
+@lru_cache(maxsize=None)
+def importable(name: str) -> bool:
+    """Import ``name`` now and report whether it loaded (missing, or a broken native library)"""
+    try:
+        importlib.import_module(name)
+        return True
+    except Exception:
+        return False
+
+
+@lru_cache(maxsize=None)
+def installed(name: str) -> bool:
+    """Whether ``name`` can be found, without importing it (for pure-Python packages whose import cannot fail)"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+class LazyModule:
+    """Stand-in for a module-level ``import <name>`` that imports on first attribute access.
+
+    cv2, numpy, pytesseract and qrcode add hundreds of milliseconds to every
+    process that imports the extractor, including CLI tools and tests that
+    only parse text. Modules bind them through this instead and check
+    ``importable(name)`` where the old ``HAS_*`` flags were, which is the
+    first real use.
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module = None
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    def __getattr__(self, attribute: str):
+        return getattr(self._load(), attribute)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self._module is not None else "not loaded"
+        return f"<lazy module '{self._name}' ({state})>"
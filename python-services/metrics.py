@@ -0,0 +1,456 @@
+import os
+import glob
+import json
+import time
+import random
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process uvicorn, no shared directory to lock
+    fcntl = None
+
+# Seconds; covers cache hits (sub-ms) up to OCR on large photos
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_local = threading.local()
+
+
+class StageTimings:
+    """Per-job stage durations (seconds), observed values and tags, small enough to pickle back from a worker"""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self.values: Dict[str, float] = {}
+        self.tags: Dict[str, str] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, durations in milliseconds"""
+        return ", ".join(f"{stage};dur={seconds * 1000:.1f}" for stage, seconds in self.stages.items())
+
+
+@contextmanager
+def collect_timings() -> Iterator[StageTimings]:
+    """Collect ``stage``/``observe`` calls made by this thread into a StageTimings"""
+    timings = StageTimings()
+    previous = getattr(_local, "timings", None)
+    _local.timings = timings
+    try:
+        yield timings
+    finally:
+        _local.timings = previous
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a pipeline stage; a no-op outside ``collect_timings``"""
+    timings = getattr(_local, "timings", None)
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.add(name, time.perf_counter() - start)
+
+
+def observe(name: str, value: float) -> None:
+    """Record a per-job value (image megapixels, OCR characters...) for the current job"""
+    timings = getattr(_local, "timings", None)
+    if timings is not None:
+        timings.values[name] = timings.values.get(name, 0.0) + value
+
+
+def tag(name: str, value: str) -> None:
+    """Label the current job (OCR tier used...), for metrics broken down by that label"""
+    timings = getattr(_local, "timings", None)
+    if timings is not None:
+        timings.tags[name] = value
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labels)
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def snapshot(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    @staticmethod
+    def merge(total: Dict[Tuple[str, ...], Any], values: Dict[Tuple[str, ...], Any]) -> None:
+        for key, value in values.items():
+            total[key] = total.get(key, 0.0) + value
+
+    def render(self, values: Optional[Dict[Tuple[str, ...], float]] = None) -> List[str]:
+        values = self.snapshot() if values is None else values
+        return self.header() + [f"{self.name}{_format_labels(self.labels, key)} {_format_value(value)}"
+                                for key, value in sorted(values.items())]
+
+
+class Gauge(_Metric):
+    """Gauge read from a callback at scrape time, returning a number or {label tuple: number}.
+
+    With several server processes a "sum" gauge adds up the live
+    processes' own values (queue depth, in-flight jobs), while a "shared"
+    gauge reads state every process sees alike (the persistent job store)
+    once, in the process answering the scrape.
+    """
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, callback: Callable[[], Any], labels: Sequence[str] = (),
+                 aggregate: str = "sum"):
+        super().__init__(name, help_text, labels)
+        self.callback = callback
+        self.aggregate = aggregate
+
+    def snapshot(self) -> Dict[Tuple[str, ...], float]:
+        value = self.callback()
+        return value if isinstance(value, dict) else {(): value}
+
+    merge = staticmethod(Counter.merge)
+
+    def render(self, values: Optional[Dict[Tuple[str, ...], float]] = None) -> List[str]:
+        values = self.snapshot() if values is None else values
+        return self.header() + [f"{self.name}{_format_labels(self.labels, key)} {_format_value(number)}"
+                                for key, number in sorted(values.items())]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # bucket counts..., sum, count
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[index] += 1
+                    break
+            series[-2] += value
+            series[-1] += 1
+
+    def snapshot(self) -> Dict[Tuple[str, ...], List[float]]:
+        with self._lock:
+            return {key: list(values) for key, values in self._series.items()}
+
+    def reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+    @staticmethod
+    def merge(total: Dict[Tuple[str, ...], Any], values: Dict[Tuple[str, ...], Any]) -> None:
+        for key, series in values.items():
+            if key in total:
+                total[key] = [a + b for a, b in zip(total[key], series)]
+            else:
+                total[key] = list(series)
+
+    def render(self, values: Optional[Dict[Tuple[str, ...], List[float]]] = None) -> List[str]:
+        series = self.snapshot() if values is None else values
+        lines = self.header()
+        for key, values in sorted(series.items()):
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, values):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labels, key, le)} {_format_value(cumulative)}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labels, key)} {_format_value(values[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labels, key)} {_format_value(values[-1])}")
+        return lines
+
+
+class ExtractorMetrics:
+    """The extractor's metrics, rendered in the Prometheus text format.
+
+    Counters and histograms are fed from the StageTimings each job brings
+    back from the worker pool (so process workers are covered too); the
+    queue and cache gauges are read from callbacks at scrape time.
+
+    Behind a multi-process server every scrape lands on one random
+    process, so with a ``directory`` (EXTRACTOR_METRICS_DIR, set up by
+    serve.py) each process flushes a snapshot of its metrics there every
+    ``flush_seconds`` and a scrape renders the sum over all snapshots.
+    Counters of processes that exited are folded into an archive file, so
+    totals never go backwards when gunicorn recycles a worker; their
+    gauges are dropped.
+    """
+
+    def __init__(self, directory: Optional[str] = None, flush_seconds: float = 1.0):
+        self.directory = directory
+        self.flush_seconds = flush_seconds
+        self._flusher: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+        self.metrics: List[_Metric] = []
+        self.stage_seconds = self.add(Histogram(
+            "extractor_stage_seconds", "Time spent per pipeline stage", ["stage"]))
+        self.request_seconds = self.add(Histogram(
+            "extractor_http_request_seconds", "HTTP request latency", ["method", "route", "status"]))
+        self.images = self.add(Counter(
+            "extractor_images_total", "Images run through the pipeline, by outcome", ["outcome"]))
+        self.image_bytes = self.add(Counter(
+            "extractor_image_bytes_total", "Encoded image bytes received for extraction"))
+        self.megapixels = self.add(Counter(
+            "extractor_image_megapixels_total", "Megapixels decoded (after the decode budget)"))
+        self.ocr_characters = self.add(Counter(
+            "extractor_ocr_characters_total", "Characters returned by OCR"))
+        self.cache_lookups = self.add(Counter(
+            "extractor_cache_lookups_total", "Result cache lookups", ["result"]))
+        self.ocr_tiers = self.add(Counter(
+            "extractor_ocr_tier_total", "Images by the OCR cascade tier whose reading was used", ["tier"]))
+        self.frames = self.add(Counter(
+            "extractor_frames_total", "Stream and multi-shot frames, by selection status", ["status"]))
+
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            # Whatever the preloading master recorded must not be counted again by every child
+            os.register_at_fork(after_in_child=self._reset_counts)
+
+    @classmethod
+    def from_env(cls) -> "ExtractorMetrics":
+        """Build from EXTRACTOR_METRICS_DIR (unset: this process only) and EXTRACTOR_METRICS_FLUSH_SECONDS"""
+        return cls(directory=os.getenv("EXTRACTOR_METRICS_DIR") or None,
+                   flush_seconds=float(os.getenv("EXTRACTOR_METRICS_FLUSH_SECONDS", 1.0)))
+
+    def add(self, metric: _Metric) -> Any:
+        self.metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help_text: str, callback: Callable[[], Any], labels: Sequence[str] = (),
+              aggregate: str = "sum") -> None:
+        self.add(Gauge(name, help_text, callback, labels, aggregate))
+
+    def observe_job(self, timings: Optional[StageTimings], image_bytes: int, outcome: str) -> None:
+        """Record one pipeline run"""
+        self.images.inc(outcome=outcome)
+        self.image_bytes.inc(image_bytes)
+        if timings is None:
+            return
+        for name, seconds in timings.stages.items():
+            self.stage_seconds.observe(seconds, stage=name)
+        self.megapixels.inc(timings.values.get("megapixels", 0.0))
+        self.ocr_characters.inc(timings.values.get("ocr_characters", 0.0))
+        if "ocr_tier" in timings.tags:
+            self.ocr_tiers.inc(tier=timings.tags["ocr_tier"])
+
+    def _reset_counts(self) -> None:
+        for metric in self.metrics:
+            if not isinstance(metric, Gauge):
+                metric.reset()
+        self._flusher = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Start flushing this process's snapshot (call in each server process, after the fork)"""
+        if not self.directory or self._flusher is not None:
+            return
+        self._stopped.clear()
+        self._flusher = threading.Thread(target=self._flush_loop, name="metrics-flush", daemon=True)
+        self._flusher.start()
+
+    def stop(self) -> None:
+        """Write a final snapshot so nothing this process counted is lost when it exits"""
+        if self._flusher is not None:
+            self._stopped.set()
+            self._flusher.join(timeout=5)
+            self._flusher = None
+        if self.directory:
+            self.flush()
+
+    def _flush_loop(self) -> None:
+        while not self._stopped.wait(self.flush_seconds):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"⚠️ Metrics flush failed: {e}")
+
+    def _snapshot_path(self, pid: int) -> str:
+        return os.path.join(self.directory, f"metrics-{pid}.json")
+
+    def flush(self) -> None:
+        """Atomically replace this process's snapshot file"""
+        snapshot = {metric.name: [[list(key), value] for key, value in metric.snapshot().items()]
+                    for metric in self.metrics
+                    if not (isinstance(metric, Gauge) and metric.aggregate == "shared")}
+        path = self._snapshot_path(os.getpid())
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp_path, path)
+
+    @staticmethod
+    def _read(path: str) -> Dict[str, Dict[Tuple[str, ...], Any]]:
+        try:
+            with open(path) as f:
+                raw = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        return {name: {tuple(key): value for key, value in series} for name, series in raw.items()}
+
+    @staticmethod
+    def _alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+        return True
+
+    def _aggregate(self) -> Dict[str, Dict[Tuple[str, ...], Any]]:
+        """Sum of every process's snapshot plus the archive of exited processes"""
+        by_name = {metric.name: metric for metric in self.metrics}
+        archive_path = os.path.join(self.directory, "metrics-archive.json")
+        archive = self._read(archive_path)
+        totals: Dict[str, Dict[Tuple[str, ...], Any]] = {name: dict(values) for name, values in archive.items()}
+        archived = False
+
+        for path in glob.glob(os.path.join(self.directory, "metrics-[0-9]*.json")):
+            pid = int(os.path.basename(path)[len("metrics-"):-len(".json")])
+            alive = pid == os.getpid() or self._alive(pid)
+            for name, values in self._read(path).items():
+                metric = by_name.get(name)
+                if metric is None or (isinstance(metric, Gauge) and not alive):
+                    continue
+                metric.merge(totals.setdefault(name, {}), values)
+                if not alive and not isinstance(metric, Gauge):
+                    metric.merge(archive.setdefault(name, {}), values)
+            if not alive:
+                os.remove(path)
+                archived = True
+
+        if archived:
+            tmp_path = f"{archive_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({name: [[list(key), value] for key, value in values.items()]
+                           for name, values in archive.items()}, f)
+            os.replace(tmp_path, archive_path)
+        return totals
+
+    def render(self) -> str:
+        """Prometheus text format; reads the shared directory when there is one (blocking file I/O)"""
+        totals = None
+        if self.directory:
+            self.flush()
+            with open(os.path.join(self.directory, "metrics.lock"), "a") as lock:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_EX)
+                totals = self._aggregate()
+        lines = []
+        for metric in self.metrics:
+            if totals is None or (isinstance(metric, Gauge) and metric.aggregate == "shared"):
+                lines.extend(metric.render())
+            else:
+                lines.extend(metric.render(totals.get(metric.name, {})))
+        return "\n".join(lines) + "\n"
+
+
+class SlowJobProfiler:
+    """Sampling cProfile hook: profiles a fraction of jobs and dumps those slower than a threshold.
+
+    Dumps are ``.prof`` files (open with ``python -m pstats`` or snakeviz)
+    plus the top 30 functions by cumulative time in a ``.txt`` next to them.
+    """
+
+    def __init__(self, threshold_ms: float = 0.0, sample_rate: float = 1.0,
+                 directory: str = "/tmp/extractor-profiles"):
+        self.threshold_ms = threshold_ms
+        self.sample_rate = sample_rate
+        self.directory = directory
+
+    @classmethod
+    def from_env(cls) -> "SlowJobProfiler":
+        """Build the profiler from EXTRACTOR_PROFILE_* environment variables (off by default)"""
+        return cls(
+            threshold_ms=float(os.getenv("EXTRACTOR_PROFILE_SLOW_MS", 0)),
+            sample_rate=float(os.getenv("EXTRACTOR_PROFILE_SAMPLE_RATE", 1.0)),
+            directory=os.getenv("EXTRACTOR_PROFILE_DIR", "/tmp/extractor-profiles"),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.threshold_ms > 0 and self.sample_rate > 0
+
+    @contextmanager
+    def profile(self, label: str) -> Iterator[None]:
+        if not self.enabled or random.random() >= self.sample_rate:
+            yield
+            return
+        profiler = cProfile.Profile()
+        start = time.perf_counter()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if elapsed_ms >= self.threshold_ms:
+                self._dump(profiler, label, elapsed_ms)
+
+    def _dump(self, profiler: cProfile.Profile, label: str, elapsed_ms: float) -> None:
+        os.makedirs(self.directory, exist_ok=True)
+        base = os.path.join(self.directory, f"{label}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{elapsed_ms:.0f}ms")
+        profiler.dump_stats(base + ".prof")
+        with open(base + ".txt", "w") as f:
+            pstats.Stats(profiler, stream=f).sort_stats("cumulative").print_stats(30)
+        print(f"🐢 Slow {label} ({elapsed_ms:.0f}ms), profile written to {base}.prof")
@@ -0,0 +1,167 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+
+from lazy_imports import LazyModule, importable, installed
+
+# tesserocr is loaded when a backend is picked (see create_ocr_backend), pytesseract (which pulls in
+# numpy) only by the first OCR call
+tesserocr = LazyModule("tesserocr")
+pytesseract = LazyModule("pytesseract")
+
+# Configure Tesseract path for macOS (adjust if needed)
+# pytesseract.pytesseract.tesseract_cmd = '/opt/homebrew/bin/tesseract'
+
+
+class OCRBackend(ABC):
+    """Common interface for the OCR engines the extractors can use"""
+
+    name = "base"
+
+    def __init__(self, lang: Optional[str] = None, psm: int = 6, oem: int = 3):
+        self.lang = lang
+        self.psm = psm
+        self.oem = oem
+
+    def describe(self) -> str:
+        """Stable description of the engine and its settings (used in cache keys)"""
+        return f"{self.name}:lang={self.lang or 'default'}:psm={self.psm}:oem={self.oem}"
+
+    @abstractmethod
+    def image_to_string(self, image) -> str:
+        """OCR a PIL image or a 2-D uint8 grayscale ndarray"""
+
+    @abstractmethod
+    def image_to_data(self, image) -> Tuple[str, List[float]]:
+        """OCR an image, returning the text and Tesseract's per-word confidences (0-100)"""
+
+    def close(self) -> None:
+        pass
+
+
+class PytesseractBackend(OCRBackend):
+    """Runs the tesseract binary once per image through pytesseract"""
+
+    name = "pytesseract"
+
+    @property
+    def config(self) -> str:
+        config = f"--oem {self.oem} --psm {self.psm}"
+        if self.lang:
+            config += f" -l {self.lang}"
+        return config
+
+    def image_to_string(self, image) -> str:
+        return pytesseract.image_to_string(image, config=self.config)
+
+    def image_to_data(self, image) -> Tuple[str, List[float]]:
+        data = pytesseract.image_to_data(image, config=self.config, output_type=pytesseract.Output.DICT)
+        # Rebuild the text line by line from the word rows (conf is -1 on layout rows)
+        lines, confidences, current = [], [], None
+        for word, conf, *line in zip(data["text"], data["conf"], data["block_num"], data["par_num"], data["line_num"]):
+            if not word.strip() or float(conf) < 0:
+                continue
+            if line != current:
+                lines.append([])
+                current = line
+            lines[-1].append(word)
+            confidences.append(float(conf))
+        return "\n".join(" ".join(words) for words in lines), confidences
+
+
+class TesserocrBackend(OCRBackend):
+    """Keeps a Tesseract API instance alive per worker thread via the C API bindings.
+
+    The traineddata is loaded once when a thread first uses the backend and
+    reused for every later image, avoiding the fork, temp file and model
+    load that pytesseract pays on each call.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, lang: Optional[str] = None, psm: int = 6, oem: int = 3):
+        super().__init__(lang, psm, oem)
+        _, installed = tesserocr.get_languages()
+        missing = [code for code in (lang or "eng").split("+") if code not in installed]
+        if missing:
+            raise RuntimeError(f"Tesseract languages not installed: {', '.join(missing)}")
+        self._local = threading.local()
+        self._apis: List["tesserocr.PyTessBaseAPI"] = []
+        self._lock = threading.Lock()
+
+    def _api(self) -> "tesserocr.PyTessBaseAPI":
+        api = getattr(self._local, "api", None)
+        if api is None:
+            api = tesserocr.PyTessBaseAPI(lang=self.lang or "eng", psm=self.psm, oem=self.oem)
+            self._local.api = api
+            with self._lock:
+                self._apis.append(api)
+        return api
+
+    @staticmethod
+    def _set_image(api: "tesserocr.PyTessBaseAPI", image) -> None:
+        if hasattr(image, "shape"):
+            # Grayscale ndarray: hand the raw buffer to Tesseract, no PIL round trip
+            height, width = image.shape[:2]
+            api.SetImageBytes(image.tobytes(), width, height, 1, width)
+        else:
+            api.SetImage(image)
+
+    def image_to_string(self, image) -> str:
+        api = self._api()
+        try:
+            self._set_image(api, image)
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+
+    def image_to_data(self, image) -> Tuple[str, List[float]]:
+        api = self._api()
+        try:
+            self._set_image(api, image)
+            text = api.GetUTF8Text()
+            # Reuses the recognition GetUTF8Text just ran
+            return text, [float(conf) for conf in api.AllWordConfidences()]
+        finally:
+            api.Clear()
+
+    def close(self) -> None:
+        with self._lock:
+            for api in self._apis:
+                api.End()
+            self._apis.clear()
+        self._local = threading.local()
+
+
+def available_backends() -> List[str]:
+    backends = []
+    if importable("tesserocr"):
+        backends.append(TesserocrBackend.name)
+    if installed("pytesseract"):
+        backends.append(PytesseractBackend.name)
+    return backends
+
+
+def create_ocr_backend(lang: Optional[str] = None, psm: int = 6, oem: int = 3,
+                       name: Optional[str] = None) -> OCRBackend:
+    """Pick the OCR backend from ``name`` or EXTRACTOR_OCR_BACKEND (auto, tesserocr, pytesseract).
+
+    ``auto`` prefers the persistent tesserocr engine and falls back to
+    pytesseract when the bindings or the requested languages are missing.
+    """
+    name = (name or os.getenv("EXTRACTOR_OCR_BACKEND", "auto")).lower()
+
+    if name in ("auto", TesserocrBackend.name) and importable("tesserocr"):
+        try:
+            return TesserocrBackend(lang, psm, oem)
+        except Exception as e:
+            if name == TesserocrBackend.name and not installed("pytesseract"):
+                raise
+            print(f"tesserocr unavailable ({e}), falling back to pytesseract")
+    elif name == TesserocrBackend.name:
+        print("tesserocr not installed, falling back to pytesseract")
+
+    if installed("pytesseract"):
+        return PytesseractBackend(lang, psm, oem)
+    raise ImportError("No OCR backend available: install tesserocr or pytesseract")
@@ -0,0 +1,187 @@
+import os
+import time
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics import stage, tag
+from ocr_backends import OCRBackend, create_ocr_backend
+
+# DrugInfo attributes that show a label was actually read (the name heuristic fills something on any text)
+CORE_FIELDS = ("batch_number", "expiry_date", "manufacturing_date", "dosage", "registration_number")
+
+
+@dataclass(frozen=True)
+class OCRTier:
+    name: str
+    preprocess: str             # preprocessing variant, a key of the preprocessors passed to OCRCascade.run
+    lang: str
+    psm: int
+    oem: int
+    max_megapixels: float = 0.0  # downscale before preprocessing, 0 keeps the decoded size
+
+    def describe(self) -> str:
+        return f"{self.name}:{self.preprocess}:{self.lang}:psm={self.psm}:oem={self.oem}:mp={self.max_megapixels}"
+
+
+@dataclass
+class CascadeConfig:
+    enabled: bool = True
+    tiers: Tuple[str, ...] = ("fast", "full", "sparse", "deskew")
+    min_confidence: float = 75.0    # mean word confidence (0-100) needed to stop early
+    min_fields: int = 3             # CORE_FIELDS that must be filled to stop early
+    fast_megapixels: float = 1.0
+    fast_lang: str = "por"
+
+    @classmethod
+    def from_env(cls) -> "CascadeConfig":
+        """Build the configuration from EXTRACTOR_OCR_* environment variables"""
+        return cls(
+            enabled=os.getenv("EXTRACTOR_OCR_CASCADE", "true").lower() in ("1", "true", "yes"),
+            tiers=tuple(name.strip() for name in os.getenv("EXTRACTOR_OCR_TIERS", "fast,full,sparse,deskew").split(",")
+                        if name.strip()),
+            min_confidence=float(os.getenv("EXTRACTOR_OCR_MIN_CONFIDENCE", 75.0)),
+            min_fields=int(os.getenv("EXTRACTOR_OCR_MIN_FIELDS", 3)),
+            fast_megapixels=float(os.getenv("EXTRACTOR_OCR_FAST_MEGAPIXELS", 1.0)),
+            fast_lang=os.getenv("EXTRACTOR_OCR_FAST_LANG", "por"),
+        )
+
+    def build_tiers(self, lang: str) -> List[OCRTier]:
+        """The configured tiers, cheapest first; ``lang`` is the language set of the heavier tiers"""
+        available = {
+            # Downscaled, text rows only, one language, LSTM only
+            "fast": OCRTier("fast", "light", self.fast_lang, psm=6, oem=1, max_megapixels=self.fast_megapixels),
+            # The single-pass pipeline: blur + adaptive threshold, both languages, uniform block
+            "full": OCRTier("full", "full", lang, psm=6, oem=3),
+            # Same image, sparse text segmentation for labels whose lines are not one block
+            "sparse": OCRTier("sparse", "full", lang, psm=11, oem=3),
+            # Rotation corrected before the full preprocessing
+            "deskew": OCRTier("deskew", "deskew", lang, psm=6, oem=3),
+        }
+        unknown = [name for name in self.tiers if name not in available]
+        if unknown:
+            raise ValueError(f"Unknown OCR tiers: {', '.join(unknown)} (choose from {', '.join(available)})")
+        return [available[name] for name in self.tiers]
+
+    def describe(self) -> str:
+        return (f"tiers={','.join(self.tiers)}:conf={self.min_confidence}:fields={self.min_fields}"
+                f":fast_mp={self.fast_megapixels}:fast_lang={self.fast_lang}")
+
+
+@dataclass
+class OCRAttempt:
+    tier: str
+    text: str
+    confidence: float           # mean word confidence, 0-100
+    fields: Dict[str, str]
+    seconds: float
+
+    @property
+    def filled(self) -> int:
+        return sum(1 for name in CORE_FIELDS if self.fields.get(name))
+
+    def rank(self) -> Tuple[int, float]:
+        return self.filled, self.confidence
+
+
+@dataclass
+class CascadeResult:
+    text: str
+    tier: str
+    confidence: float
+    fields: Dict[str, str]
+    attempts: List[OCRAttempt] = field(default_factory=list)
+
+    def summary(self) -> Dict[str, Any]:
+        """The ``ocr`` block of the API response"""
+        return {
+            "tier": self.tier,
+            "confidence": round(self.confidence, 1),
+            "tiers_tried": [attempt.tier for attempt in self.attempts],
+        }
+
+
+def mean_confidence(confidences: List[float]) -> float:
+    words = [conf for conf in confidences if conf >= 0]
+    return sum(words) / len(words) if words else 0.0
+
+
+class OCRCascade:
+    """Tiered OCR with early exit.
+
+    Tiers run cheapest first. After each one the text is parsed, and the
+    cascade stops as soon as the mean word confidence and the number of
+    filled core fields both clear their thresholds; otherwise it escalates
+    and finally keeps the best reading (most core fields, then highest
+    confidence). Tiers with the same language, PSM and OEM share one OCR
+    backend, created on first use unless the caller passes one in.
+    """
+
+    def __init__(self, config: CascadeConfig, lang: str, parse: Callable[[str], Dict[str, str]],
+                 backends: Optional[List[OCRBackend]] = None,
+                 backend_factory: Callable[..., OCRBackend] = create_ocr_backend):
+        self.config = config
+        self.tiers = config.build_tiers(lang)
+        self.parse = parse
+        self.backend_factory = backend_factory
+        # Engines the caller already has (the extractor's own serves "full" and "deskew")
+        self._backends: Dict[Tuple[str, int, int], OCRBackend] = {
+            (backend.lang, backend.psm, backend.oem): backend for backend in backends or []
+        }
+        self._lock = threading.Lock()
+
+    def backend(self, tier: OCRTier) -> OCRBackend:
+        settings = (tier.lang, tier.psm, tier.oem)
+        backend = self._backends.get(settings)
+        if backend is None:
+            with self._lock:
+                backend = self._backends.get(settings)
+                if backend is None:
+                    backend = self._backends[settings] = self.backend_factory(lang=tier.lang, psm=tier.psm, oem=tier.oem)
+        return backend
+
+    def accepts(self, attempt: OCRAttempt) -> bool:
+        return attempt.confidence >= self.config.min_confidence and attempt.filled >= self.config.min_fields
+
+    def run(self, image, preprocessors: Dict[str, Callable[[Any, OCRTier], Optional[Any]]],
+            known: Optional[Dict[str, str]] = None) -> CascadeResult:
+        """OCR ``image`` tier by tier; a preprocessor returning None skips its tier (nothing to correct).
+
+        ``known`` fields (read from a barcode) count as filled, so OCR only
+        has to find the rest before the cascade can stop.
+        """
+        known = known or {}
+        attempts: List[OCRAttempt] = []
+        best: Optional[OCRAttempt] = None
+        for tier in self.tiers:
+            start = time.perf_counter()
+            try:
+                with stage("preprocess"):
+                    processed = preprocessors[tier.preprocess](image, tier)
+                if processed is None:
+                    continue
+                with stage("ocr"):
+                    text, confidences = self.backend(tier).image_to_data(processed)
+            except Exception as e:
+                print(f"OCR Error ({tier.name} tier): {e}")
+                continue
+
+            text = text.strip()
+            fields = {**(self.parse(text) if text else {}), **known}
+            attempt = OCRAttempt(tier.name, text, mean_confidence(confidences), fields, time.perf_counter() - start)
+            attempts.append(attempt)
+            if text and (best is None or attempt.rank() > best.rank()):
+                best = attempt
+            if text and self.accepts(attempt):
+                break
+
+        if best is None:
+            return CascadeResult("", "none", 0.0, {}, attempts)
+        tag("ocr_tier", best.tier)
+        return CascadeResult(best.text, best.tier, best.confidence, best.fields, attempts)
+
+    def close(self) -> None:
+        with self._lock:
+            for backend in self._backends.values():
+                backend.close()
+            self._backends.clear()
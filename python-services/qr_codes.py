@@ -0,0 +1,300 @@
+import os
+import json
+import zlib
+import base64
+import threading
+from io import BytesIO
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from PIL import Image
+
+from lazy_imports import LazyModule
+
+qrcode = LazyModule("qrcode")
+
+# Bump when the payload layout changes; decoders dispatch on it
+PAYLOAD_VERSION = 1
+
+# DrugInfo attribute -> short payload key
+PAYLOAD_KEYS = {
+    'name': 'n',
+    'batch_number': 'b',
+    'expiry_date': 'e',
+    'manufacturing_date': 'm',
+    'dosage': 'd',
+    'manufacturer': 'f',
+    'registration_number': 'r',
+    'barcode': 'g',
+}
+
+# Prefix that marks a zlib + base45 payload (EU DCC style)
+BASE45_PREFIX = f"GQ{PAYLOAD_VERSION}:"
+BASE45_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
+
+# qrcode.constants.ERROR_CORRECT_* by level, resolved when the first code is rendered
+ERROR_CORRECTION = {
+    'L': 'ERROR_CORRECT_L',
+    'M': 'ERROR_CORRECT_M',
+    'Q': 'ERROR_CORRECT_Q',
+    'H': 'ERROR_CORRECT_H',
+}
+
+Matrix = List[List[bool]]  # dark modules, quiet zone included
+
+IMAGE_FORMATS = ('png', 'svg', 'matrix')
+MEDIA_TYPES = {'png': 'image/png', 'svg': 'image/svg+xml', 'matrix': 'application/json'}
+
+
+def base45_encode(data: bytes) -> str:
+    """RFC 9285 base45, every character is in the QR alphanumeric set"""
+    chars = []
+    for i in range(0, len(data) - 1, 2):
+        value = data[i] * 256 + data[i + 1]
+        value, c = divmod(value, 45)
+        e, d = divmod(value, 45)
+        chars += [BASE45_ALPHABET[c], BASE45_ALPHABET[d], BASE45_ALPHABET[e]]
+    if len(data) % 2:
+        d, c = divmod(data[-1], 45)
+        chars += [BASE45_ALPHABET[c], BASE45_ALPHABET[d]]
+    return "".join(chars)
+
+
+def base45_decode(text: str) -> bytes:
+    values = [BASE45_ALPHABET.index(char) for char in text]
+    out = bytearray()
+    for i in range(0, len(values), 3):
+        chunk = values[i:i + 3]
+        if len(chunk) == 3:
+            value = chunk[0] + chunk[1] * 45 + chunk[2] * 45 * 45
+            out += bytes(divmod(value, 256))
+        else:
+            out.append(chunk[0] + chunk[1] * 45)
+    return bytes(out)
+
+
+def encode_payload(fields: Dict[str, str], encoding: str = "json") -> str:
+    """Compact, versioned QR payload for a DrugInfo-like dict.
+
+    Empty fields are dropped and keys shortened; there is deliberately no
+    timestamp, so the same drug always yields the same payload (and the
+    same cached QR code).
+    """
+    compact = {"v": PAYLOAD_VERSION}
+    for attribute, key in PAYLOAD_KEYS.items():
+        value = fields.get(attribute)
+        if value:
+            compact[key] = value
+    text = json.dumps(compact, separators=(',', ':'), ensure_ascii=False)
+    if encoding == "base45":
+        return BASE45_PREFIX + base45_encode(zlib.compress(text.encode('utf-8'), 9))
+    return text
+
+
+def decode_payload(payload: str) -> Dict[str, str]:
+    """Inverse of encode_payload, returns DrugInfo attribute names"""
+    if payload.startswith(BASE45_PREFIX):
+        payload = zlib.decompress(base45_decode(payload[len(BASE45_PREFIX):])).decode('utf-8')
+    compact = json.loads(payload)
+    if compact.get("v") != PAYLOAD_VERSION:
+        raise ValueError(f"Unsupported QR payload version: {compact.get('v')}")
+    return {attribute: compact[key] for attribute, key in PAYLOAD_KEYS.items() if key in compact}
+
+
+def matrix_runs(matrix: List[List[bool]]) -> Iterator[Tuple[int, int, int]]:
+    """(row, column, length) of every horizontal run of dark modules"""
+    size = len(matrix)
+    for y, row in enumerate(matrix):
+        x = 0
+        while x < size:
+            if row[x]:
+                start = x
+                while x < size and row[x]:
+                    x += 1
+                yield y, start, x - start
+            else:
+                x += 1
+
+
+def matrix_image(matrix: List[List[bool]], box_size: int = 1) -> Image.Image:
+    """1-bit image of a module matrix, ``box_size`` pixels per module"""
+    size = len(matrix)
+    image = Image.new('1', (size, size), 1)
+    image.putdata([0 if module else 1 for row in matrix for module in row])
+    if box_size > 1:
+        image = image.resize((size * box_size, size * box_size), Image.Resampling.NEAREST)
+    return image
+
+
+@dataclass
+class QRConfig:
+    encoding: str = "json"          # json (short keys) or base45 (zlib + base45)
+    image_format: str = "png"       # png, svg or matrix
+    response: str = "inline"        # inline image, or url to fetch it from GET /qr
+    box_size: int = 10              # pixels per module for png output
+    border: int = 4                 # quiet zone, in modules
+    error_correction: str = "L"
+    cache_size: int = 512           # rendered codes kept per process
+    base_url: str = ""              # prefix for qr urls, relative when empty
+
+    @classmethod
+    def from_env(cls) -> "QRConfig":
+        """Build the configuration from EXTRACTOR_QR_* environment variables"""
+        return cls(
+            encoding=os.getenv("EXTRACTOR_QR_ENCODING", "json"),
+            image_format=os.getenv("EXTRACTOR_QR_FORMAT", "png"),
+            response=os.getenv("EXTRACTOR_QR_RESPONSE", "inline"),
+            box_size=int(os.getenv("EXTRACTOR_QR_BOX_SIZE", 10)),
+            border=int(os.getenv("EXTRACTOR_QR_BORDER", 4)),
+            error_correction=os.getenv("EXTRACTOR_QR_ERROR_CORRECTION", "L").upper(),
+            cache_size=int(os.getenv("EXTRACTOR_QR_CACHE_SIZE", 512)),
+            base_url=os.getenv("EXTRACTOR_QR_BASE_URL", "").rstrip('/'),
+        )
+
+    def describe(self) -> str:
+        return (f"v{PAYLOAD_VERSION}:{self.encoding}:{self.image_format}:{self.response}:"
+                f"box={self.box_size}:border={self.border}:ec={self.error_correction}")
+
+
+def build_matrix(payload: str, config: QRConfig) -> Matrix:
+    """Encode ``payload``: version fitting, Reed-Solomon and mask selection (the expensive part)"""
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=getattr(qrcode.constants, ERROR_CORRECTION[config.error_correction]),
+        border=config.border,
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+    return qr.get_matrix()
+
+
+class _LRU:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._items: "OrderedDict[Any, Any]" = OrderedDict()
+
+    def get(self, key):
+        value = self._items.get(key)
+        if value is not None:
+            self._items.move_to_end(key)
+        return value
+
+    def set(self, key, value) -> None:
+        if self.max_entries <= 0:
+            return
+        self._items[key] = value
+        self._items.move_to_end(key)
+        while len(self._items) > self.max_entries:
+            self._items.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+
+class QRRenderer:
+    """Payload -> QR code renderer with an LRU of matrices and rendered images.
+
+    The module matrix (the expensive part: version fitting, Reed-Solomon
+    and mask selection) is cached per payload and shared by every output
+    format; PNGs are drawn straight from the matrix as a 1-bit image and
+    scaled with nearest neighbour instead of painting box by box.
+    """
+
+    def __init__(self, config: Optional[QRConfig] = None):
+        self.config = config or QRConfig()
+        if self.config.image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unknown QR format {self.config.image_format!r}, expected one of {IMAGE_FORMATS}")
+        self._matrices = _LRU(self.config.cache_size)
+        self._rendered = _LRU(self.config.cache_size)
+        self._lock = threading.Lock()
+        self.counters = {"hits": 0, "misses": 0}
+
+    def cached_matrix(self, payload: str) -> Optional[Matrix]:
+        with self._lock:
+            return self._matrices.get(payload)
+
+    def add_matrix(self, payload: str, matrix: Matrix) -> None:
+        """Cache a matrix built elsewhere (label sheet worker processes)"""
+        with self._lock:
+            self._matrices.set(payload, matrix)
+
+    def matrix(self, payload: str) -> Matrix:
+        """Module matrix for ``payload``, quiet zone included"""
+        cached = self.cached_matrix(payload)
+        if cached is not None:
+            return cached
+        matrix = build_matrix(payload, self.config)
+        self.add_matrix(payload, matrix)
+        return matrix
+
+    def render(self, payload: str, image_format: Optional[str] = None) -> Any:
+        """PNG bytes, SVG markup or a list of '0'/'1' row strings"""
+        image_format = image_format or self.config.image_format
+        if image_format not in IMAGE_FORMATS:
+            raise ValueError(f"Unknown QR format {image_format!r}, expected one of {IMAGE_FORMATS}")
+        key = (payload, image_format)
+        with self._lock:
+            cached = self._rendered.get(key)
+            self.counters["hits" if cached is not None else "misses"] += 1
+        if cached is not None:
+            return cached
+
+        matrix = self.matrix(payload)
+        if image_format == "png":
+            rendered = self._to_png(matrix)
+        elif image_format == "svg":
+            rendered = self._to_svg(matrix)
+        else:
+            rendered = ["".join("1" if module else "0" for module in row) for row in matrix]
+        with self._lock:
+            self._rendered.set(key, rendered)
+        return rendered
+
+    def _to_png(self, matrix: List[List[bool]]) -> bytes:
+        buffer = BytesIO()
+        matrix_image(matrix, self.config.box_size).save(buffer, format='PNG')
+        return buffer.getvalue()
+
+    def _to_svg(self, matrix: List[List[bool]]) -> str:
+        # One path, one rectangle per horizontal run of dark modules
+        size = len(matrix)
+        parts = [f"M{x} {y}h{run}v1h-{run}z" for y, x, run in matrix_runs(matrix)]
+        pixels = size * self.config.box_size
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" width="{pixels}" height="{pixels}" '
+            f'viewBox="0 0 {size} {size}" shape-rendering="crispEdges">'
+            f'<rect width="{size}" height="{size}" fill="#fff"/>'
+            f'<path fill="#000" d="{"".join(parts)}"/></svg>'
+        )
+
+    def url_for(self, payload: str, image_format: Optional[str] = None) -> str:
+        """URL of GET /qr for ``payload``, the payload itself is the cache key"""
+        image_format = image_format or self.config.image_format
+        return f"{self.config.base_url}/qr?format={image_format}&data={quote(payload, safe='')}"
+
+    def response_fields(self, fields: Dict[str, str]) -> Dict[str, Any]:
+        """QR fields for an API response: the payload plus the image inline once, or a URL"""
+        payload = encode_payload(fields, self.config.encoding)
+        response = {"qr_payload": payload, "qr_format": self.config.image_format}
+        if self.config.response == "url":
+            response["qr_url"] = self.url_for(payload)
+            return response
+
+        rendered = self.render(payload)
+        if self.config.image_format == "png":
+            rendered = base64.b64encode(rendered).decode()
+        response["qr_code"] = rendered
+        return response
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.counters["hits"] + self.counters["misses"]
+            return {
+                **self.counters,
+                "hit_ratio": round(self.counters["hits"] / lookups, 3) if lookups else 0.0,
+                "matrices": len(self._matrices),
+                "rendered": len(self._rendered),
+                "max_entries": self.config.cache_size,
+            }
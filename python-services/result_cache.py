@@ -0,0 +1,195 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+
+class ResultCache:
+    """Content-addressed cache of extraction results.
+
+    Keys are a SHA-256 of the image bytes plus a fingerprint of the
+    preprocessing/OCR/parsing configuration, so changing any of those
+    naturally invalidates old entries. Results live in an in-memory LRU
+    bounded by entry count and TTL, and optionally in a SQLite file that
+    survives restarts and is shared by every worker process. The file is
+    pruned every ``prune_interval`` seconds on write: expired rows are
+    deleted, then the oldest rows beyond ``max_disk_entries``.
+
+    ``get``/``set`` block on SQLite; async callers use ``aget``/``aset``,
+    which answer memory hits inline and run the disk tier in a thread.
+    """
+
+    def __init__(self, fingerprint: str = "", max_entries: int = 256,
+                 ttl: float = 3600.0, db_path: Optional[str] = None,
+                 max_disk_entries: int = 10000, prune_interval: float = 300.0):
+        self.fingerprint = fingerprint
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+        self.prune_interval = prune_interval
+        self._last_prune = 0.0
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.counters = {"hits_memory": 0, "hits_disk": 0, "misses": 0, "stores": 0, "evictions": 0,
+                         "disk_evictions": 0}
+        # A connection inherited through fork (preloading server) must not be used by the child
+        os.register_at_fork(after_in_child=self._forget_connections)
+
+        if self.db_path:
+            os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+            with self._connection() as conn:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS results ("
+                    "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS results_created_at ON results (created_at)")
+
+    @classmethod
+    def from_env(cls, fingerprint: str) -> "ResultCache":
+        """Build a cache from EXTRACTOR_CACHE_* environment variables"""
+        return cls(
+            fingerprint=fingerprint,
+            max_entries=int(os.getenv("EXTRACTOR_CACHE_SIZE", 256)),
+            ttl=float(os.getenv("EXTRACTOR_CACHE_TTL", 3600)),
+            db_path=os.getenv("EXTRACTOR_CACHE_DB") or None,
+            max_disk_entries=int(os.getenv("EXTRACTOR_CACHE_DB_MAX_ENTRIES", 10000)),
+            prune_interval=float(os.getenv("EXTRACTOR_CACHE_DB_PRUNE_SECONDS", 300)),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 or bool(self.db_path)
+
+    def _connection(self) -> sqlite3.Connection:
+        # SQLite connections cannot be shared across threads, keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _forget_connections(self) -> None:
+        self._local = threading.local()
+
+    def key_for(self, contents: bytes, version: str = "") -> str:
+        """Key of ``contents``; ``version`` is state that changes while running (the loaded catalog)"""
+        digest = hashlib.sha256(contents)
+        digest.update(self.fingerprint.encode())
+        digest.update(version.encode())
+        return digest.hexdigest()
+
+    def _count(self, counter: str) -> None:
+        with self._lock:
+            self.counters[counter] += 1
+
+    def _remember(self, key: str, value: Dict[str, Any], created_at: float) -> None:
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._memory[key] = (created_at, value)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+                self.counters["evictions"] += 1
+
+    def _get_memory(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if now - entry[0] <= self.ttl:
+                    self._memory.move_to_end(key)
+                    self.counters["hits_memory"] += 1
+                    return entry[1]
+                del self._memory[key]
+        return None
+
+    def _get_disk(self, key: str, now: float) -> Optional[Dict[str, Any]]:
+        """Disk tier lookup, counting the hit or the miss (blocking)"""
+        if self.db_path:
+            row = self._connection().execute(
+                "SELECT value, created_at FROM results WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and now - row[1] <= self.ttl:
+                value = json.loads(row[0])
+                self._remember(key, value, row[1])
+                self._count("hits_disk")
+                return value
+
+        self._count("misses")
+        return None
+
+    def _set_disk(self, key: str, value: Dict[str, Any], now: float) -> None:
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO results (key, value, created_at) VALUES (?, ?, ?)",
+                (key, json.dumps(value), now),
+            )
+        if now - self._last_prune >= self.prune_interval:
+            self.prune(now)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached result for ``key`` or None, checking memory then disk"""
+        now = time.time()
+        value = self._get_memory(key, now)
+        return value if value is not None else self._get_disk(key, now)
+
+    async def aget(self, key: str) -> Optional[Dict[str, Any]]:
+        """``get`` for the event loop: the SQLite lookup runs in a thread"""
+        now = time.time()
+        value = self._get_memory(key, now)
+        if value is not None:
+            return value
+        if not self.db_path:
+            return self._get_disk(key, now)
+        return await asyncio.to_thread(self._get_disk, key, now)
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        now = time.time()
+        self._remember(key, value, now)
+        if self.db_path:
+            self._set_disk(key, value, now)
+        self._count("stores")
+
+    async def aset(self, key: str, value: Dict[str, Any]) -> None:
+        """``set`` for the event loop: the SQLite write (and any pruning) runs in a thread"""
+        now = time.time()
+        self._remember(key, value, now)
+        if self.db_path:
+            await asyncio.to_thread(self._set_disk, key, value, now)
+        self._count("stores")
+
+    def prune(self, now: Optional[float] = None) -> int:
+        """Delete expired rows, then the oldest beyond max_disk_entries; returns the rows deleted"""
+        if not self.db_path:
+            return 0
+        now = time.time() if now is None else now
+        self._last_prune = now
+        with self._connection() as conn:
+            deleted = conn.execute("DELETE FROM results WHERE created_at < ?", (now - self.ttl,)).rowcount
+            if self.max_disk_entries > 0:
+                deleted += conn.execute(
+                    "DELETE FROM results WHERE key IN "
+                    "(SELECT key FROM results ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_disk_entries,),
+                ).rowcount
+        with self._lock:
+            self.counters["disk_evictions"] += deleted
+        return deleted
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.counters)
+            stats["memory_entries"] = len(self._memory)
+        lookups = stats["hits_memory"] + stats["hits_disk"] + stats["misses"]
+        stats["hit_ratio"] = round((stats["hits_memory"] + stats["hits_disk"]) / lookups, 4) if lookups else 0.0
+        stats["disk"] = self.db_path is not None
+        return stats
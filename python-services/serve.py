@@ -0,0 +1,110 @@
+"""Production server: preloaded, warmed-up worker processes behind one port.
+
+    python serve.py [--app drug_extractor_simple] [--workers 4] [--port 8000]
+                    [--max-requests 1000] [--max-requests-jitter 100]
+
+The service module is imported once in the master, and its preload()
+brings in everything that is safe to fork before the workers start:
+cv2, numpy, the OCR bindings, qrcode, the compiled rules and the catalog
+index. Workers share those pages and none pays the imports. Each worker
+then warms its own OCR engines, which must not cross a fork, on a
+built-in sample label. Workers are replaced after --max-requests
+requests, with jitter so they do not all restart together, which bounds
+the memory Tesseract and OpenCV accumulate.
+
+Readiness: the master binds the port before any worker is warm. A worker
+only accepts once its warm-up is done, so early connections wait in the
+listen backlog rather than fail. /ready answers 200 once any worker
+serves; it cannot report a worker that is still warming. The container
+HEALTHCHECK relies on that, with a start period covering the first
+warm-up.
+
+Each scrape of /metrics reaches one random worker, so with more than one
+worker the workers share a metrics directory (EXTRACTOR_METRICS_DIR, a
+fresh temporary directory unless set) and every scrape reports the sum
+over all of them; see metrics.ExtractorMetrics.
+
+Uses gunicorn with uvicorn workers; without gunicorn (e.g. on Windows) it
+falls back to uvicorn's own multi-process mode, which cannot recycle.
+Every option can also be set with EXTRACTOR_SERVER_* variables.
+"""
+import os
+import glob
+import argparse
+import tempfile
+from importlib import import_module
+
+try:
+    from gunicorn.app.base import BaseApplication
+    HAS_GUNICORN = True
+except ImportError:
+    HAS_GUNICORN = False
+
+SERVICES = ("drug_extractor", "drug_extractor_simple")
+
+
+if HAS_GUNICORN:
+    class ExtractorServer(BaseApplication):
+        """Gunicorn application serving ``<module>:app`` with the given settings"""
+
+        def __init__(self, module: str, options: dict):
+            self.module = module
+            self.options = options
+            super().__init__()
+
+        def load_config(self):
+            for key, value in self.options.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            # With preload_app this runs in the master, before the fork
+            module = import_module(self.module)
+            module.preload()
+            return module.app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--app", choices=SERVICES, default=os.getenv("EXTRACTOR_SERVER_APP", "drug_extractor"))
+    parser.add_argument("--host", default=os.getenv("EXTRACTOR_SERVER_HOST", "0.0.0.0"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("EXTRACTOR_SERVER_PORT", 8000)))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("EXTRACTOR_SERVER_WORKERS", os.cpu_count() or 1)),
+                        help="server processes, each with its own EXTRACTOR_MAX_WORKERS extraction threads")
+    parser.add_argument("--max-requests", type=int, default=int(os.getenv("EXTRACTOR_SERVER_MAX_REQUESTS", 1000)),
+                        help="recycle a worker after this many requests (0 disables)")
+    parser.add_argument("--max-requests-jitter", type=int,
+                        default=int(os.getenv("EXTRACTOR_SERVER_MAX_REQUESTS_JITTER", 100)))
+    parser.add_argument("--timeout", type=int, default=int(os.getenv("EXTRACTOR_SERVER_TIMEOUT", 120)),
+                        help="seconds a silent worker (stuck warm-up or OCR) gets before it is restarted")
+    parser.add_argument("--graceful-timeout", type=int, default=int(os.getenv("EXTRACTOR_SERVER_GRACEFUL_TIMEOUT", 30)))
+    args = parser.parse_args()
+
+    # Set before the app is imported: the service reads it when it builds its metrics
+    if args.workers > 1:
+        directory = os.environ.setdefault("EXTRACTOR_METRICS_DIR", tempfile.mkdtemp(prefix="extractor-metrics-"))
+        os.makedirs(directory, exist_ok=True)
+        # Snapshots of a previous server would otherwise be added to this one's totals
+        for path in glob.glob(os.path.join(directory, "metrics-*.json")):
+            os.remove(path)
+
+    if not HAS_GUNICORN:
+        import uvicorn
+        print("⚠️ gunicorn not installed: no preloading or worker recycling")
+        uvicorn.run(f"{args.app}:app", host=args.host, port=args.port, workers=args.workers)
+        return
+
+    ExtractorServer(args.app, {
+        "bind": f"{args.host}:{args.port}",
+        "workers": max(1, args.workers),
+        "worker_class": "uvicorn.workers.UvicornWorker",
+        "preload_app": True,
+        "max_requests": args.max_requests,
+        "max_requests_jitter": args.max_requests_jitter,
+        "timeout": args.timeout,
+        "graceful_timeout": args.graceful_timeout,
+        "accesslog": None,
+    }).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+import os
+import re
+import calendar
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Tuple
+
+from lazy_imports import LazyModule, importable
+
+# Decoder libraries are probed when a SymbolDecoder is built (see available_decoders); OpenCV only
+# on the OpenCV preprocessing backend, the PIL backend never loads cv2
+zxingcpp = LazyModule("zxingcpp")
+pylibdmtx = LazyModule("pylibdmtx.pylibdmtx")
+cv2 = LazyModule("cv2")
+np = LazyModule("numpy")
+
+# FNC1 as transmitted inside a GS1 element string; libdmtx may emit the raw codeword (232) instead
+GS = "\x1d"
+FNC1_CODEWORD = "\xe8"
+
+# Symbology identifiers a reader may prefix to GS1 data (DataMatrix, GS1-128, QR, DataBar)
+SYMBOLOGY_IDS = ("]d2", "]C1", "]Q3", "]e0")
+
+# Total length (AI + data) of the AIs with a predefined length, by their first two digits
+PREDEFINED_LENGTHS = {
+    "00": 20, "01": 16, "02": 16, "03": 16, "04": 18,
+    "11": 8, "12": 8, "13": 8, "14": 8, "15": 8, "16": 8, "17": 8, "18": 8, "19": 8,
+    "20": 4, "31": 10, "32": 10, "33": 10, "34": 10, "35": 10, "36": 10, "41": 16,
+}
+
+# Application identifiers mapped onto DrugInfo; 21 (serial) is kept in the symbol report only
+GS1_FIELDS = {
+    "01": "barcode",                # GTIN
+    "10": "batch_number",           # batch/lot
+    "11": "manufacturing_date",     # production date, YYMMDD
+    "17": "expiry_date",            # expiration date, YYMMDD
+    "713": "registration_number",   # national healthcare reimbursement number, Brazil (ANVISA)
+}
+
+
+def _ai_length(element: str) -> int:
+    """Digits in the AI at the start of ``element`` (GS1 General Specifications, section 3)"""
+    prefix = element[:2]
+    if prefix in ("00", "01", "02", "03", "04", "10", "11", "12", "13", "15", "16", "17",
+                  "20", "21", "22", "30", "37") or "90" <= prefix <= "99":
+        return 2
+    if prefix in ("31", "32", "33", "34", "35", "36", "39", "70", "72", "80", "81", "82"):
+        return 4
+    return 3
+
+
+def parse_gs1(data: str) -> Dict[str, str]:
+    """Split a GS1 element string into {AI: value}.
+
+    Accepts the raw form (FNC1 as GS, with or without a symbology
+    identifier) and the human readable "(01)...(17)..." form. Parsing stops
+    at the first element that cannot be delimited.
+    """
+    data = data.strip()
+    if data.startswith("("):
+        return {ai: value.strip() for ai, value in re.findall(r"\((\d{2,4})\)([^(]*)", data)}
+    for prefix in SYMBOLOGY_IDS:
+        if data.startswith(prefix):
+            data = data[len(prefix):]
+            break
+    data = data.replace(FNC1_CODEWORD, GS)
+
+    elements: Dict[str, str] = {}
+    pos = 0
+    while pos < len(data):
+        if data[pos] == GS:
+            pos += 1
+            continue
+        ai_length = _ai_length(data[pos:])
+        ai = data[pos:pos + ai_length]
+        if len(ai) < ai_length or not ai.isdigit():
+            break
+        fixed = PREDEFINED_LENGTHS.get(ai[:2])
+        if fixed:
+            end = pos + fixed
+            if end > len(data) or GS in data[pos:end]:
+                break
+        else:
+            end = data.find(GS, pos)
+            end = len(data) if end < 0 else end
+        elements[ai] = data[pos + ai_length:end]
+        pos = end
+    return elements
+
+
+def gtin_valid(gtin: str) -> bool:
+    """GS1 mod-10 check digit (GTIN-8/12/13/14)"""
+    if not gtin.isdigit() or len(gtin) not in (8, 12, 13, 14):
+        return False
+    digits = [int(d) for d in gtin.zfill(14)]
+    total = sum(d * (3 if i % 2 == 0 else 1) for i, d in enumerate(digits[:-1]))
+    return (10 - total % 10) % 10 == digits[-1]
+
+
+def gs1_date(value: str) -> str:
+    """YYMMDD to the dd/mm/yyyy labels print; day 00 means the last day of the month"""
+    if len(value) != 6 or not value.isdigit():
+        return ""
+    year, month, day = 2000 + int(value[:2]), int(value[2:4]), int(value[4:])
+    if not 1 <= month <= 12:
+        return ""
+    if day == 0:
+        day = calendar.monthrange(year, month)[1]
+    return f"{day:02d}/{month:02d}/{year}"
+
+
+def is_gs1(symbol_format: str, text: str, symbology: str = "") -> bool:
+    """GS1 data is flagged by a symbology identifier, FNC1 separators, HRI parentheses or the symbology.
+
+    ``symbology`` is the identifier a reader reports next to the text
+    (zxing-cpp does), the reliable signal when the text carries neither a
+    prefix nor FNC1 separators.
+    """
+    symbol_format = symbol_format.lower().replace(" ", "")
+    return (symbology in SYMBOLOGY_IDS
+            or text.startswith(("(", GS, FNC1_CODEWORD) + SYMBOLOGY_IDS) or GS in text
+            or "datamatrix" in symbol_format or "128" in symbol_format)
+
+
+def gs1_fields(elements: Dict[str, str]) -> Dict[str, str]:
+    """DrugInfo attributes carried by GS1 elements (invalid GTINs and dates dropped)"""
+    fields = {}
+    for ai, attribute in GS1_FIELDS.items():
+        value = elements.get(ai, "").strip()
+        if not value:
+            continue
+        if ai == "01":
+            value = value if gtin_valid(value) else ""
+        elif ai in ("11", "17"):
+            value = gs1_date(value)
+        elif ai == "10":
+            value = value.upper()
+        if value:
+            fields[attribute] = value
+    return fields
+
+
+@dataclass
+class Symbol:
+    format: str
+    text: str
+    elements: Dict[str, str] = field(default_factory=dict)   # GS1 AIs, empty for plain EAN/UPC
+    symbology: str = ""         # AIM symbology identifier (e.g. "]d2"), when the reader reports it
+
+
+@dataclass
+class SymbolReading:
+    symbols: List[Symbol] = field(default_factory=list)
+    fields: Dict[str, str] = field(default_factory=dict)
+
+    def covers(self, required: Tuple[str, ...]) -> bool:
+        return bool(required) and all(self.fields.get(name) for name in required)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """The ``symbols`` block of the API response"""
+        return [{"format": s.format, "text": s.text, "gs1": s.elements} for s in self.symbols]
+
+
+@dataclass
+class SymbolConfig:
+    enabled: bool = True
+    # Fields the symbol must provide for OCR to be skipped altogether
+    required_fields: Tuple[str, ...] = ("batch_number", "expiry_date")
+    timeout_ms: int = 300               # libdmtx search budget per image (zxing-cpp has no search budget)
+
+    @classmethod
+    def from_env(cls) -> "SymbolConfig":
+        """Build the configuration from EXTRACTOR_SYMBOL* environment variables"""
+        return cls(
+            enabled=os.getenv("EXTRACTOR_SYMBOLS", "true").lower() in ("1", "true", "yes"),
+            required_fields=tuple(name.strip() for name in
+                                  os.getenv("EXTRACTOR_SYMBOL_REQUIRED_FIELDS", "batch_number,expiry_date").split(",")
+                                  if name.strip()),
+            timeout_ms=int(os.getenv("EXTRACTOR_SYMBOL_TIMEOUT_MS", 300)),
+        )
+
+    def describe(self) -> str:
+        return f"required={','.join(self.required_fields)}:timeout={self.timeout_ms}"
+
+
+def available_decoders(opencv: bool = True) -> List[str]:
+    decoders = []
+    if importable("zxingcpp"):
+        decoders.append("zxing-cpp")
+    if importable("pylibdmtx.pylibdmtx"):
+        decoders.append("libdmtx")
+    if opencv and importable("cv2") and hasattr(cv2, "barcode"):
+        decoders.append("opencv")
+    return decoders
+
+
+class SymbolDecoder:
+    """Finds and decodes GS1 DataMatrix and EAN/UPC symbols with the local libraries installed.
+
+    zxing-cpp reads DataMatrix, EAN/UPC and GS1-128 in one pass and is used
+    alone when present; it has no search budget, so ``timeout_ms`` only
+    bounds libdmtx. Otherwise libdmtx covers DataMatrix and OpenCV's
+    barcode detector covers EAN/UPC, when ``opencv`` allows loading cv2.
+    ``required_fields`` is applied by the caller to the reading, whichever
+    library decoded it.
+    """
+
+    def __init__(self, config: SymbolConfig, opencv: bool = True):
+        self.config = config
+        self.decoders = available_decoders(opencv)
+        self._local = threading.local()
+
+    def describe(self) -> str:
+        return f"{'+'.join(self.decoders) or 'none'}:{self.config.describe()}"
+
+    def _opencv_detector(self) -> "cv2.barcode.BarcodeDetector":
+        # Detectors keep state between calls, one per worker thread
+        detector = getattr(self._local, "detector", None)
+        if detector is None:
+            detector = self._local.detector = cv2.barcode.BarcodeDetector()
+            # The default scales miss barcodes that fill much of a close-up photo; the extra ones cost ~10%
+            detector.setDetectorScales([0.01, 0.03, 0.06, 0.08, 0.12, 0.2])
+        return detector
+
+    def decode(self, image) -> List[Symbol]:
+        """Every symbol found in a grayscale ndarray or PIL image"""
+        if "zxing-cpp" in self.decoders:
+            # The enum name is stable across versions (str() is "Data Matrix" in zxing-cpp 3)
+            return [Symbol(result.format.name, result.text, symbology=result.symbology_identifier)
+                    for result in zxingcpp.read_barcodes(image)]
+
+        symbols = []
+        if "libdmtx" in self.decoders:
+            for result in pylibdmtx.decode(image, timeout=self.config.timeout_ms, max_count=1):
+                symbols.append(Symbol("DataMatrix", result.data.decode("latin-1")))
+        if "opencv" in self.decoders:
+            gray = image if hasattr(image, "shape") else np.asarray(image)
+            found, texts, types, _ = self._opencv_detector().detectAndDecodeWithType(gray)
+            if found:
+                symbols.extend(Symbol(kind, text) for text, kind in zip(texts, types) if text)
+        return symbols
+
+    def read(self, image) -> SymbolReading:
+        """Decoded symbols and the DrugInfo fields they carry; GS1 data wins over a plain EAN"""
+        reading = SymbolReading()
+        if not self.decoders:
+            return reading
+        for symbol in self.decode(image):
+            reading.symbols.append(symbol)
+            text = symbol.text.strip()
+            if text.isdigit() and len(text) in (8, 12, 13):
+                # EAN/UPC: a bare GTIN, stored as GTIN-14 like AI 01
+                if gtin_valid(text):
+                    reading.fields.setdefault("barcode", text.zfill(14))
+                continue
+            if is_gs1(symbol.format, symbol.text, symbol.symbology):
+                symbol.elements = parse_gs1(symbol.text)
+                reading.fields.update(gs1_fields(symbol.elements))
+        return reading
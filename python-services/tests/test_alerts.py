@@ -0,0 +1,127 @@
+import math
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from alerts import (AlertRules, AlertStore, downsample, evaluate_batch, parse_storage_range, run_evaluation,
+                    utcnow)
+from reparse import Checkpoint, Database
+
+NOW = datetime(2025, 10, 22, 12, 0, 0)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("Conservar entre 2-8°C", (2.0, 8.0)),
+    ("15 a 30 °C", (15.0, 30.0)),
+    ("between 8 and 2 °C", (2.0, 8.0)),
+    ("-25,5 – -15 °C", (-25.5, -15.0)),
+    ("Manter abaixo de 25°C", (math.nan, 25.0)),
+    ("Below 30 °C", (math.nan, 30.0)),
+    ("Refrigerado", (2.0, 8.0)),
+    ("Temperatura ambiente", (15.0, 30.0)),
+    ("Congelado", (-25.0, -15.0)),
+])
+def test_parse_storage_range(text, expected):
+    low, high = parse_storage_range(text)
+    assert (math.isnan(low) and math.isnan(expected[0])) or low == expected[0]
+    assert high == expected[1]
+
+
+@pytest.mark.parametrize("text", [None, "", "Proteger da luz"])
+def test_parse_storage_range_unknown(text):
+    assert all(math.isnan(bound) for bound in parse_storage_range(text))
+
+
+def row(medication_id, days=None, temperature=None, conditions=None, status="ACTIVE"):
+    expires = NOW + timedelta(days=days) if days is not None else None
+    return (medication_id, expires, temperature, conditions, "NORMAL", status)
+
+
+def test_evaluate_batch_levels_and_alerts():
+    rows = [
+        row("fine", days=365, temperature=5.0, conditions="2-8°C"),
+        row("warning", days=20),
+        row("critical", days=3),
+        row("expired", days=-1),
+        row("warm", temperature=9.0, conditions="2-8°C"),
+        row("hot", temperature=12.0, conditions="2-8°C"),
+        row("cooked", temperature=20.0, conditions="2-8°C"),
+        row("frozen", temperature=1.0, conditions="Refrigerado"),
+        row("unknown", temperature=50.0),
+    ]
+    levels, alerts = evaluate_batch(rows, NOW, AlertRules())
+    assert [int(level) for level in levels] == [0, 1, 2, 2, 1, 2, 3, 1, 0]
+    assert alerts["warning", "EXPIRATION_WARNING"][0] == "WARNING"
+    assert alerts["critical", "EXPIRATION_CRITICAL"][0] == "CRITICAL"
+    assert alerts["expired", "EXPIRED"] == ("CRITICAL", "Expired on 2025-10-21")
+    assert alerts["warm", "TEMPERATURE_HIGH"] == ("WARNING", "9.0°C is above the 8°C storage limit")
+    assert alerts["cooked", "TEMPERATURE_HIGH"][0] == "EMERGENCY"
+    assert alerts["frozen", "TEMPERATURE_LOW"][0] == "WARNING"
+    assert len(alerts) == 7
+
+
+def test_evaluate_batch_ignores_medications_that_are_not_active():
+    rows = [row("recalled", days=-1, temperature=20.0, conditions="2-8°C", status="RECALLED"),
+            row("inactive", days=3, status="INACTIVE")]
+    levels, alerts = evaluate_batch(rows, NOW, AlertRules())
+    assert levels.tolist() == [0, 0]
+    assert alerts == {}
+
+
+def test_downsample_keeps_each_sensors_latest_window():
+    latest = {}
+    downsample([
+        {"storageLocation": "fridge-1", "temperature": 4.0, "recordedAt": "2025-10-22T12:00:10Z"},
+        {"storageLocation": "fridge-1", "temperature": 6.0, "recordedAt": "2025-10-22T12:00:50Z"},
+        {"storageLocation": "fridge-1", "temperature": 30.0, "recordedAt": "2025-10-22T11:50:00Z"},
+        {"storageLocation": "fridge-2", "temperature": 3.0, "recordedAt": "2025-10-22T09:00:00-03:00"},
+        {"storageLocation": "fridge-2", "temperature": "n/a"},
+        {"temperature": 99.0},
+    ], "storageLocation", 60, latest)
+    # A later chunk adds to the same window, an older one is ignored
+    downsample([
+        {"storageLocation": "fridge-1", "temperature": 8.0, "recordedAt": "2025-10-22T12:00:30+00:00"},
+        {"storageLocation": "fridge-2", "temperature": 40.0, "recordedAt": "2025-10-22T11:00:00Z"},
+    ], "storageLocation", 60, latest)
+
+    averages = {key: total / count for key, (_, total, count) in latest.items()}
+    assert averages == {"fridge-1": 6.0, "fridge-2": 3.0}
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / "alerts.db"
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE medications (id TEXT PRIMARY KEY, "expirationDate" TEXT, '
+                 '"currentTemperature" REAL, "storageConditions" TEXT, "alertLevel" TEXT DEFAULT \'NORMAL\', '
+                 'status TEXT DEFAULT \'ACTIVE\', "storageLocation" TEXT, "updatedAt" TEXT)')
+    conn.execute('CREATE TABLE medication_alerts (id TEXT PRIMARY KEY, "medicationId" TEXT, type TEXT, '
+                 'severity TEXT, message TEXT, "isResolved" INTEGER DEFAULT 0, "resolvedAt" TEXT, '
+                 '"resolvedBy" TEXT, "createdAt" TEXT, "updatedAt" TEXT)')
+    conn.commit()
+    conn.close()
+    database = Database(f"sqlite:///{path}")
+    yield AlertStore(database)
+    database.close()
+
+
+def test_alerts_of_a_medication_leaving_active_are_resolved(store, tmp_path):
+    soon = (utcnow() + timedelta(days=3)).isoformat()
+    conn = store.db.conn
+    conn.execute('INSERT INTO medications (id, "expirationDate", "updatedAt") VALUES (?, ?, ?)',
+                 ("m1", soon, "2025-01-01T00:00:00"))
+    conn.commit()
+    state = Checkpoint(str(tmp_path / "alerts.checkpoint.json"))
+
+    totals = run_evaluation(store, state, AlertRules(), 100, timedelta(0))
+    assert totals["opened"] == 1
+    assert conn.execute('SELECT "alertLevel" FROM medications').fetchone()[0] == "CRITICAL"
+
+    conn.execute('UPDATE medications SET status = ?, "updatedAt" = ?',
+                 ("RECALLED", (utcnow() + timedelta(seconds=1)).isoformat()))
+    conn.commit()
+    totals = run_evaluation(store, state, AlertRules(), 100, timedelta(0))
+    assert totals["evaluated"] == 1 and totals["resolved"] == 1
+    assert conn.execute('SELECT "alertLevel" FROM medications').fetchone()[0] == "NORMAL"
+    assert conn.execute('SELECT "isResolved", "resolvedBy" FROM medication_alerts').fetchone() == (1, "alert-engine")
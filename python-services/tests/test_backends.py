@@ -0,0 +1,43 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+from drug_extractor.backends import Preprocessor
+from ocr_backends import OCRBackend
+from symbols import available_decoders
+
+
+@pytest.mark.parametrize("base", [Preprocessor, OCRBackend])
+def test_backend_interfaces_are_abstract(base):
+    with pytest.raises(TypeError):
+        base(None)
+
+
+def test_decoder_probe_skips_opencv_when_not_allowed():
+    assert "opencv" not in available_decoders(opencv=False)
+
+
+def test_pil_extractor_loads_no_heavy_library():
+    code = ("import sys\n"
+            "from drug_extractor import BackendConfig, DrugSpecExtractor\n"
+            "DrugSpecExtractor(BackendConfig(preprocess='pil', fallback='sample'))\n"
+            "print(sorted(name for name in ('cv2', 'numpy', 'pytesseract') if name in sys.modules))")
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                               cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               env={"EXTRACTOR_WARMUP": "false", "EXTRACTOR_CACHE_SIZE": "0"})
+    assert completed.stdout.strip().splitlines()[-1] == "[]"
+
+
+def test_simple_entry_point_exposes_the_package_service_api():
+    code = ("import drug_extractor, drug_extractor_simple\n"
+            "service = sorted(name for name, module in drug_extractor._EXPORTS.items() if module == 'service')\n"
+            "simple = sorted(name for name in vars(drug_extractor_simple)\n"
+            "                if not name.startswith('_') and name not in ('os', 'extractor'))\n"
+            "print(service == simple and all(getattr(drug_extractor, name) is getattr(drug_extractor_simple, name)\n"
+            "                                for name in service))")
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                               cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               env={"EXTRACTOR_WARMUP": "false", "EXTRACTOR_CACHE_SIZE": "0"})
+    assert completed.stdout.strip().splitlines()[-1] == "True"
@@ -0,0 +1,38 @@
+from benchmarks.ocr_backends import percentile
+from benchmarks.synthetic_labels import SCORED_FIELDS, generate_corpus
+from benchmarks.throughput import score, summarize
+
+
+def test_corpus_is_deterministic():
+    first = generate_corpus(count=2, megapixels=(0.1,), noise_levels=(0.0, 0.35), seed=7)
+    second = generate_corpus(count=2, megapixels=(0.1,), noise_levels=(0.0, 0.35), seed=7)
+    assert [label.key for label in first] == ["000-0.1mp-n0", "000-0.1mp-n0.35", "001-0.1mp-n0", "001-0.1mp-n0.35"]
+    assert [label.image for label in first] == [label.image for label in second]
+    # Noise changes the image, never the expected text
+    assert first[0].expected == first[1].expected
+    assert set(first[0].expected) == set(SCORED_FIELDS)
+
+
+def test_percentile():
+    assert percentile([3, 1, 2], 50) == 2
+    assert percentile([1, 2, 3, 4], 99) == 4
+
+
+def test_score_ignores_case_and_whitespace():
+    expected = {name: "X" for name in SCORED_FIELDS}
+    hits = score({**expected, "name": " x ", "dosage": "Y"}, expected)
+    assert hits["name"] and not hits["dosage"]
+    assert not any(score(None, expected).values())
+
+
+def test_summarize():
+    expected = {name: "X" for name in SCORED_FIELDS}
+    samples = [("1mp", b"", expected), ("1mp", b"", expected)]
+    outcomes = [("1mp", 10.0, expected, None, "fast"), ("1mp", 30.0, None, "no text extracted", None)]
+    report = summarize(samples, outcomes, 2.0)
+    assert report["images"] == 2 and report["errors"] == 1
+    assert report["images_per_sec"] == 1.0
+    assert report["latency_ms"]["max"] == 30.0
+    assert report["accuracy"]["mean"] == 0.5 and report["accuracy"]["all_fields"] == 0.5
+    assert report["ocr_tiers"] == {"fast": 1}
+    assert report["by_variant"]["1mp"]["accuracy"] == 0.5
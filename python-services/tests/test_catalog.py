@@ -0,0 +1,35 @@
+import os
+
+from catalog import Catalog, CatalogConfig, build_index
+
+PRODUCTS = "nome,registro,fabricante,dosagem\nDIPIRONA SODICA,1.0235.0123.001-1,EMS,500mg\nAMOXICILINA,1.0573.0456.002-2,Medley,500mg\n"
+
+
+def write(path, text, mtime):
+    path.write_text(text)
+    os.utime(path, (mtime, mtime))
+
+
+def test_startup_builds_a_missing_or_stale_index(tmp_path):
+    source = tmp_path / "produtos.csv"
+    write(source, PRODUCTS, 1_000_000)
+    catalog = Catalog(CatalogConfig(path=str(source), reload_seconds=0))
+    assert catalog.index.products == 2
+    assert catalog.correct({"name": "DIPIRONA SODlCA"}, "DIPIRONA SODlCA")[0]["name"] == "DIPIRONA SODICA"
+
+
+def test_reload_reopens_but_never_builds(tmp_path):
+    source = tmp_path / "produtos.csv"
+    write(source, PRODUCTS, 1_000_000)
+    catalog = Catalog(CatalogConfig(path=str(source), reload_seconds=0))
+    digest = catalog.describe()
+
+    # A newer product list alone is left for `catalog.py build` or the next start
+    write(source, PRODUCTS + "PARACETAMOL,1.0000.0001.001-1,Neo,750mg\n", 2_000_000)
+    assert catalog.reload() is False
+    assert catalog.index.products == 2
+
+    build_index(str(source), catalog.config.index_path)
+    assert catalog.reload() is True
+    assert catalog.index.products == 3
+    assert catalog.describe() != digest
@@ -0,0 +1,104 @@
+import asyncio
+import tempfile
+import time
+
+import pytest
+
+from job_queue import DONE, FAILED, QUEUED, RUNNING, JobQueue, JobQueueConfig, JobRejectedError, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(JobQueueConfig(db_path=str(tmp_path / "jobs.db"), max_queued=3, lease=60, max_attempts=2))
+
+
+def test_default_file_is_per_service(monkeypatch):
+    monkeypatch.delenv("EXTRACTOR_JOBS_DB", raising=False)
+    a, b = JobQueueConfig.from_env("extractor-a"), JobQueueConfig.from_env("extractor-b")
+    assert a.db_path != b.db_path
+    assert a.db_path.startswith(tempfile.gettempdir())
+    monkeypatch.setenv("EXTRACTOR_JOBS_DB", "/data/jobs.db")
+    assert JobQueueConfig.from_env("extractor-a").db_path == "/data/jobs.db"
+
+
+def test_identical_images_share_a_job_and_raise_its_priority(store):
+    first, deduplicated = store.submit("key", b"image")
+    assert not deduplicated
+    assert store.submit("key", b"image", priority=5) == (first, True)
+    assert store.get(first)["priority"] == 5
+
+
+def test_claims_follow_priority_then_age_and_the_queue_is_bounded(store):
+    low, _ = store.submit("a", b"a")
+    high, _ = store.submit("b", b"b", priority=10)
+    store.submit("c", b"c")
+    with pytest.raises(JobRejectedError):
+        store.submit("d", b"d")
+
+    assert store.claim() == (high, b"b", 1)
+    assert store.claim()[0] == low
+    assert store.get(low)["status"] == RUNNING
+    assert store.stats() == {QUEUED: 1, RUNNING: 2, DONE: 0, FAILED: 0}
+
+
+def test_expired_lease_is_retried_and_the_stale_run_is_dropped(store, monkeypatch):
+    job_id, _ = store.submit("key", b"image")
+    _, _, first = store.claim()
+
+    clock = [time.time() + 120]
+    monkeypatch.setattr("job_queue.time.time", lambda: clock[0])
+    assert store.maintain() == (1, 0)
+    _, _, second = store.claim()
+    assert second == 2
+
+    # The slow first run finishes after the job was claimed again
+    assert not store.finish(job_id, first, {"name": "stale"})
+    assert store.get(job_id)["status"] == RUNNING
+    assert store.finish(job_id, second, {"name": "fresh"})
+    assert store.get(job_id)["result"] == {"name": "fresh"}
+
+
+def test_expired_job_still_queued_takes_the_late_result(store, monkeypatch):
+    job_id, _ = store.submit("key", b"image")
+    _, _, attempt = store.claim()
+    clock = [time.time() + 120]
+    monkeypatch.setattr("job_queue.time.time", lambda: clock[0])
+    store.maintain()
+    assert store.finish(job_id, attempt, {"name": "late"})
+    assert store.get(job_id)["status"] == DONE
+    assert store.claim() is None
+
+
+def test_lost_jobs_fail_after_max_attempts(store, monkeypatch):
+    job_id, _ = store.submit("key", b"image")
+    clock = [1000.0]
+    monkeypatch.setattr("job_queue.time.time", lambda: clock[0])
+    for _ in range(2):
+        store.claim()
+        clock[0] += 120
+        store.maintain()
+    job = store.get(job_id)
+    assert job["status"] == FAILED
+    assert job["error"] == "Worker lost while processing the job"
+
+
+def test_queue_dispatches_jobs_to_the_handler(store):
+    async def handler(contents):
+        return {"length": len(contents)} if contents else None
+
+    async def run():
+        queue = JobQueue(store, handler)
+        done, _ = await queue.submit("a", b"abc")
+        empty, _ = await queue.submit("b", b"")
+        for _ in range(100):
+            if (await queue.get(done))["status"] == DONE and (await queue.get(empty))["status"] == FAILED:
+                break
+            await asyncio.sleep(0.02)
+        stats = await queue.stats()
+        await queue.stop()
+        return await queue.get(done), await queue.get(empty), stats
+
+    done, empty, stats = asyncio.run(run())
+    assert done["result"] == {"length": 3}
+    assert empty["error"] == "No text could be extracted from the image"
+    assert stats[DONE] == 1 and stats[FAILED] == 1
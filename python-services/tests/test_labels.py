@@ -0,0 +1,65 @@
+import re
+import zlib
+
+import pytest
+
+from labels import PDFStream, SheetLayout, SheetRenderer, paginate, render_page_job
+from qr_codes import QRConfig, QRRenderer
+
+LABELS = [(f"LOT-42-{serial:04d}", f"#{serial}") for serial in range(12)]
+
+
+def objects_at_xref_offsets(document: bytes):
+    """Object number found at each in-use xref offset"""
+    xref = int(re.search(rb"startxref\n(\d+)\n%%EOF\n$", document).group(1))
+    table = document[xref:].split(b"trailer")[0].splitlines()[3:]
+    found = []
+    for number, entry in enumerate(table, start=1):
+        offset = int(entry[:10])
+        found.append((number, int(re.match(rb"(\d+) 0 obj\n", document[offset:]).group(1))))
+    return found
+
+
+def test_pdf_stream_offsets_and_page_tree():
+    layout = SheetLayout(columns=2, rows=2)
+    document = PDFStream(layout)
+    chunks = [document.header()]
+    for content in (zlib.compress(b"0 g"), zlib.compress(b"1 g")):
+        chunks.append(document.page(content))
+    chunks.append(document.trailer())
+    pdf = b"".join(chunks)
+
+    assert pdf.startswith(b"%PDF-1.4\n")
+    assert all(number == found for number, found in objects_at_xref_offsets(pdf))
+    assert b"/Kids [5 0 R 7 0 R] /Count 2" in pdf
+    assert b"trailer\n<< /Size 8 /Root 1 0 R >>" in pdf
+
+
+def test_paginate():
+    pages = list(paginate(LABELS, 5))
+    assert [len(page) for page in pages] == [5, 5, 2]
+
+
+@pytest.mark.parametrize("workers", [0, 1])
+def test_sheet_pdf_counts_pages_and_keeps_matrices_in_the_parent(workers):
+    qr = QRRenderer(QRConfig())
+    renderer = SheetRenderer(workers=workers, renderer=qr)
+    layout = SheetLayout(columns=2, rows=3)
+    try:
+        pdf = b"".join(renderer.pdf(LABELS, layout))
+        assert pdf.count(b"/Type /Page ") == 2
+        # Every payload was encoded once, and the parent holds the result for the next sheet
+        assert all(qr.cached_matrix(payload) is not None for payload, _ in LABELS)
+        assert b"".join(renderer.pdf(LABELS, layout)) == pdf
+    finally:
+        renderer.shutdown()
+
+
+def test_page_job_builds_only_missing_matrices():
+    config = QRConfig()
+    qr = QRRenderer(config)
+    page = LABELS[:3] + LABELS[:1]
+    known = {LABELS[0][0]: qr.matrix(LABELS[0][0])}
+    content, built = render_page_job(page, SheetLayout(), "png", known, config)
+    assert content.startswith(b"\x89PNG")
+    assert set(built) == {LABELS[1][0], LABELS[2][0]}
@@ -0,0 +1,62 @@
+import os
+import sys
+
+import pytest
+
+from metrics import ExtractorMetrics, StageTimings, collect_timings, observe, stage, tag
+
+
+def sample(text, prefix):
+    return [line for line in text.splitlines() if line.startswith(prefix)]
+
+
+def test_stage_timings_are_collected_per_job():
+    with collect_timings() as timings:
+        with stage("ocr"):
+            pass
+        observe("megapixels", 1.5)
+        tag("ocr_tier", "light")
+    assert set(timings.stages) == {"ocr"}
+    assert timings.values == {"megapixels": 1.5}
+    assert timings.tags == {"ocr_tier": "light"}
+    assert timings.server_timing().startswith("ocr;dur=")
+
+
+def test_single_process_render():
+    metrics = ExtractorMetrics()
+    metrics.gauge("extractor_queue_depth", "queued", lambda: 3)
+    timings = StageTimings()
+    timings.add("ocr", 0.2)
+    metrics.observe_job(timings, 1000, "ok")
+
+    text = metrics.render()
+    assert sample(text, "extractor_images_total") == ['extractor_images_total{outcome="ok"} 1']
+    assert sample(text, "extractor_queue_depth") == ["extractor_queue_depth 3"]
+    assert 'extractor_stage_seconds_bucket{stage="ocr",le="0.25"} 1' in text
+    assert 'extractor_stage_seconds_count{stage="ocr"} 1' in text
+
+
+@pytest.mark.skipif(not hasattr(os, "fork") or sys.platform == "win32", reason="needs fork")
+def test_shared_directory_sums_workers_and_keeps_exited_ones(tmp_path):
+    metrics = ExtractorMetrics(str(tmp_path))
+    metrics.gauge("extractor_queue_depth", "queued", lambda: 2)
+    metrics.gauge("extractor_async_jobs", "jobs", lambda: {("queued",): 5}, ["status"], aggregate="shared")
+    metrics.images.inc(outcome="ok")
+
+    pid = os.fork()
+    if pid == 0:
+        # Counts made before the fork belong to the parent only
+        metrics.images.inc(outcome="ok")
+        metrics.images.inc(outcome="ok")
+        metrics.flush()
+        os._exit(0)
+    os.waitpid(pid, 0)
+
+    for _ in range(2):
+        text = metrics.render()
+        assert sample(text, "extractor_images_total") == ['extractor_images_total{outcome="ok"} 3']
+        # The exited worker's gauge is dropped, the shared one is read once
+        assert sample(text, "extractor_queue_depth") == ["extractor_queue_depth 2"]
+        assert sample(text, "extractor_async_jobs") == ['extractor_async_jobs{status="queued"} 5']
+    assert not (tmp_path / f"metrics-{pid}.json").exists()
+    assert (tmp_path / "metrics-archive.json").exists()
@@ -0,0 +1,82 @@
+import pytest
+
+from field_parser import COMMON_PATTERNS, FieldParser
+from ocr_backends import OCRBackend
+from ocr_cascade import CascadeConfig, OCRCascade, mean_confidence
+
+FULL_LABEL = "DIPIRONA 500mg\nLote: ABC123\nVenc: 12/12/2026\nFab: 01/12/2024\nReg MS: 1.2345.6789"
+
+
+class FakeBackend(OCRBackend):
+    """Answers with a fixed reading per language/PSM and records the calls"""
+
+    name = "fake"
+    readings = {}
+    calls = []
+
+    def image_to_string(self, image):
+        return self.image_to_data(image)[0]
+
+    def image_to_data(self, image):
+        FakeBackend.calls.append((self.lang, self.psm))
+        return FakeBackend.readings.get((self.lang, self.psm), ("", []))
+
+
+@pytest.fixture
+def cascade():
+    FakeBackend.calls = []
+    parser = FieldParser(COMMON_PATTERNS)
+    return OCRCascade(CascadeConfig(), "por+eng", parser.parse, backend_factory=FakeBackend)
+
+
+def preprocessors(skip=()):
+    return {name: (lambda image, tier, name=name: None if name in skip else image)
+            for name in ("light", "full", "deskew")}
+
+
+def test_build_tiers_rejects_unknown_names():
+    with pytest.raises(ValueError, match="Unknown OCR tiers: turbo"):
+        CascadeConfig(tiers=("fast", "turbo")).build_tiers("por")
+
+
+def test_mean_confidence_ignores_non_words():
+    assert mean_confidence([90, -1, 70]) == 80
+    assert mean_confidence([-1]) == 0.0
+
+
+def test_stops_at_first_accepted_tier(cascade):
+    FakeBackend.readings = {("por", 6): (FULL_LABEL, [95, 90])}
+    result = cascade.run("image", preprocessors())
+    assert result.tier == "fast"
+    assert FakeBackend.calls == [("por", 6)]
+    assert result.fields["batch_number"] == "ABC123"
+    assert result.summary()["tiers_tried"] == ["fast"]
+
+
+def test_escalates_and_keeps_the_best_reading(cascade):
+    FakeBackend.readings = {
+        ("por", 6): ("DIPIRONA 500mg", [40]),
+        ("por+eng", 6): (FULL_LABEL, [60]),        # every field but low confidence
+        ("por+eng", 11): ("Lote: ABC123", [99]),
+    }
+    result = cascade.run("image", preprocessors(skip=("deskew",)))
+    # The deskew tier had nothing to correct and was skipped
+    assert [attempt.tier for attempt in result.attempts] == ["fast", "full", "sparse"]
+    assert result.tier == "full"
+    assert result.confidence == 60
+
+
+def test_known_fields_count_towards_early_exit(cascade):
+    FakeBackend.readings = {("por", 6): ("DIPIRONA 500mg\nReg MS: 1.2345.6789", [90])}
+    known = {"batch_number": "GS1LOT", "expiry_date": "31/12/2026"}
+    result = cascade.run("image", preprocessors(), known=known)
+    assert result.tier == "fast"
+    assert result.fields["batch_number"] == "GS1LOT"
+
+
+def test_no_text_from_any_tier(cascade):
+    FakeBackend.readings = {}
+    result = cascade.run("image", preprocessors())
+    assert (result.text, result.tier, result.fields) == ("", "none", {})
+    # Tiers with the same settings share one backend
+    assert len(cascade._backends) == 3
@@ -0,0 +1,97 @@
+import json
+import sqlite3
+import sys
+
+import pytest
+
+import reparse
+from reparse import Checkpoint, Database, parse_chunk, parse_date_br
+
+COLUMNS = ['batchNumber', 'expirationDate', 'manufacturingDate', 'dosage', 'registrationNumber', 'manufacturer']
+
+
+@pytest.fixture
+def database(tmp_path):
+    path = tmp_path / "medications.db"
+    conn = sqlite3.connect(path)
+    conn.execute(
+        'CREATE TABLE medications (id TEXT PRIMARY KEY, "extractedText" TEXT, '
+        + ", ".join(f'"{column}" TEXT' for column in COLUMNS)
+        + ', "updatedAt" TEXT)'
+    )
+    conn.executemany(
+        'INSERT INTO medications (id, "extractedText", "batchNumber", dosage, manufacturer) VALUES (?, ?, ?, ?, ?)',
+        [
+            ("a", "DIPIRONA 500mg\nLote: NEW1", "OLD1", "250mg", "Manual Pharma"),
+            ("b", "??? ###", "KEEP2", "10ml", "Hand Corrected"),
+        ],
+    )
+    conn.commit()
+    conn.close()
+    return f"sqlite:///{path}"
+
+
+def rows(url):
+    conn = sqlite3.connect(url[len("sqlite:///"):])
+    result = {row[0]: row[1:] for row in conn.execute('SELECT id, "batchNumber", dosage, manufacturer FROM medications')}
+    conn.close()
+    return result
+
+
+def test_parse_date_br():
+    assert parse_date_br("12/12/25") == "2025-12-12T00:00:00"
+    assert parse_date_br("31-01-2026") == "2026-01-31T00:00:00"
+    assert parse_date_br("31/02/2026") is None
+    assert parse_date_br("") is None
+
+
+def test_parse_chunk_reports_missing_fields_as_none():
+    reparse._init_worker()
+    [update] = parse_chunk([("a", "DIPIRONA 500mg\nLote: ABC123\nVenc: 12/12/2025")])
+    assert update["id"] == "a"
+    assert update["batchNumber"] == "ABC123"
+    assert update["dosage"] == "500mg"
+    assert update["expirationDate"] == "2025-12-12T00:00:00"
+    assert update["manufacturer"] is None
+
+
+def test_apply_updates_keeps_stored_values_the_parse_missed(database):
+    reparse._init_worker()
+    db = Database(database)
+    for chunk in db.iter_chunks(10, None):
+        db.apply_updates(parse_chunk(chunk))
+    db.close()
+
+    stored = rows(database)
+    # Found fields are overwritten, missed ones (None) keep the manual value
+    assert stored["a"] == ("NEW1", "500mg", "Manual Pharma")
+    assert stored["b"] == ("KEEP2", "10ml", "Hand Corrected")
+
+
+def test_checkpoint_round_trip_and_clear(tmp_path):
+    path = str(tmp_path / "reparse.checkpoint.json")
+    checkpoint = Checkpoint(path)
+    assert checkpoint.position is None
+    checkpoint.save("m-100", 100)
+    checkpoint.save("m-200", 100)
+    assert Checkpoint(path).position == "m-200"
+    assert Checkpoint(path).state["rows"] == 200
+    assert Checkpoint(path, reset=True).position is None
+
+    checkpoint.clear()
+    assert Checkpoint(path).position is None
+
+
+def test_completed_run_clears_checkpoint(database, tmp_path, monkeypatch):
+    path = str(tmp_path / "reparse.checkpoint.json")
+    monkeypatch.setattr(sys, "argv", ["reparse.py", "--database", database, "--workers", "1",
+                                      "--chunk-size", "1", "--checkpoint", path])
+    reparse.main()
+    assert Checkpoint(path).position is None
+
+    # A second run after a rule change visits every row again
+    output = tmp_path / "parsed.jsonl"
+    monkeypatch.setattr(sys, "argv", ["reparse.py", "--database", database, "--workers", "1",
+                                      "--checkpoint", path, "--output", str(output)])
+    reparse.main()
+    assert [json.loads(line)["id"] for line in output.read_text().splitlines()] == ["a", "b"]
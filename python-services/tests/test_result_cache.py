@@ -0,0 +1,87 @@
+import asyncio
+import sqlite3
+
+from result_cache import ResultCache
+
+
+def test_key_depends_on_bytes_and_fingerprint():
+    a, b = ResultCache("config-a"), ResultCache("config-b")
+    assert a.key_for(b"image") == a.key_for(b"image")
+    assert a.key_for(b"image") != a.key_for(b"other")
+    assert a.key_for(b"image") != b.key_for(b"image")
+    # A reloaded catalog changes the version, so old corrections are not served
+    assert a.key_for(b"image", "catalog-1") != a.key_for(b"image", "catalog-2")
+
+
+def test_memory_tier_is_lru_and_ttl_bounded(monkeypatch):
+    cache = ResultCache(max_entries=2, ttl=10)
+    clock = [1000.0]
+    monkeypatch.setattr("result_cache.time.time", lambda: clock[0])
+    cache.set("a", {"v": 1})
+    cache.set("b", {"v": 2})
+    assert cache.get("a") == {"v": 1}
+    cache.set("c", {"v": 3})  # evicts b, the least recently used
+    assert cache.get("b") is None
+    clock[0] += 11
+    assert cache.get("a") is None
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["hits_memory"] == 1 and stats["misses"] == 2
+
+
+def test_disk_tier_survives_restarts(tmp_path):
+    path = str(tmp_path / "results.db")
+    ResultCache("fp", max_entries=0, db_path=path).set("k", {"name": "DIPIRONA"})
+    cache = ResultCache("fp", max_entries=4, db_path=path)
+    assert cache.get("k") == {"name": "DIPIRONA"}
+    assert cache.stats()["hits_disk"] == 1
+    # Promoted to memory on the disk hit
+    assert cache.get("k") == {"name": "DIPIRONA"}
+    assert cache.stats()["hits_memory"] == 1
+
+
+def test_prune_drops_expired_rows_and_caps_the_file(tmp_path, monkeypatch):
+    path = str(tmp_path / "results.db")
+    clock = [1000.0]
+    monkeypatch.setattr("result_cache.time.time", lambda: clock[0])
+    cache = ResultCache(max_entries=0, ttl=100, db_path=path, max_disk_entries=3, prune_interval=3600)
+    for index in range(5):
+        clock[0] += 1
+        cache.set(f"old-{index}", {"i": index})
+    clock[0] += 200
+    for index in range(5):
+        clock[0] += 1
+        cache.set(f"new-{index}", {"i": index})
+
+    assert cache.prune() == 7
+    keys = {row[0] for row in sqlite3.connect(path).execute("SELECT key FROM results")}
+    assert keys == {"new-2", "new-3", "new-4"}
+    assert cache.stats()["disk_evictions"] == 7
+
+
+def test_writes_prune_once_per_interval(tmp_path, monkeypatch):
+    path = str(tmp_path / "results.db")
+    clock = [1000.0]
+    monkeypatch.setattr("result_cache.time.time", lambda: clock[0])
+    cache = ResultCache(max_entries=0, db_path=path, max_disk_entries=2, prune_interval=60)
+    for index in range(4):
+        cache.set(f"k{index}", {"i": index})
+    # The first write pruned, the others fall inside the interval
+    assert sqlite3.connect(path).execute("SELECT COUNT(*) FROM results").fetchone()[0] == 4
+    clock[0] += 61
+    cache.set("k4", {"i": 4})
+    assert sqlite3.connect(path).execute("SELECT COUNT(*) FROM results").fetchone()[0] == 2
+
+
+def test_async_api_uses_both_tiers(tmp_path):
+    path = str(tmp_path / "results.db")
+
+    async def scenario():
+        writer = ResultCache("fp", max_entries=0, db_path=path)
+        await writer.aset("k", {"name": "X"})
+        reader = ResultCache("fp", max_entries=4, db_path=path)
+        return await reader.aget("k"), await reader.aget("k"), await reader.aget("missing"), reader.stats()
+
+    first, second, missing, stats = asyncio.run(scenario())
+    assert first == second == {"name": "X"}
+    assert missing is None
+    assert (stats["hits_disk"], stats["hits_memory"], stats["misses"]) == (1, 1, 1)
@@ -0,0 +1,21 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import serve
+
+
+@pytest.mark.skipif(not serve.HAS_GUNICORN, reason="needs gunicorn")
+@pytest.mark.parametrize("app", serve.SERVICES)
+def test_load_preloads_and_returns_the_app(app):
+    # A fresh interpreter per app: drug_extractor_simple sets its backend defaults on import
+    code = ("import serve\n"
+            f"app = serve.ExtractorServer({app!r}, {{}}).load()\n"
+            "print(type(app).__name__)")
+    completed = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                               cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                               env={"EXTRACTOR_WARMUP": "false", "EXTRACTOR_CACHE_SIZE": "0"})
+    assert "Preloaded" in completed.stdout
+    assert completed.stdout.strip().splitlines()[-1] == "FastAPI"
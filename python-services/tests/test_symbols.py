@@ -0,0 +1,101 @@
+from types import SimpleNamespace
+
+import pytest
+
+import symbols
+from symbols import (GS, FNC1_CODEWORD, Symbol, SymbolConfig, SymbolDecoder, gs1_date, gs1_fields,
+                     gtin_valid, is_gs1, parse_gs1)
+
+GTIN = "07891000000007"
+ELEMENTS = {"01": GTIN, "17": "261231", "10": "ab12", "21": "SN001"}
+
+
+@pytest.mark.parametrize("data", [
+    f"]d201{GTIN}17261231" + f"10ab12{GS}21SN001",
+    f"01{GTIN}17261231" + f"10ab12{FNC1_CODEWORD}21SN001",
+    f"{GS}01{GTIN}17261231" + f"10ab12{GS}21SN001",
+    f"(01){GTIN}(17)261231(10)ab12(21)SN001",
+])
+def test_parse_gs1_forms(data):
+    assert parse_gs1(data) == ELEMENTS
+
+
+def test_parse_gs1_stops_at_undelimited_element():
+    # AI 01 is 14 digits, a short one cannot be delimited
+    assert parse_gs1("10LOT1" + GS + "01123") == {"10": "LOT1"}
+    assert parse_gs1("ab") == {}
+
+
+def test_gtin_valid():
+    assert gtin_valid(GTIN)
+    assert gtin_valid("7891000000007")
+    assert not gtin_valid("7891000000008")
+    assert not gtin_valid("789100000000")   # 12 digits, wrong check digit
+    assert not gtin_valid("78910000000x7")
+
+
+def test_gs1_date():
+    assert gs1_date("261231") == "31/12/2026"
+    # Day 00 is the last day of the month
+    assert gs1_date("280200") == "29/02/2028"
+    assert gs1_date("261301") == ""
+    assert gs1_date("2612") == ""
+
+
+def test_gs1_fields_drop_invalid_values():
+    assert gs1_fields(ELEMENTS) == {"barcode": GTIN, "expiry_date": "31/12/2026", "batch_number": "AB12"}
+    assert gs1_fields({"01": "07891000000008", "11": "259901", "713": "1234567890123"}) == {
+        "registration_number": "1234567890123",
+    }
+
+
+def test_is_gs1():
+    # Reported identifier only: no prefix, no FNC1, a format name without "DataMatrix"
+    assert is_gs1("Data Matrix", "01" + GTIN + "17261231", symbology="]d2")
+    assert is_gs1("QRCode", "]Q3" + "01" + GTIN)
+    assert is_gs1("DataMatrix", "LOT1")
+    assert is_gs1("Code128", "10LOT1")
+    assert not is_gs1("QRCode", "https://example.com")
+
+
+def test_read_prefers_gs1_over_plain_ean():
+    decoder = SymbolDecoder(SymbolConfig(), opencv=False)
+    decoder.decoders = ["stub"]
+    decoder.decode = lambda image: [
+        Symbol("EAN13", "7891000000007"),
+        Symbol("DataMatrix", f"]d201{GTIN}17261231" + f"10ab12{GS}21SN001"),
+        Symbol("QRCode", "https://example.com"),
+    ]
+    reading = decoder.read(None)
+    assert reading.fields == {"barcode": GTIN, "expiry_date": "31/12/2026", "batch_number": "AB12"}
+    assert reading.covers(SymbolConfig().required_fields)
+    assert [symbol["gs1"] for symbol in reading.summary()] == [{}, ELEMENTS, {}]
+
+
+def test_read_without_decoders_is_empty():
+    decoder = SymbolDecoder(SymbolConfig(), opencv=False)
+    decoder.decoders = []
+    reading = decoder.read(None)
+    assert reading.symbols == [] and not reading.covers(("batch_number",))
+
+
+def test_zxing_reading_without_prefix_or_fnc1(monkeypatch):
+    # How zxing-cpp 3 reports a GS1 DataMatrix read in plain text mode
+    result = SimpleNamespace(format=SimpleNamespace(name="DataMatrix"), symbology_identifier="]d2",
+                             text=f"01{GTIN}17261231" + "10AB12")
+    monkeypatch.setattr(symbols, "zxingcpp", SimpleNamespace(read_barcodes=lambda image: [result]))
+    decoder = SymbolDecoder(SymbolConfig(), opencv=False)
+    decoder.decoders = ["zxing-cpp"]
+    reading = decoder.read(None)
+    assert reading.symbols[0].symbology == "]d2"
+    assert reading.fields == {"barcode": GTIN, "expiry_date": "31/12/2026", "batch_number": "AB12"}
+
+
+def test_zxing_round_trip():
+    zxingcpp = pytest.importorskip("zxingcpp")
+    if not hasattr(zxingcpp, "create_barcode"):
+        pytest.skip("zxing-cpp without an encoder")
+    image = zxingcpp.create_barcode(f"(01){GTIN}(17)261231(10)AB12", zxingcpp.BarcodeFormat.DataMatrix,
+                                    gs1=True).to_image(scale=6)
+    reading = SymbolDecoder(SymbolConfig(), opencv=False).read(image)
+    assert reading.fields == {"barcode": GTIN, "expiry_date": "31/12/2026", "batch_number": "AB12"}
@@ -0,0 +1,80 @@
+import asyncio
+import zipfile
+from io import BytesIO
+
+import pytest
+from fastapi import HTTPException, UploadFile
+from starlette.datastructures import Headers
+
+import uploads
+
+
+def archive(*entries):
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        for name, data in entries:
+            zf.writestr(name, data)
+    return buffer.getvalue()
+
+
+def upload(name, contents, content_type):
+    return UploadFile(BytesIO(contents), filename=name, headers=Headers({"content-type": content_type}))
+
+
+@pytest.fixture
+def no_decompression(monkeypatch):
+    def refuse(*args, **kwargs):
+        raise AssertionError("archive entry read before the limits were checked")
+    monkeypatch.setattr(zipfile.ZipFile, "read", refuse)
+
+
+def test_expand_zip_keeps_images_in_order():
+    contents = archive(("b.png", b"1"), ("notes.txt", b"x"), ("dir/a.JPG", b"22"))
+    assert uploads._expand_zip(contents, "photos.zip") == [("b.png", b"1"), ("dir/a.JPG", b"22")]
+
+
+def test_too_many_entries_rejected_before_reading(no_decompression):
+    contents = archive(*[(f"{index}.png", b"x") for index in range(4)])
+    with pytest.raises(HTTPException) as error:
+        uploads._expand_zip(contents, "photos.zip", max_images=3)
+    assert error.value.status_code == 413
+
+
+def test_oversized_archive_rejected_before_reading(no_decompression, monkeypatch):
+    monkeypatch.setattr(uploads, "MAX_ARCHIVE_BYTES", 1000)
+    # Highly compressible: a few bytes on the wire, 1200 once inflated
+    contents = archive(("a.png", b"\0" * 600), ("b.png", b"\0" * 600))
+    with pytest.raises(HTTPException) as error:
+        uploads._expand_zip(contents, "photos.zip")
+    assert error.value.status_code == 413
+
+
+def test_batch_limit_counts_loose_images_and_archives(monkeypatch):
+    monkeypatch.setattr(uploads, "MAX_BATCH_SIZE", 3)
+    files = [upload("one.png", b"1", "image/png"), upload("two.png", b"2", "image/png"),
+             upload("more.zip", archive(("a.png", b"3"), ("b.png", b"4")), "application/zip")]
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(uploads.collect_batch_images(files))
+    assert error.value.status_code == 413
+
+
+def test_bad_archive():
+    with pytest.raises(HTTPException) as error:
+        uploads._expand_zip(b"not a zip", "photos.zip")
+    assert error.value.status_code == 400
+
+
+def test_loose_image_over_the_size_limit(monkeypatch):
+    monkeypatch.setattr(uploads, "MAX_IMAGE_BYTES", 4)
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(uploads.collect_batch_images([upload("big.png", b"12345", "image/png")]))
+    assert error.value.status_code == 413
+
+
+def test_archive_after_a_full_batch_is_not_opened(monkeypatch):
+    monkeypatch.setattr(uploads, "MAX_BATCH_SIZE", 1)
+    monkeypatch.setattr(uploads, "_expand_zip", lambda *args: pytest.fail("archive opened"))
+    files = [upload("one.png", b"1", "image/png"), upload("more.zip", archive(("a.png", b"2")), "application/zip")]
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(uploads.collect_batch_images(files))
+    assert error.value.status_code == 413
@@ -0,0 +1,68 @@
+import os
+import zipfile
+from io import BytesIO
+from typing import List, Tuple
+
+from fastapi import UploadFile, HTTPException
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+ZIP_CONTENT_TYPES = ('application/zip', 'application/x-zip-compressed')
+
+MAX_BATCH_SIZE = int(os.getenv("EXTRACTOR_MAX_BATCH", 50))
+MAX_IMAGE_BYTES = int(os.getenv("EXTRACTOR_MAX_IMAGE_BYTES", 10 * 1024 * 1024))
+# Uncompressed images one archive may expand to
+MAX_ARCHIVE_BYTES = int(os.getenv("EXTRACTOR_MAX_ARCHIVE_BYTES", 100 * 1024 * 1024))
+
+
+def _is_zip(upload: UploadFile) -> bool:
+    return upload.content_type in ZIP_CONTENT_TYPES or (upload.filename or '').lower().endswith('.zip')
+
+
+def _expand_zip(contents: bytes, archive_name: str, max_images: int = MAX_BATCH_SIZE) -> List[Tuple[str, bytes]]:
+    """Return the image entries of a zip archive in archive order.
+
+    Limits are checked against the central directory before anything is
+    decompressed; the declared sizes can be trusted because zipfile never
+    inflates an entry past its declared size.
+    """
+    try:
+        archive = zipfile.ZipFile(BytesIO(contents))
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail=f"{archive_name} is not a valid zip archive")
+
+    with archive:
+        entries = [entry for entry in archive.infolist()
+                   if not entry.is_dir() and entry.filename.lower().endswith(IMAGE_EXTENSIONS)]
+        if len(entries) > max_images:
+            raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_BATCH_SIZE} images")
+        for entry in entries:
+            if entry.file_size > MAX_IMAGE_BYTES:
+                raise HTTPException(status_code=413, detail=f"{entry.filename} exceeds the per-image size limit")
+        if sum(entry.file_size for entry in entries) > MAX_ARCHIVE_BYTES:
+            raise HTTPException(status_code=413, detail=f"{archive_name} expands past {MAX_ARCHIVE_BYTES} bytes")
+        return [(entry.filename, archive.read(entry)) for entry in entries]
+
+
+async def collect_batch_images(files: List[UploadFile]) -> List[Tuple[str, bytes]]:
+    """Read a batch upload (images and/or zip archives) into (filename, bytes) pairs"""
+    images: List[Tuple[str, bytes]] = []
+    for upload in files:
+        contents = await upload.read()
+        if _is_zip(upload):
+            if len(images) >= MAX_BATCH_SIZE:
+                raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_BATCH_SIZE} images")
+            images.extend(_expand_zip(contents, upload.filename or 'archive', MAX_BATCH_SIZE - len(images)))
+        elif upload.content_type and upload.content_type.startswith('image/'):
+            # The same per-image limit as archive entries
+            if len(contents) > MAX_IMAGE_BYTES:
+                raise HTTPException(status_code=413, detail=f"{upload.filename} exceeds the per-image size limit")
+            images.append((upload.filename or f"image-{len(images)}", contents))
+        else:
+            raise HTTPException(status_code=400, detail=f"{upload.filename} must be an image or a zip archive")
+
+        if len(images) > MAX_BATCH_SIZE:
+            raise HTTPException(status_code=413, detail=f"Batch exceeds {MAX_BATCH_SIZE} images")
+
+    if not images:
+        raise HTTPException(status_code=400, detail="No images found in the upload")
+    return images
@@ -0,0 +1,159 @@
+import express from 'express';
+import { once } from 'node:events';
+import type { AddressInfo } from 'node:net';
+import type { Server } from 'node:http';
+import { jest } from '@jest/globals';
+
+interface MedicationRow {
+  id: string;
+  name: string;
+  anvisaCode: string;
+  createdAt: Date;
+  updatedAt: Date;
+  createdBy: string;
+}
+
+type Where = Record<string, unknown>;
+
+// Evaluates the subset of Prisma filters the listing builds: AND/OR, equality, lt and insensitive contains
+const matches = (row: MedicationRow, where: Where): boolean =>
+  Object.entries(where).every(([key, condition]) => {
+    if (key === 'AND') {
+      return (condition as Where[]).every((part) => matches(row, part));
+    }
+    if (key === 'OR') {
+      return (condition as Where[]).some((part) => matches(row, part));
+    }
+    const value = row[key as keyof MedicationRow];
+    if (condition instanceof Date) {
+      return value instanceof Date && value.getTime() === condition.getTime();
+    }
+    if (typeof condition === 'object' && condition !== null) {
+      const { lt, contains } = condition as { lt?: Date | string; contains?: string };
+      if (lt !== undefined) {
+        return lt instanceof Date ? (value as Date).getTime() < lt.getTime() : (value as string) < lt;
+      }
+      return String(value).toLowerCase().includes(String(contains).toLowerCase());
+    }
+    return value === condition;
+  });
+
+const newestFirst = (a: MedicationRow, b: MedicationRow) =>
+  b.createdAt.getTime() - a.createdAt.getTime() || (a.id < b.id ? 1 : a.id > b.id ? -1 : 0);
+
+const db = {
+  medications: [] as MedicationRow[],
+  queries: 0,
+  medication: {
+    findMany: async ({ where, take }: { where: Where; take: number }): Promise<MedicationRow[]> => {
+      db.queries++;
+      return db.medications.filter((row) => matches(row, where)).sort(newestFirst).slice(0, take);
+    },
+  },
+};
+
+process.env.DRUGS_MAX_PAGE_SIZE = '3';
+process.env.DRUGS_EXPORT_BATCH_SIZE = '2';
+
+// ESM mocks only apply to modules imported after they are registered: the static imports above
+// load none of these, and the route is imported dynamically below
+jest.unstable_mockModule('@prisma/client', () => ({
+  PrismaClient: jest.fn(() => db),
+  Prisma: { PrismaClientKnownRequestError: class extends Error {} },
+}));
+jest.unstable_mockModule('../middleware/auth.js', () => ({
+  authenticate: (req: express.Request, _res: express.Response, next: express.NextFunction) => {
+    req.user = { id: 'user-a', email: 'a@example.com', name: 'A', role: 'PHARMACIST' };
+    next();
+  },
+}));
+jest.unstable_mockModule('../utils/logger.js', () => ({
+  logger: { info: jest.fn(), warn: jest.fn(), error: jest.fn() },
+}));
+
+const { default: drugRoutes } = await import('./drugs-new.js');
+const { errorHandler } = await import('../middleware/errorHandler.js');
+
+interface PageResponse {
+  data: { id: string; name: string }[];
+  count: number;
+  limit: number;
+  nextCursor: string | null;
+}
+
+let server: Server;
+let baseUrl: string;
+
+beforeAll(async () => {
+  const app = express();
+  app.use('/api/drugs', drugRoutes);
+  app.use(errorHandler);
+  server = app.listen(0);
+  await once(server, 'listening');
+  baseUrl = `http://127.0.0.1:${(server.address() as AddressInfo).port}`;
+});
+
+afterAll(() => {
+  server.closeAllConnections();
+  server.close();
+});
+
+beforeEach(() => {
+  // m2, m3 and m4 share a timestamp, as rows of one bulk insert do
+  const batch = new Date('2025-10-01T12:00:00Z');
+  db.medications = [
+    { id: 'm1', name: 'Dipirona', anvisaCode: 'MS-001', createdAt: new Date('2025-09-30T08:00:00Z') },
+    { id: 'm2', name: 'Paracetamol', anvisaCode: 'MS-002', createdAt: batch },
+    { id: 'm3', name: 'Dipirona Sódica', anvisaCode: 'MS-003', createdAt: batch },
+    { id: 'm4', name: 'Omeprazol', anvisaCode: 'MS-004', createdAt: batch },
+    { id: 'm5', name: 'Losartana', anvisaCode: 'MS-DIP', createdAt: new Date('2025-10-02T09:00:00Z') },
+  ].map((row) => ({ ...row, updatedAt: row.createdAt, createdBy: 'user-a' }));
+  db.queries = 0;
+});
+
+const get = (query: string) => fetch(`${baseUrl}/api/drugs${query}`);
+
+const allPages = async (query: string) => {
+  const ids: string[] = [];
+  let cursor: string | null = null;
+  do {
+    const response = await get(`${query}${cursor ? `&cursor=${cursor}` : ''}`);
+    expect(response.status).toBe(200);
+    const page = (await response.json()) as PageResponse;
+    ids.push(...page.data.map((medication) => medication.id));
+    cursor = page.nextCursor;
+  } while (cursor);
+  return ids;
+};
+
+describe('GET /api/drugs', () => {
+  it('walks every row once, newest first, across createdAt ties', async () => {
+    expect(await allPages('?limit=2')).toEqual(['m5', 'm4', 'm3', 'm2', 'm1']);
+  });
+
+  it('ends without a cursor when the last page is full', async () => {
+    const response = await get('?limit=3&search=dip');
+    const page = (await response.json()) as PageResponse;
+    // Matches the name or the ANVISA code, case-insensitively
+    expect(page.data.map((medication) => medication.id)).toEqual(['m5', 'm3', 'm1']);
+    expect(page.nextCursor).toBeNull();
+  });
+
+  it('caps the page size and rejects bad parameters', async () => {
+    const page = (await (await get('?limit=50')).json()) as PageResponse;
+    expect(page.limit).toBe(3);
+    expect(page.count).toBe(3);
+
+    expect((await get('?limit=0')).status).toBe(400);
+    expect((await get('?cursor=not-a-cursor')).status).toBe(400);
+    expect((await get(`?search=${'x'.repeat(101)}`)).status).toBe(400);
+  });
+
+  it('streams every match as NDJSON, one batch per query', async () => {
+    const response = await get('?format=ndjson');
+    expect(response.headers.get('content-type')).toContain('application/x-ndjson');
+    const lines = (await response.text()).trim().split('\n').map((line) => JSON.parse(line) as { id: string });
+    expect(lines.map((medication) => medication.id)).toEqual(['m5', 'm4', 'm3', 'm2', 'm1']);
+    expect(db.queries).toBe(3);
+  });
+});
@@ -5,7 +5,10 @@ import FormData from 'form-data';
 import { authenticate } from '../middleware/auth.js';
 import { createError } from '../middleware/errorHandler.js';
 import { logger } from '../utils/logger.js';
-import { PrismaClient } from '@prisma/client';
+import { randomUUID } from 'node:crypto';
+import { once } from 'node:events';
+import { Readable } from 'node:stream';
+import { Prisma, PrismaClient } from '@prisma/client';
 import { generateRegistrationNumber } from '../utils/registrationGenerator.js';
 
 const prisma = new PrismaClient();
@@ -29,6 +32,9 @@ const upload = multer({
 // Python service URL (adjust if running on different port)
 const PYTHON_SERVICE_URL = process.env.PYTHON_SERVICE_URL || 'http://localhost:8000';
 
+// Matches EXTRACTOR_MAX_BATCH on the Python service
+const MAX_BATCH_IMAGES = Number(process.env.EXTRACTOR_MAX_BATCH) || 50;
+
 // Manual drug entry endpoint
 router.post('/manual', authenticate, async (req, res, next) => {
   try {
@@ -153,10 +159,11 @@ router.post('/extract-from-image', authenticate, upload.single('image'), async (
 
     const { drug_info, extracted_text } = response.data;
 
-    // Save extracted drug information to database with basic fields only
+    // Save extracted drug information; the raw OCR text lets reparse.py backfill fields later
     const medication = await prisma.medication.create({
       data: {
         name: drug_info.name || 'Unknown',
+        extractedText: extracted_text || null,
         createdBy: req.user?.id || null
       },
     });
@@ -215,6 +222,250 @@ router.post('/extract-from-image', authenticate, upload.single('image'), async (
   }
 });
 
+interface BatchExtractionItem {
+  index: number;
+  filename: string;
+  success: boolean;
+  error?: string;
+  drug_info?: { name?: string };
+  extracted_text?: string;
+}
+
+/**
+ * @route POST /api/drugs/extract-from-images
+ * @desc Extract drug information from many images in one call and save them in bulk
+ * @access Private
+ */
+router.post('/extract-from-images', authenticate, upload.array('images', MAX_BATCH_IMAGES), async (req, res, next) => {
+  try {
+    const files = (req.files as Express.Multer.File[] | undefined) || [];
+    if (files.length === 0) {
+      throw createError('No image files provided', 400);
+    }
+
+    logger.info('Processing drug specification image batch', {
+      count: files.length,
+      totalSize: files.reduce((sum, file) => sum + file.size, 0),
+      userId: req.user?.id
+    });
+
+    // Send every image to the Python service in a single multipart request
+    const formData = new FormData();
+    for (const file of files) {
+      formData.append('files', file.buffer, {
+        filename: file.originalname,
+        contentType: file.mimetype,
+      });
+    }
+
+    const response = await axios.post(`${PYTHON_SERVICE_URL}/extract-drug-info/batch`, formData, {
+      headers: {
+        ...formData.getHeaders(),
+      },
+      timeout: 30000 + files.length * 5000,
+      maxBodyLength: Infinity,
+    });
+
+    const items: BatchExtractionItem[] = response.data.results;
+    const extracted = items.filter((item) => item.success);
+
+    // Save all extracted medications with one multi-row insert. RETURNING order is not
+    // guaranteed, so ids are generated here and the rows matched back by id
+    const idByIndex = new Map(extracted.map((item) => [item.index, randomUUID()]));
+    const medications = extracted.length > 0
+      ? await prisma.medication.createManyAndReturn({
+          data: extracted.map((item) => ({
+            id: idByIndex.get(item.index)!,
+            name: item.drug_info?.name || 'Unknown',
+            extractedText: item.extracted_text || null,
+            createdBy: req.user?.id || null
+          })),
+          select: { id: true, name: true, createdAt: true },
+        })
+      : [];
+
+    // Log the creations in audit trail
+    try {
+      await prisma.auditLog.createMany({
+        data: medications.map((medication) => ({
+          action: 'CREATE_MEDICATION_FROM_IMAGE',
+          userId: req.user!.id,
+          entityType: 'Medication',
+          entityId: medication.id
+        })),
+      });
+    } catch (logError) {
+      console.error('Failed to create audit log:', logError);
+    }
+
+    const medicationById = new Map(medications.map((medication) => [medication.id, medication]));
+
+    res.status(201).json({
+      success: medications.length > 0,
+      message: `Extracted ${medications.length} of ${items.length} images`,
+      data: {
+        count: items.length,
+        created: medications.length,
+        failed: items.length - medications.length,
+        results: items.map((item) => {
+          const id = idByIndex.get(item.index);
+          const medication = id ? medicationById.get(id) : undefined;
+          if (!item.success || !medication) {
+            return { index: item.index, filename: item.filename, success: false, error: item.error || 'Extraction failed' };
+          }
+          const qrData = {
+            id: medication.id,
+            name: medication.name,
+            createdAt: medication.createdAt.toISOString()
+          };
+          return {
+            index: item.index,
+            filename: item.filename,
+            success: true,
+            medication,
+            qrCodeData: Buffer.from(JSON.stringify(qrData)).toString('base64'),
+            extractedInfo: item.drug_info,
+            rawText: item.extracted_text,
+          };
+        }),
+      },
+    });
+
+  } catch (error) {
+    if (axios.isAxiosError(error)) {
+      if (error.code === 'ECONNREFUSED') {
+        logger.error('Python service is not available', { error: error.message });
+        return next(createError('Image processing service is temporarily unavailable. Please try again later.', 503));
+      }
+
+      const status = error.response?.status || 500;
+      const message = error.response?.data?.detail || 'Error processing images';
+      return next(createError(message, status));
+    }
+
+    logger.error('Error in drug batch extraction endpoint', { error: (error as Error).message });
+    next(error);
+  }
+});
+
+// Matches EXTRACTOR_MAX_LABELS on the Python service; larger lots are printed with `python labels.py --lot`
+const MAX_LABEL_ITEMS = Number(process.env.EXTRACTOR_MAX_LABELS) || 10000;
+// Items read per query while sending a lot's labels to the Python service
+const LABEL_FETCH_BATCH_SIZE = 1000;
+
+/**
+ * JSON body of a label sheet request for every item of a lot, read
+ * LABEL_FETCH_BATCH_SIZE items at a time by keyset on the (lotId, serial)
+ * unique index and sent upstream as it is read, so a large lot is never
+ * held in memory whole
+ */
+async function* lotLabelsBody(lotId: string): AsyncGenerator<string> {
+  yield '{"labels":[';
+  let lastSerial: string | null = null;
+  for (;;) {
+    const items = await prisma.item.findMany({
+      where: { lotId, ...(lastSerial !== null && { serial: { gt: lastSerial } }) },
+      orderBy: { serial: 'asc' },
+      take: LABEL_FETCH_BATCH_SIZE,
+      select: { serial: true, qrPayload: true },
+    });
+    if (items.length === 0) {
+      break;
+    }
+    const labels = items.map((item) => JSON.stringify({ payload: item.qrPayload, caption: item.serial }));
+    yield (lastSerial === null ? '' : ',') + labels.join(',');
+    lastSerial = items[items.length - 1]!.serial;
+    if (items.length < LABEL_FETCH_BATCH_SIZE) {
+      break;
+    }
+  }
+  yield ']}';
+}
+
+/**
+ * @route GET /api/drugs/lots/:lotId/labels
+ * @desc Print-ready QR label sheet for every item in a lot (streamed PDF, or one PNG page)
+ * @access Private
+ */
+router.get('/lots/:lotId/labels', authenticate, async (req, res, next) => {
+  try {
+    const { lotId } = req.params;
+
+    if (!lotId) {
+      throw createError('Lot ID is required', 400);
+    }
+
+    const lot = await prisma.lot.findUnique({
+      where: { id: lotId },
+      select: { id: true, number: true },
+    });
+
+    if (!lot) {
+      throw createError('Lot not found', 404);
+    }
+
+    const itemCount = await prisma.item.count({ where: { lotId } });
+
+    if (itemCount === 0) {
+      throw createError('Lot has no items', 404);
+    }
+    if (itemCount > MAX_LABEL_ITEMS) {
+      throw createError(`Lot has ${itemCount} items, label sheets hold at most ${MAX_LABEL_ITEMS}`, 413);
+    }
+
+    const format = req.query.format === 'png' ? 'png' : 'pdf';
+
+    // The Python service renders pages in parallel and streams them back as they are ready
+    const response = await axios.post(`${PYTHON_SERVICE_URL}/labels`, Readable.from(lotLabelsBody(lotId)), {
+      headers: { 'Content-Type': 'application/json' },
+      params: {
+        format,
+        page: req.query.page,
+        columns: req.query.columns,
+        rows: req.query.rows,
+      },
+      responseType: 'stream',
+      timeout: 30000 + itemCount * 20,
+      maxBodyLength: Infinity,
+    });
+
+    logger.info('Rendering lot label sheet', {
+      lotId,
+      items: itemCount,
+      format,
+      userId: req.user?.id
+    });
+
+    res.setHeader('Content-Type', format === 'pdf' ? 'application/pdf' : 'image/png');
+    res.setHeader('X-Page-Count', String(response.headers['x-page-count'] ?? ''));
+    if (format === 'pdf') {
+      res.setHeader('Content-Disposition', `attachment; filename="lot-${lot.number}-labels.pdf"`);
+    }
+
+    // pipe() does not forward errors: a render failure mid-sheet must not leave the client hanging
+    const upstream = response.data as Readable;
+    upstream.on('error', (error) => {
+      logger.error('Label sheet stream failed', { lotId, error: error.message });
+      res.destroy(error);
+    });
+    res.on('close', () => upstream.destroy());
+    upstream.pipe(res);
+
+  } catch (error) {
+    if (axios.isAxiosError(error)) {
+      if (error.code === 'ECONNREFUSED') {
+        logger.error('Python service is not available', { error: error.message });
+        return next(createError('Label rendering service is temporarily unavailable. Please try again later.', 503));
+      }
+
+      // Streamed error bodies are not parsed, so only the status is forwarded
+      return next(createError('Error rendering labels', error.response?.status || 500));
+    }
+
+    next(error);
+  }
+});
+
 /**
  * @route GET /api/drugs/:id/qr
  * @desc Get QR code for a specific medication
@@ -268,43 +519,188 @@ router.get('/:id/qr', authenticate, async (req, res, next) => {
   }
 });
 
+interface MedicationCursor {
+  createdAt: Date;
+  id: string;
+}
+
+// Columns returned by the listing and the NDJSON export
+const MEDICATION_LIST_SELECT = {
+  id: true,
+  name: true,
+  anvisaCode: true,
+  createdAt: true,
+  updatedAt: true,
+  createdBy: true,
+} as const;
+
+const DEFAULT_PAGE_SIZE = 50;
+const MAX_PAGE_SIZE = Number(process.env.DRUGS_MAX_PAGE_SIZE) || 200;
+// Rows fetched per round trip while streaming an export
+const EXPORT_BATCH_SIZE = Number(process.env.DRUGS_EXPORT_BATCH_SIZE) || 1000;
+const MAX_SEARCH_LENGTH = 100;
+
+// Opaque page token: the (createdAt, id) of the last row the client has seen
+const encodeCursor = (cursor: MedicationCursor): string =>
+  Buffer.from(JSON.stringify([cursor.createdAt.toISOString(), cursor.id])).toString('base64url');
+
+const decodeCursor = (token: string): MedicationCursor => {
+  try {
+    const [createdAt, id] = JSON.parse(Buffer.from(token, 'base64url').toString('utf8'));
+    const date = new Date(createdAt);
+    if (typeof id === 'string' && id && !Number.isNaN(date.getTime())) {
+      return { createdAt: date, id };
+    }
+  } catch {
+    // Falls through to the 400 below
+  }
+  throw createError('Invalid cursor', 400);
+};
+
+/**
+ * Filter for one page after `cursor`, newest first. Rows are ordered by
+ * (createdAt, id) so ties on createdAt (bulk inserts share a timestamp)
+ * still page deterministically, and the seek walks the
+ * medications_createdAt_id_idx index instead of counting past an OFFSET.
+ * The name/anvisaCode ILIKE is served by the pg_trgm GIN indexes
+ * (patterns under three characters have no trigrams and fall back to a scan).
+ */
+const medicationPageWhere = (search: string | undefined, cursor: MedicationCursor | null): Prisma.MedicationWhereInput => {
+  const conditions: Prisma.MedicationWhereInput[] = [];
+
+  if (search) {
+    conditions.push({
+      OR: [
+        { name: { contains: search, mode: 'insensitive' } },
+        { anvisaCode: { contains: search, mode: 'insensitive' } },
+      ],
+    });
+  }
+
+  if (cursor) {
+    conditions.push({
+      OR: [
+        { createdAt: { lt: cursor.createdAt } },
+        { createdAt: cursor.createdAt, id: { lt: cursor.id } },
+      ],
+    });
+  }
+
+  return { AND: conditions };
+};
+
+const MEDICATION_PAGE_ORDER: Prisma.MedicationOrderByWithRelationInput[] = [
+  { createdAt: 'desc' },
+  { id: 'desc' },
+];
+
+/**
+ * Write every matching medication as one JSON object per line, fetching
+ * EXPORT_BATCH_SIZE rows per keyset query. Only one batch is held at a time
+ * and writes wait for the socket to drain, so memory stays flat however
+ * large the table is and a slow client throttles the queries.
+ */
+const streamMedications = async (
+  req: express.Request,
+  res: express.Response,
+  search: string | undefined,
+  start: MedicationCursor | null
+): Promise<void> => {
+  let aborted = false;
+  res.on('close', () => {
+    aborted = true;
+  });
+
+  res.setHeader('Content-Type', 'application/x-ndjson; charset=utf-8');
+  res.setHeader('Content-Disposition', 'attachment; filename="medications.ndjson"');
+  res.flushHeaders();
+
+  let cursor = start;
+  let exported = 0;
+  try {
+    while (!aborted) {
+      const batch = await prisma.medication.findMany({
+        where: medicationPageWhere(search, cursor),
+        orderBy: MEDICATION_PAGE_ORDER,
+        take: EXPORT_BATCH_SIZE,
+        select: MEDICATION_LIST_SELECT,
+      });
+      if (batch.length === 0) {
+        break;
+      }
+
+      exported += batch.length;
+      cursor = batch[batch.length - 1]!;
+      const chunk = batch.map((medication) => JSON.stringify(medication)).join('\n') + '\n';
+      if (!res.write(chunk) && !aborted) {
+        await Promise.race([once(res, 'drain'), once(res, 'close')]);
+      }
+      if (batch.length < EXPORT_BATCH_SIZE) {
+        break;
+      }
+    }
+  } catch (error) {
+    // Headers are gone, so the client learns about the failure from the truncated stream
+    logger.error('Medication export failed', { error: (error as Error).message, exported });
+    res.destroy(error as Error);
+    return;
+  }
+
+  logger.info('Medication export finished', {
+    exported,
+    aborted,
+    search: search || null,
+    userId: req.user?.id
+  });
+  res.end();
+};
+
 /**
  * @route GET /api/drugs
- * @desc Get all medications with optional filtering
+ * @desc List medications newest first, one keyset page at a time
+ *       (?search=, ?limit= up to MAX_PAGE_SIZE, ?cursor= from the previous page's nextCursor),
+ *       or every match streamed as NDJSON with ?format=ndjson
  * @access Private
  */
 router.get('/', authenticate, async (req, res, next) => {
   try {
-    const { search } = req.query;
-
-    const where: any = {};
+    const search = typeof req.query.search === 'string' ? req.query.search.trim() : '';
+    if (search.length > MAX_SEARCH_LENGTH) {
+      throw createError(`Search term must be at most ${MAX_SEARCH_LENGTH} characters`, 400);
+    }
 
-    // Basic filtering removed since we only have basic fields
+    const cursor = typeof req.query.cursor === 'string' && req.query.cursor
+      ? decodeCursor(req.query.cursor)
+      : null;
 
-    if (search) {
-      where.OR = [
-        { name: { contains: search, mode: 'insensitive' } },
-        { anvisaCode: { contains: search, mode: 'insensitive' } },
-      ];
+    if (req.query.format === 'ndjson') {
+      await streamMedications(req, res, search || undefined, cursor);
+      return;
     }
 
-    const medications = await prisma.medication.findMany({
-      where,
-      orderBy: { createdAt: 'desc' },
-      select: {
-        id: true,
-        name: true,
-        anvisaCode: true,
-        createdAt: true,
-        updatedAt: true,
-        createdBy: true,
-      },
+    const limit = req.query.limit === undefined ? DEFAULT_PAGE_SIZE : Number(req.query.limit);
+    if (!Number.isInteger(limit) || limit < 1) {
+      throw createError('Limit must be a positive integer', 400);
+    }
+    const take = Math.min(limit, MAX_PAGE_SIZE);
+
+    // One extra row tells whether another page exists without a COUNT(*)
+    const rows = await prisma.medication.findMany({
+      where: medicationPageWhere(search || undefined, cursor),
+      orderBy: MEDICATION_PAGE_ORDER,
+      take: take + 1,
+      select: MEDICATION_LIST_SELECT,
     });
 
+    const medications = rows.slice(0, take);
+    const hasMore = rows.length > take;
+
     res.json({
       success: true,
       data: medications,
       count: medications.length,
+      limit: take,
+      nextCursor: hasMore ? encodeCursor(medications[medications.length - 1]!) : null,
     });
 
   } catch (error) {
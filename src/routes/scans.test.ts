@@ -0,0 +1,190 @@
+import express from 'express';
+import { once } from 'node:events';
+import type { AddressInfo } from 'node:net';
+import type { Server } from 'node:http';
+import { jest } from '@jest/globals';
+import type { Prisma } from '@prisma/client';
+
+interface StoredEvent {
+  id: string;
+  userId: string;
+  clientEventId: string;
+  itemId: string;
+}
+
+// In-memory stand-in for the scan_events and items tables, unique on (userId, clientEventId)
+const db = {
+  events: [] as StoredEvent[],
+  items: [
+    { id: 'item-1', qrPayload: 'QR-1' },
+    { id: 'item-2', qrPayload: 'QR-2' },
+    { id: 'item-3', qrPayload: 'SHARED' },
+    { id: 'item-4', qrPayload: 'SHARED' },
+  ],
+  item: {
+    findMany: async ({ where }: { where: { qrPayload: { in: string[] } } }): Promise<{ id: string; qrPayload: string }[]> =>
+      db.items.filter((item) => where.qrPayload.in.includes(item.qrPayload)),
+  },
+  scanEvent: {
+    createManyAndReturn: async ({ data }: { data: Omit<StoredEvent, 'id'>[] }): Promise<{ id: string; clientEventId: string }[]> => {
+      const inserted: { id: string; clientEventId: string }[] = [];
+      for (const row of data) {
+        const exists = db.events.some(
+          (event) => event.userId === row.userId && event.clientEventId === row.clientEventId
+        );
+        if (!exists) {
+          const event = { ...row, id: `scan-${db.events.length + 1}` };
+          db.events.push(event);
+          inserted.push({ id: event.id, clientEventId: event.clientEventId });
+        }
+      }
+      return inserted;
+    },
+    findMany: async (
+      { where }: { where: { userId: string; clientEventId: { in: string[] } } }
+    ): Promise<{ id: string; clientEventId: string }[]> =>
+      db.events
+        .filter((event) => event.userId === where.userId && where.clientEventId.in.includes(event.clientEventId))
+        .map(({ id, clientEventId }) => ({ id, clientEventId })),
+  },
+  $transaction: async <T>(fn: (tx: unknown) => Promise<T>) => fn(db),
+};
+
+process.env.SCAN_INGEST_MAX_EVENTS = '10';
+
+// Registered before the dynamic imports below; the type-only Prisma import above is erased
+jest.unstable_mockModule('@prisma/client', () => ({
+  PrismaClient: jest.fn(() => db),
+  EventType: { RECEIPT: 'RECEIPT', STOCK: 'STOCK', DISPENSE: 'DISPENSE' },
+  Prisma: { PrismaClientKnownRequestError: class extends Error {} },
+}));
+jest.unstable_mockModule('../middleware/auth.js', () => ({
+  // The test user comes from a header instead of a JWT
+  authenticate: (req: express.Request, _res: express.Response, next: express.NextFunction) => {
+    req.user = { id: req.get('X-Test-User') ?? 'user-a', email: 'a@example.com', name: 'A', role: 'PHARMACIST' };
+    next();
+  },
+}));
+jest.unstable_mockModule('../utils/logger.js', () => ({
+  logger: { info: jest.fn(), warn: jest.fn(), error: jest.fn() },
+}));
+
+const { default: scanRoutes } = await import('./scans.js');
+const { errorHandler } = await import('../middleware/errorHandler.js');
+
+interface IngestResponse {
+  success: boolean;
+  data: {
+    received: number;
+    created: number;
+    duplicates: number;
+    rejected: number;
+    results: { line: number; eventId?: string; status: string; id?: string; error?: string }[];
+  };
+}
+
+let server: Server;
+let baseUrl: string;
+
+beforeAll(async () => {
+  const app = express();
+  app.use('/api/scans', scanRoutes);
+  app.use(errorHandler);
+  server = app.listen(0);
+  await once(server, 'listening');
+  baseUrl = `http://127.0.0.1:${(server.address() as AddressInfo).port}`;
+});
+
+afterAll(() => {
+  server.closeAllConnections();
+  server.close();
+});
+
+beforeEach(() => {
+  db.events = [];
+});
+
+const ndjson = (...lines: (object | string)[]) =>
+  lines.map((line) => (typeof line === 'string' ? line : JSON.stringify(line))).join('\n');
+
+const ingest = async (body: string, user = 'user-a') => {
+  const response = await fetch(`${baseUrl}/api/scans/bulk`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/x-ndjson', 'X-Test-User': user },
+    body,
+  });
+  return { status: response.status, body: (await response.json()) as IngestResponse };
+};
+
+describe('POST /api/scans/bulk', () => {
+  it('stores valid events and reports every other line on its own', async () => {
+    const future = new Date(Date.now() + 3 * 24 * 60 * 60 * 1000).toISOString();
+    const { status, body } = await ingest(ndjson(
+      { eventId: 'e1', qrPayload: 'QR-1', eventType: 'RECEIPT' },
+      'not json',
+      { eventId: 'e2', qrPayload: 'QR-2', eventType: 'STOCK' },
+      { eventId: 'e1', qrPayload: 'QR-2', eventType: 'STOCK' },
+      { eventId: 'e3', qrPayload: 'UNKNOWN', eventType: 'STOCK' },
+      { eventId: 'e4', qrPayload: 'SHARED', eventType: 'STOCK' },
+      { eventId: 'e5', qrPayload: 'QR-1', eventType: 'STOCK', scannedAt: future },
+      { eventId: 'e6', qrPayload: 'QR-1', eventType: 'TELEPORT' },
+    ));
+
+    expect(status).toBe(200);
+    expect(body.success).toBe(false);
+    expect(body.data).toMatchObject({ received: 8, created: 2, duplicates: 1, rejected: 5 });
+    expect(body.data.results.map((result) => [result.line, result.status, result.error])).toEqual([
+      [1, 'created', undefined],
+      [2, 'rejected', 'Invalid JSON'],
+      [3, 'created', undefined],
+      [4, 'duplicate', undefined],
+      [5, 'rejected', 'Unknown item'],
+      [6, 'rejected', 'QR payload matches several items'],
+      [7, 'rejected', 'scannedAt is in the future'],
+      [8, 'rejected', expect.stringContaining('eventType')],
+    ]);
+    expect(db.events.map((event) => [event.clientEventId, event.itemId])).toEqual([
+      ['e1', 'item-1'],
+      ['e2', 'item-2'],
+    ]);
+  });
+
+  it('answers a re-sent batch with the stored ids', async () => {
+    const batch = ndjson(
+      { eventId: 'e1', qrPayload: 'QR-1', eventType: 'RECEIPT' },
+      { eventId: 'e2', qrPayload: 'QR-2', eventType: 'RECEIPT' },
+    );
+    const first = await ingest(batch);
+    const second = await ingest(batch);
+
+    expect(second.body.success).toBe(true);
+    expect(second.body.data).toMatchObject({ created: 0, duplicates: 2 });
+    expect(second.body.data.results.map((result) => result.id))
+      .toEqual(first.body.data.results.map((result) => result.id));
+    expect(db.events).toHaveLength(2);
+  });
+
+  it('scopes event ids to the user that sent them', async () => {
+    const batch = ndjson({ eventId: '1', qrPayload: 'QR-1', eventType: 'DISPENSE' });
+    await ingest(batch, 'user-a');
+    const { body } = await ingest(batch, 'user-b');
+
+    expect(body.data.created).toBe(1);
+    expect(db.events.map((event) => event.userId)).toEqual(['user-a', 'user-b']);
+
+    // Typed against the generated client: stops compiling if the unique key loses its userId
+    const unique: Prisma.ScanEventWhereUniqueInput = { userId_clientEventId: { userId: 'user-b', clientEventId: '1' } };
+    expect(db.events.filter((event) =>
+      event.userId === unique.userId_clientEventId?.userId
+      && event.clientEventId === unique.userId_clientEventId?.clientEventId)).toHaveLength(1);
+  });
+
+  it('rejects an empty body and an oversized batch', async () => {
+    expect((await ingest('  \n')).status).toBe(400);
+
+    const events = Array.from({ length: 11 }, (_, index) =>
+      ({ eventId: `e${index}`, qrPayload: 'QR-1', eventType: 'STOCK' }));
+    expect((await ingest(ndjson(...events))).status).toBe(413);
+    expect(db.events).toHaveLength(0);
+  });
+});
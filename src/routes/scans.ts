@@ -0,0 +1,235 @@
+import express from 'express';
+import { z } from 'zod';
+import { EventType, Prisma, PrismaClient } from '@prisma/client';
+import { authenticate } from '../middleware/auth.js';
+import { createError } from '../middleware/errorHandler.js';
+import { logger } from '../utils/logger.js';
+import { ItemLookup } from '../utils/itemLookup.js';
+
+const prisma = new PrismaClient();
+const router = express.Router();
+
+// Events accepted per request; scanners split larger offline queues into several batches
+const MAX_EVENTS_PER_BATCH = Number(process.env.SCAN_INGEST_MAX_EVENTS) || 5000;
+const MAX_BATCH_BYTES = process.env.SCAN_INGEST_MAX_BYTES || '5mb';
+// Rows per INSERT statement (13 bind parameters per row, Postgres allows 65535)
+const INSERT_CHUNK_SIZE = 1000;
+// Offline scans carry the time they were taken; anything this far ahead of the server clock is bogus
+const MAX_CLOCK_SKEW_MS = 24 * 60 * 60 * 1000;
+
+const itemLookup = new ItemLookup(
+  prisma,
+  Number(process.env.SCAN_ITEM_CACHE_SIZE) || 50000,
+  Number(process.env.SCAN_ITEM_CACHE_TTL_MS) || 10 * 60 * 1000
+);
+
+const scanEventSchema = z.object({
+  eventId: z.string().min(1).max(128),
+  qrPayload: z.string().min(1).max(2048),
+  eventType: z.nativeEnum(EventType),
+  checkpoint: z.string().max(255).optional(),
+  lat: z.number().min(-90).max(90).optional(),
+  lng: z.number().min(-180).max(180).optional(),
+  accuracy: z.number().min(0).max(9999.99).optional(),
+  metadata: z.record(z.unknown()).optional(),
+  deviceInfo: z.string().max(512).optional(),
+  scannedAt: z.string().datetime({ offset: true }).optional(),
+});
+
+type ScanEventInput = z.infer<typeof scanEventSchema>;
+
+interface ScanEventResult {
+  line: number;
+  eventId?: string;
+  status: 'created' | 'duplicate' | 'rejected';
+  id?: string;
+  error?: string;
+}
+
+/**
+ * Parse and validate every NDJSON line; invalid lines are rejected on
+ * their own instead of failing the whole batch
+ */
+const parseScanEvents = (body: string) => {
+  const events: { line: number; event: ScanEventInput }[] = [];
+  const rejected: ScanEventResult[] = [];
+
+  body.split('\n').forEach((text, index) => {
+    if (!text.trim()) {
+      return;
+    }
+    const line = index + 1;
+    let raw: unknown;
+    try {
+      raw = JSON.parse(text);
+    } catch {
+      rejected.push({ line, status: 'rejected', error: 'Invalid JSON' });
+      return;
+    }
+    const parsed = scanEventSchema.safeParse(raw);
+    if (!parsed.success) {
+      const eventId = (raw as { eventId?: unknown })?.eventId;
+      const issue = parsed.error.errors[0];
+      rejected.push({
+        line,
+        ...(typeof eventId === 'string' && { eventId }),
+        status: 'rejected',
+        error: issue ? `${issue.path.join('.') || 'event'}: ${issue.message}` : 'Invalid event',
+      });
+      return;
+    }
+    events.push({ line, event: parsed.data });
+  });
+
+  return { events, rejected };
+};
+
+/**
+ * @route POST /api/scans/bulk
+ * @desc Ingest a batch of offline scans sent as NDJSON, one event per line:
+ *       {"eventId", "qrPayload", "eventType", "checkpoint"?, "lat"?, "lng"?, "accuracy"?,
+ *        "metadata"?, "deviceInfo"?, "scannedAt"?}
+ *       Re-sending a batch is safe: events whose eventId the same user already stored come back as
+ *       duplicates. Event ids only need to be unique per user (scanners may simply count up).
+ * @access Private
+ */
+router.post(
+  '/bulk',
+  authenticate,
+  express.text({ type: ['application/x-ndjson', 'application/jsonl', 'text/plain'], limit: MAX_BATCH_BYTES }),
+  async (req, res, next) => {
+    try {
+      if (typeof req.body !== 'string' || !req.body.trim()) {
+        throw createError('Expected an NDJSON body (Content-Type: application/x-ndjson)', 400);
+      }
+
+      // Event ids are scoped to the user, two scanners counting from 1 must not collide
+      const userId = req.user!.id;
+      const startedAt = Date.now();
+      const { events, rejected } = parseScanEvents(req.body);
+      if (events.length + rejected.length > MAX_EVENTS_PER_BATCH) {
+        throw createError(`A batch may hold at most ${MAX_EVENTS_PER_BATCH} events`, 413);
+      }
+
+      const results: ScanEventResult[] = [...rejected];
+
+      // A scanner that retried mid-queue can repeat an event inside one batch; keep the first
+      const seen = new Set<string>();
+      const unique = events.filter(({ line, event }) => {
+        if (seen.has(event.eventId)) {
+          results.push({ line, eventId: event.eventId, status: 'duplicate' });
+          return false;
+        }
+        seen.add(event.eventId);
+        return true;
+      });
+
+      // Every distinct payload resolved at once, mostly from the cache
+      const items = await itemLookup.resolve(unique.map(({ event }) => event.qrPayload));
+
+      const rows: Prisma.ScanEventCreateManyInput[] = [];
+      const lineByEventId = new Map<string, number>();
+      for (const { line, event } of unique) {
+        const itemIds = items.get(event.qrPayload) ?? [];
+        if (itemIds.length !== 1) {
+          results.push({
+            line,
+            eventId: event.eventId,
+            status: 'rejected',
+            error: itemIds.length === 0 ? 'Unknown item' : 'QR payload matches several items',
+          });
+          continue;
+        }
+
+        const scannedAt = event.scannedAt ? new Date(event.scannedAt) : new Date(startedAt);
+        if (scannedAt.getTime() > startedAt + MAX_CLOCK_SKEW_MS) {
+          results.push({ line, eventId: event.eventId, status: 'rejected', error: 'scannedAt is in the future' });
+          continue;
+        }
+
+        lineByEventId.set(event.eventId, line);
+        rows.push({
+          clientEventId: event.eventId,
+          itemId: itemIds[0]!,
+          userId,
+          eventType: event.eventType,
+          checkpoint: event.checkpoint ?? null,
+          lat: event.lat ?? null,
+          lng: event.lng ?? null,
+          accuracy: event.accuracy ?? null,
+          ...(event.metadata && { metadata: event.metadata as Prisma.InputJsonObject }),
+          deviceInfo: event.deviceInfo ?? req.get('User-Agent') ?? null,
+          ipAddress: req.ip ?? null,
+          createdAt: scannedAt,
+        });
+      }
+
+      // Multi-row INSERT ... ON CONFLICT DO NOTHING, chunked, all in one transaction; only the rows
+      // actually inserted come back, the rest were stored by an earlier sync of this user
+      const created = await prisma.$transaction(async (tx) => {
+        const inserted: { id: string; clientEventId: string | null }[] = [];
+        for (let start = 0; start < rows.length; start += INSERT_CHUNK_SIZE) {
+          inserted.push(...await tx.scanEvent.createManyAndReturn({
+            data: rows.slice(start, start + INSERT_CHUNK_SIZE),
+            skipDuplicates: true,
+            select: { id: true, clientEventId: true },
+          }));
+        }
+        return inserted;
+      }, { timeout: 30000 });
+
+      const createdIds = new Map(created.map((event) => [event.clientEventId, event.id]));
+      const duplicateIds = rows
+        .map((row) => row.clientEventId!)
+        .filter((eventId) => !createdIds.has(eventId));
+      const existing = duplicateIds.length > 0
+        ? await prisma.scanEvent.findMany({
+            where: { userId, clientEventId: { in: duplicateIds } },
+            select: { id: true, clientEventId: true },
+          })
+        : [];
+      const existingIds = new Map(existing.map((event) => [event.clientEventId, event.id]));
+
+      for (const row of rows) {
+        const eventId = row.clientEventId!;
+        const line = lineByEventId.get(eventId)!;
+        const createdId = createdIds.get(eventId);
+        if (createdId) {
+          results.push({ line, eventId, status: 'created', id: createdId });
+        } else {
+          const existingId = existingIds.get(eventId);
+          results.push({ line, eventId, status: 'duplicate', ...(existingId ? { id: existingId } : {}) });
+        }
+      }
+      results.sort((a, b) => a.line - b.line);
+
+      const summary = {
+        received: results.length,
+        created: created.length,
+        duplicates: results.filter((result) => result.status === 'duplicate').length,
+        rejected: results.filter((result) => result.status === 'rejected').length,
+      };
+
+      logger.info('Scan events ingested', {
+        ...summary,
+        durationMs: Date.now() - startedAt,
+        itemCache: itemLookup.stats(),
+        userId
+      });
+
+      res.json({
+        success: summary.rejected === 0,
+        data: {
+          ...summary,
+          results,
+        },
+      });
+
+    } catch (error) {
+      logger.error('Error in scan event ingest endpoint', { error: (error as Error).message });
+      next(error);
+    }
+  }
+);
+
+export default router;
@@ -8,6 +8,7 @@ import { errorHandler } from './middleware/errorHandler.js';
 // Routes
 import authRoutes from './routes/auth.js';
 import drugRoutes from './routes/drugs-new.js';
+import scanRoutes from './routes/scans.js';
 
 const prisma = new PrismaClient({
   log: ['query', 'info', 'warn', 'error'],
@@ -63,6 +64,7 @@ app.get('/health', (_req, res) => {
 // API routes
 app.use('/api/auth', authRoutes);
 app.use('/api/drugs', drugRoutes);
+app.use('/api/scans', scanRoutes);
 
 // Static files for PWA (when we create them)
 app.use('/pwa', express.static('public/pwa'));
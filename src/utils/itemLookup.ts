@@ -0,0 +1,91 @@
+/**
+ * Cached resolution of scanned QR payloads to items
+ */
+import { PrismaClient } from '@prisma/client';
+
+interface CachedItems {
+  ids: string[];
+  expiresAt: number;
+}
+
+/**
+ * LRU of qrPayload -> item ids, bounded by size and TTL.
+ * Scanners hit the same few lots over and over, so a burst of scans
+ * mostly resolves from memory; the misses of a batch are fetched with
+ * one query. Payloads that match nothing are not cached, an item may be
+ * registered right after its first scan is rejected.
+ */
+export class ItemLookup {
+  private cache = new Map<string, CachedItems>();
+  public hits = 0;
+  public misses = 0;
+
+  constructor(
+    private prisma: PrismaClient,
+    private maxEntries: number = 50000,
+    private ttlMs: number = 10 * 60 * 1000
+  ) {}
+
+  /**
+   * Item ids for every payload: none for unknown payloads, more than one
+   * when several items print the same payload
+   */
+  async resolve(payloads: Iterable<string>): Promise<Map<string, string[]>> {
+    const now = Date.now();
+    const resolved = new Map<string, string[]>();
+    const missing: string[] = [];
+
+    for (const payload of new Set(payloads)) {
+      const cached = this.cache.get(payload);
+      if (cached && cached.expiresAt > now) {
+        // Re-insert to mark as most recently used
+        this.cache.delete(payload);
+        this.cache.set(payload, cached);
+        resolved.set(payload, cached.ids);
+        this.hits++;
+      } else {
+        missing.push(payload);
+        this.misses++;
+      }
+    }
+
+    if (missing.length > 0) {
+      const items = await this.prisma.item.findMany({
+        where: { qrPayload: { in: missing } },
+        select: { id: true, qrPayload: true },
+      });
+      for (const item of items) {
+        const ids = resolved.get(item.qrPayload) ?? [];
+        ids.push(item.id);
+        resolved.set(item.qrPayload, ids);
+      }
+      for (const payload of missing) {
+        const ids = resolved.get(payload);
+        if (ids) {
+          this.remember(payload, { ids, expiresAt: now + this.ttlMs });
+        } else {
+          resolved.set(payload, []);
+        }
+      }
+    }
+
+    return resolved;
+  }
+
+  private remember(payload: string, entry: CachedItems): void {
+    this.cache.delete(payload);
+    this.cache.set(payload, entry);
+    // Map iterates in insertion order, so the first key is the least recently used
+    while (this.cache.size > this.maxEntries) {
+      const oldest = this.cache.keys().next().value;
+      if (oldest === undefined) {
+        break;
+      }
+      this.cache.delete(oldest);
+    }
+  }
+
+  stats() {
+    return { entries: this.cache.size, hits: this.hits, misses: this.misses };
+  }
+}